@@ -1,6 +1,10 @@
 ﻿from django.contrib import admin
 from django.db import transaction
-from .models import User, Profile, Request, Offer, Service, Lead, ChatMessage, Review
+from django.utils import timezone
+from .models import User, Profile, Request, Offer, Service, Lead, ChatMessage, Review, EmailOutbox
+from . import offers as offer_ops
+from . import ratings
+from .authentication import revoke_user_tokens
 
 
 @admin.register(User)
@@ -9,6 +13,12 @@ class UserAdmin(admin.ModelAdmin):
   search_fields = ("username", "email")
   list_filter = ("is_active", "is_staff")
 
+  def save_model(self, request, obj, form, change):
+    super().save_model(request, obj, form, change)
+    # El token lleva is_active: al desactivar se revocan los tokens vigentes
+    if change and "is_active" in form.changed_data and not obj.is_active:
+      revoke_user_tokens(obj.pk)
+
 
 @admin.register(Profile)
 class ProfileAdmin(admin.ModelAdmin):
@@ -36,10 +46,11 @@ class ChatMessageInline(admin.TabularInline):
 
 @admin.register(Request)
 class RequestAdmin(admin.ModelAdmin):
-  list_display = ("id", "title", "owner", "status", "category", "urgency", "created_at")
+  list_display = ("id", "title", "owner", "status", "category", "urgency", "offer_count", "created_at")
   search_fields = ("title", "description", "owner__username", "category", "location")
   list_filter = ("status", "urgency", "category")
   date_hierarchy = "created_at"
+  readonly_fields = ("accepted_offer", "offer_count", "last_activity_at")
   inlines = [OfferInline, ChatMessageInline]
 
   actions = [
@@ -79,17 +90,12 @@ class OfferAdmin(admin.ModelAdmin):
   @admin.action(description="Aceptar oferta seleccionada (una por solicitud)")
   @transaction.atomic
   def accept_selected_offers(self, request, queryset):
-    for off in queryset.select_related("request"):
-      req = off.request
-      Offer.objects.filter(request=req).exclude(pk=off.pk).update(status="rejected")
-      Offer.objects.filter(pk=off.pk).update(status="accepted")
-      if req.status == "pendiente":
-        req.status = "en_progreso"
-        req.save(update_fields=["status"]) 
+    for request_id, offer_id in queryset.values_list("request_id", "pk"):
+      offer_ops.accept_offer(request_id, offer_id)
 
   @admin.action(description="Rechazar ofertas seleccionadas")
   def reject_selected_offers(self, request, queryset):
-    queryset.update(status="rejected")
+    offer_ops.reject_offers(queryset)
 
 
 @admin.register(Service)
@@ -123,4 +129,34 @@ class ReviewAdmin(admin.ModelAdmin):
   list_display = ("id", "request", "to_user", "from_user", "rating", "created_at")
   search_fields = ("request__title", "to_user__username", "from_user__username", "comment")
   list_filter = ("rating",)
-  date_hierarchy = "created_at"
\ No newline at end of file
+  date_hierarchy = "created_at"
+
+  # Los cambios hechos aquí no pasan por review_create: se recalculan los resúmenes afectados
+  def save_model(self, request, obj, form, change):
+    before = Review.objects.filter(pk=obj.pk).values_list("to_user_id", flat=True).first() if change else None
+    super().save_model(request, obj, form, change)
+    ratings.rebuild({obj.to_user_id, before} - {None})
+
+  def delete_model(self, request, obj):
+    super().delete_model(request, obj)
+    ratings.rebuild([obj.to_user_id])
+
+  def delete_queryset(self, request, queryset):
+    users = set(queryset.values_list("to_user_id", flat=True))
+    super().delete_queryset(request, queryset)
+    ratings.rebuild(users)
+
+
+@admin.register(EmailOutbox)
+class EmailOutboxAdmin(admin.ModelAdmin):
+  list_display = ("id", "to_email", "subject", "status", "attempts", "next_attempt_at", "sent_at", "created_at")
+  search_fields = ("to_email", "subject")
+  list_filter = ("status",)
+  date_hierarchy = "created_at"
+  readonly_fields = ("attempts", "last_error", "sent_at", "created_at")
+
+  actions = ["retry_now"]
+
+  @admin.action(description="Reintentar ahora")
+  def retry_now(self, request, queryset):
+    queryset.exclude(status="sent").update(status="pending", attempts=0, next_attempt_at=timezone.now())
@@ -1,6 +1,20 @@
 from django.apps import AppConfig
+from django.db import connections
+from django.db.models.signals import post_delete, post_migrate
+
+
+def _ensure_unaccent(sender, using, **kwargs):
+    from .search import ensure_unaccent
+    ensure_unaccent(connections[using])
 
 
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from .authentication import check_shared_cache
+        from .offers import offer_deleted
+        check_shared_cache()
+        post_delete.connect(offer_deleted, sender='api.Offer', dispatch_uid='api.offer_deleted')
+        post_migrate.connect(_ensure_unaccent, sender=self)
@@ -0,0 +1,150 @@
+"""
+Caché de respuestas del asistente (por proceso), en dos niveles:
+
+1. exacto: LRU por mensaje normalizado (minúsculas, sin tildes ni puntuación)
+   + modelo + versión del prompt;
+2. semántico: vecino más cercano sobre los embeddings de los mensajes ya
+   respondidos; si la similitud coseno supera ASSISTANT_SEMANTIC_THRESHOLD se
+   reutiliza esa respuesta. "¿Cómo publico una solicitud?" y "como publicar una
+   solicitud" comparten respuesta sin volver a generar.
+
+Ambos niveles tienen TTL (ASSISTANT_CACHE_TTL) y tamaño máximo (se desaloja la
+entrada menos usada). La versión incluye faq.json, el índice RAG y
+PROMPT_VERSION: si cualquiera cambia, la caché se vacía en la siguiente consulta.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from django.conf import settings
+
+from . import faq, rag
+from .faq import normalize
+
+
+def content_version(prompt_version):
+    """Cambia si cambian faq.json (su contenido), el índice o el prompt."""
+    return f'{prompt_version}:{faq.get_store().version()}:{rag.index_mtime()}'
+
+
+class ResponseCache:
+    def __init__(self, size, semantic_size, ttl, threshold):
+        self.size = size
+        self.semantic_size = semantic_size
+        self.ttl = ttl
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._version = None
+        self.hits_exact = self.hits_semantic = self.misses = self.evictions = 0
+        self._reset()
+
+    def _reset(self):
+        self._exact = OrderedDict()                 # clave -> (respuesta, expira)
+        self._vectors = None                        # (semantic_size, dim) float32, filas normalizadas
+        self._replies = [None] * self.semantic_size
+        self._models = [None] * self.semantic_size
+        self._expires = np.zeros(self.semantic_size)
+        self._last_used = np.zeros(self.semantic_size)
+
+    def _check_version(self, version):
+        if version != self._version:
+            self._version = version
+            self._reset()
+
+    @staticmethod
+    def _key(message, model):
+        return hashlib.sha256(f'{model}\0{normalize(message)}'.encode('utf-8')).hexdigest()
+
+    def get_exact(self, message, model, version):
+        now = time.monotonic()
+        key = self._key(message, model)
+        with self._lock:
+            self._check_version(version)
+            hit = self._exact.get(key)
+            if hit is not None and hit[1] > now:
+                self._exact.move_to_end(key)
+                self.hits_exact += 1
+                return hit[0]
+            if hit is not None:
+                del self._exact[key]
+        return None
+
+    def get_semantic(self, vector, model, version):
+        """Respuesta del mensaje más parecido (>= threshold). Cuenta como fallo si no hay."""
+        now = time.monotonic()
+        with self._lock:
+            self._check_version(version)
+            if vector is not None and self._vectors is not None and len(vector) == self._vectors.shape[1]:
+                q = np.asarray(vector, dtype=np.float32)
+                q = q / max(float(np.linalg.norm(q)), 1e-12)
+                scores = self._vectors @ q
+                scores[self._expires <= now] = -1.0
+                i = int(np.argmax(scores))
+                if scores[i] >= self.threshold and self._models[i] == model:
+                    self._last_used[i] = now
+                    self.hits_semantic += 1
+                    return self._replies[i]
+            self.misses += 1
+        return None
+
+    def put(self, message, model, version, reply, vector=None):
+        now = time.monotonic()
+        key = self._key(message, model)
+        with self._lock:
+            self._check_version(version)
+            self._exact[key] = (reply, now + self.ttl)
+            self._exact.move_to_end(key)
+            while len(self._exact) > self.size:
+                self._exact.popitem(last=False)
+                self.evictions += 1
+            if vector is None or not self.semantic_size:
+                return
+            q = np.asarray(vector, dtype=np.float32)
+            if self._vectors is None or self._vectors.shape[1] != len(q):
+                self._vectors = np.zeros((self.semantic_size, len(q)), dtype=np.float32)
+                self._expires[:] = 0
+            # Slot libre o vencido; si no hay, el menos usado
+            free = np.flatnonzero(self._expires <= now)
+            if len(free):
+                i = int(free[0])
+            else:
+                i = int(np.argmin(self._last_used))
+                self.evictions += 1
+            self._vectors[i] = q / max(float(np.linalg.norm(q)), 1e-12)
+            self._replies[i] = reply
+            self._models[i] = model
+            self._expires[i] = now + self.ttl
+            self._last_used[i] = now
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits_exact + self.hits_semantic + self.misses
+            return {
+                'hits_exact': self.hits_exact,
+                'hits_semantic': self.hits_semantic,
+                'misses': self.misses,
+                'hit_rate': round((self.hits_exact + self.hits_semantic) / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'entries_exact': len(self._exact),
+                'entries_semantic': int((self._expires > time.monotonic()).sum()),
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache(
+                    size=settings.ASSISTANT_CACHE_SIZE,
+                    semantic_size=settings.ASSISTANT_SEMANTIC_CACHE_SIZE,
+                    ttl=settings.ASSISTANT_CACHE_TTL,
+                    threshold=settings.ASSISTANT_SEMANTIC_THRESHOLD,
+                )
+    return _cache
@@ -0,0 +1,122 @@
+"""
+Autenticación JWT sin consulta a la BD.
+
+ClaimsJWTAuthentication arma el User desde los claims del token (id, username,
+is_active) con el resto de campos diferidos: si una vista toca, por ejemplo,
+user.email o user.password, Django los carga en ese momento. Las vistas que solo
+usan request.user.id / username no hacen ninguna consulta de usuario.
+
+Como el token deja de reflejar la BD, la revocación se resuelve con una caché:
+- revoke_token(token): invalida un token puntual (por jti) hasta que expire;
+- revoke_user_tokens(user_id): invalida todos los tokens emitidos hasta ahora
+  (con precisión de microsegundos, claim iat_us; iat solo trae segundos).
+La caché tiene que ser compartida entre workers (REDIS_URL): con LocMem la
+revocación solo vale en el proceso que la hizo. check_shared_cache() (desde
+api.apps) impide arrancar así fuera de DEBUG.
+"""
+import time
+from datetime import datetime, timedelta, timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import User
+
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# Backends de caché que no se comparten entre procesos
+LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def check_shared_cache():
+    """Lanza ImproperlyConfigured si REQUIRE_SHARED_CACHE y la caché default es por proceso."""
+    if not getattr(settings, 'REQUIRE_SHARED_CACHE', False):
+        return
+    backend = settings.CACHES.get('default', {}).get('BACKEND', '')
+    if backend in LOCAL_CACHE_BACKENDS:
+        raise ImproperlyConfigured(
+            f'{backend} es por proceso: la revocación de tokens de ClaimsJWTAuthentication y la '
+            'invalidación de roles de api.profile_cache solo llegarían al worker que las hizo. '
+            'Configura REDIS_URL (o REQUIRE_SHARED_CACHE=False si corre un solo proceso).'
+        )
+
+
+def epoch_us(dt=None):
+    """Microsegundos desde epoch de dt (aware) o de ahora."""
+    if dt is None:
+        return time.time_ns() // 1000
+    return (dt - EPOCH) // timedelta(microseconds=1)
+
+
+def _jti_key(jti):
+    return f'jwt:revoked:{jti}'
+
+
+def _user_key(user_id):
+    return f'jwt:revoked-before:{user_id}'
+
+
+def _lifetime():
+    return int(api_settings.ACCESS_TOKEN_LIFETIME.total_seconds())
+
+
+def revoke_token(token):
+    jti = token.get(api_settings.JTI_CLAIM)
+    if jti:
+        ttl = max(1, int(token.get('exp', time.time() + _lifetime()) - time.time()))
+        cache.set(_jti_key(jti), 1, ttl)
+
+
+def revoke_user_tokens(user_id):
+    cache.set(_user_key(user_id), epoch_us(), _lifetime())
+
+
+def is_revoked(token):
+    """Una sola ida a la caché por request (get_many)."""
+    jti_key = _jti_key(token.get(api_settings.JTI_CLAIM))
+    user_key = _user_key(token.get(api_settings.USER_ID_CLAIM))
+    found = cache.get_many([jti_key, user_key])
+    if found.get(jti_key):
+        return True
+    revoked_before = found.get(user_key)
+    if not revoked_before:
+        return False
+    # Tokens sin iat_us: se toma el inicio del segundo de iat (se revoca de más, nunca de menos)
+    issued = token.get('iat_us') or int(token.get('iat', 0)) * 1_000_000
+    return int(issued) < revoked_before
+
+
+def user_from_claims(token):
+    """User con id/username/is_active del token; los demás campos quedan diferidos (carga perezosa)."""
+    data = {
+        'id': token[api_settings.USER_ID_CLAIM],
+        'username': token['username'],
+        'is_active': bool(token.get('is_active', True)),
+    }
+    fields = [f.attname for f in User._meta.concrete_fields if f.attname in data]
+    user = User.from_db(DEFAULT_DB_ALIAS, fields, [User._meta.get_field(f).to_python(data[f]) for f in fields])
+    return user
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise AuthenticationFailed('Token sin identificación de usuario', code='token_not_valid')
+        if is_revoked(validated_token):
+            raise AuthenticationFailed('Token revocado', code='token_revoked')
+        if 'username' not in validated_token:
+            # Tokens emitidos antes de incluir los claims: camino clásico con consulta
+            return super().get_user(validated_token)
+        user = user_from_claims(validated_token)
+        if not user.is_active:
+            raise AuthenticationFailed('Usuario inactivo', code='user_inactive')
+        return user
@@ -0,0 +1,80 @@
+"""
+Lectura y actualización del esquema bi (migraciones 0009 y 0010).
+
+Los reportes (export_report, paneles) leen de aquí y nunca agregan sobre las
+tablas api_* en vivo. bi.request_funnel, bi.offer_acceptance, bi.category_stats
+y bi.provider_stats son vistas materializadas: refresh() las recalcula CONCURRENTLY (los lectores
+siguen viendo la versión anterior mientras tanto). bi.daily_volume es una vista
+sobre DailyKPI, que refresh() pone al día de forma incremental.
+"""
+import time
+from datetime import timedelta
+
+from django.db import connection
+
+from . import kpis
+
+MATERIALIZED_VIEWS = ('bi.request_funnel', 'bi.offer_acceptance', 'bi.category_stats', 'bi.provider_stats')
+
+
+def _rows(sql, params=()):
+    with connection.cursor() as cur:
+        cur.execute(sql, params)
+        cols = [c.name for c in cur.description]
+        return [dict(zip(cols, row)) for row in cur.fetchall()]
+
+
+def funnel():
+    """[{status, requests, with_offers, with_accepted_offer}] de mayor a menor."""
+    return _rows("SELECT status, requests, with_offers, with_accepted_offer "
+                 "FROM bi.request_funnel ORDER BY requests DESC, status")
+
+
+def acceptance():
+    """{offers, accepted, rejected, pending, acceptance_rate, avg_accepted_price, refreshed_at}."""
+    rows = _rows("SELECT offers, accepted, rejected, pending, acceptance_rate, avg_accepted_price, refreshed_at "
+                 "FROM bi.offer_acceptance")
+    return rows[0] if rows else {'offers': 0, 'accepted': 0, 'rejected': 0, 'pending': 0,
+                                 'acceptance_rate': 0, 'avg_accepted_price': 0, 'refreshed_at': None}
+
+
+def categories(limit=None):
+    """[{category, requests, offers, offers_accepted, avg_accepted_price}] por cantidad de solicitudes."""
+    sql = ("SELECT category, requests, offers, offers_accepted, avg_accepted_price "
+           "FROM bi.category_stats ORDER BY requests DESC, category")
+    if limit:
+        return _rows(sql + " LIMIT %s", [limit])
+    return _rows(sql)
+
+
+def providers(limit=None):
+    """Una fila por proveedor (bi.provider_stats), de mayor a menor monto aceptado."""
+    sql = ("SELECT provider_id, username, display_name, offers, offers_accepted, acceptance_rate, "
+           "accepted_total, avg_accepted_price, leads, services, rating_count, rating_avg "
+           "FROM bi.provider_stats ORDER BY accepted_total DESC, provider_id")
+    if limit:
+        return _rows(sql + " LIMIT %s", [limit])
+    return _rows(sql)
+
+
+def daily_series(start, end, field='requests'):
+    """[(día, valor)] de start a end (incluidos); los días sin fila valen 0."""
+    if field not in kpis.FIELDS:
+        raise ValueError(f'Campo desconocido: {field}')
+    rows = _rows(f"SELECT day, {field} FROM bi.daily_volume WHERE day BETWEEN %s AND %s", [start, end])
+    values = {r['day']: r[field] for r in rows}
+    return [(d, values.get(d, 0)) for d in (start + timedelta(days=i) for i in range((end - start).days + 1))]
+
+
+def refresh(concurrently=True, full_kpis=False, lookback=kpis.DEFAULT_LOOKBACK):
+    """Pone al día DailyKPI y las vistas materializadas. Devuelve [(nombre, segundos)]."""
+    timings = []
+    t0 = time.perf_counter()
+    kpis.refresh(full=full_kpis, lookback=lookback)
+    timings.append(('api_dailykpi', time.perf_counter() - t0))
+    with connection.cursor() as cur:
+        for view in MATERIALIZED_VIEWS:
+            t0 = time.perf_counter()
+            cur.execute(f"REFRESH MATERIALIZED VIEW {'CONCURRENTLY ' if concurrently else ''}{view}")
+            timings.append((view, time.perf_counter() - t0))
+    return timings
@@ -0,0 +1,126 @@
+"""
+Sincronización del chat: reglas de acceso, cursor ?since=, long-poll en proceso
+y difusión por WebSocket (grupo de Channels por solicitud).
+
+Cada mensaje nuevo incrementa un contador global protegido por una Condition;
+los long-polls esperan sobre ella y vuelven a consultar la BD. Como otros
+workers no comparten la Condition, la espera se hace en tramos cortos
+(CHAT_POLL_SLICE) para ver también los mensajes creados en otro proceso.
+"""
+import json
+import logging
+import math
+import threading
+import time
+import uuid
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+from .models import ChatMessage
+
+logger = logging.getLogger(__name__)
+
+CHAT_POLL_SLICE = 1.0
+
+_cond = threading.Condition()
+_seq = 0
+
+
+def long_poll_max():
+    return float(getattr(settings, 'CHAT_LONG_POLL_MAX', 25))
+
+
+def can_access(req, user):
+    """Dueño de la solicitud o proveedor de la oferta aceptada (req con accepted_offer cargado)."""
+    winner = req.accepted_offer
+    if not winner or not user or not user.is_authenticated:
+        return False
+    # Comparación robusta por IDs para evitar problemas de identidad
+    if str(user.id) in {str(req.owner_id), str(winner.provider_id)}:
+        return True
+    # Fallback adicional por username (por si el front no refrescó el id todavía)
+    return (user.username or '').lower() == (req.owner.username or '').lower()
+
+
+def group_name(request_id):
+    return f'chat.{uuid.UUID(str(request_id)).hex}'
+
+
+def notify_new_message(request_id, data=None):
+    global _seq
+    with _cond:
+        _seq += 1
+        _cond.notify_all()
+    if data is not None:
+        _broadcast(request_id, data)
+
+
+def _broadcast(request_id, data):
+    try:
+        from channels.layers import get_channel_layer
+    except ImportError:
+        return
+    layer = get_channel_layer()
+    if layer is None:
+        return
+    # Los ids (UUID) se pasan a texto para que cualquier capa (memoria o Redis) pueda serializarlos
+    message = json.loads(json.dumps(data, cls=DjangoJSONEncoder))
+    try:
+        async_to_sync(layer.group_send)(group_name(request_id), {'type': 'chat.message', 'message': message})
+    except Exception:
+        # El mensaje ya está guardado; los clientes lo recuperan con ?since=
+        logger.exception("No se pudo difundir el mensaje del chat %s", request_id)
+
+
+def parse_since(req, since):
+    """
+    Convierte ?since= (id de mensaje o fecha ISO) en un filtro Q.
+    Lanza ValueError si no es válido.
+    """
+    since = (since or '').strip()
+    if not since:
+        return Q()
+    try:
+        msg_id = uuid.UUID(since)
+    except ValueError:
+        ts = parse_datetime(since.replace(' ', '+'))
+        if ts is None:
+            raise ValueError('since inválido')
+        return Q(ts__gt=ts)
+    ts = ChatMessage.objects.filter(request=req, id=msg_id).values_list('ts', flat=True).first()
+    if ts is None:
+        raise ValueError('since no corresponde a un mensaje de este chat')
+    return Q(ts__gt=ts) | Q(ts=ts, id__gt=msg_id)
+
+
+def parse_wait(value):
+    """?wait= en segundos, acotado a [0, CHAT_LONG_POLL_MAX]. ValueError si no es un número finito."""
+    try:
+        wait = float(value or 0)
+    except (TypeError, ValueError):
+        raise ValueError('wait inválido')
+    # nan/inf darían un deadline que nunca se alcanza
+    if not math.isfinite(wait):
+        raise ValueError('wait inválido')
+    return min(max(wait, 0.0), long_poll_max())
+
+
+def fetch_messages(req, since_q, wait=0):
+    """Devuelve los mensajes posteriores al cursor; con wait > 0 espera hasta que llegue alguno."""
+    qs = ChatMessage.objects.filter(request=req).filter(since_q).order_by('ts', 'id')
+    msgs = list(qs)
+    wait = wait if math.isfinite(wait) else 0
+    deadline = time.monotonic() + min(max(wait, 0), long_poll_max())
+    while not msgs:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        with _cond:
+            seen = _seq
+            _cond.wait_for(lambda: _seq != seen, timeout=min(remaining, CHAT_POLL_SLICE))
+        msgs = list(qs.all())
+    return msgs
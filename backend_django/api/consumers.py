@@ -0,0 +1,68 @@
+"""
+WebSocket del chat: /ws/chats/<request_id>?token=<JWT>.
+Solo empuja los mensajes que crea chat_view; el envío sigue siendo por POST.
+"""
+from urllib.parse import parse_qs
+
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from django.contrib.auth.models import AnonymousUser
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+
+from .authentication import ClaimsJWTAuthentication
+from .models import Request
+from . import chat as chat_sync
+
+
+@database_sync_to_async
+def _user_from_token(raw):
+    auth = ClaimsJWTAuthentication()
+    try:
+        return auth.get_user(auth.get_validated_token(raw))
+    except (InvalidToken, TokenError, AuthenticationFailed):
+        return AnonymousUser()
+
+
+class JWTAuthMiddleware:
+    """Autentica el socket con ?token= (los navegadores no permiten cabeceras en WebSocket)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        query = parse_qs(scope.get('query_string', b'').decode('utf-8'))
+        token = (query.get('token') or [''])[0]
+        scope = dict(scope, user=await _user_from_token(token) if token else AnonymousUser())
+        return await self.app(scope, receive, send)
+
+
+@database_sync_to_async
+def _chat_allowed(request_id, user):
+    try:
+        req = Request.objects.select_related('owner', 'accepted_offer').get(id=request_id)
+    except Request.DoesNotExist:
+        return False
+    return chat_sync.can_access(req, user)
+
+
+class ChatConsumer(AsyncJsonWebsocketConsumer):
+    async def connect(self):
+        request_id = self.scope['url_route']['kwargs']['request_id']
+        if not await _chat_allowed(request_id, self.scope.get('user')):
+            await self.close(code=4403)
+            return
+        self.group = chat_sync.group_name(request_id)
+        await self.channel_layer.group_add(self.group, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, code):
+        if getattr(self, 'group', None):
+            await self.channel_layer.group_discard(self.group, self.channel_name)
+
+    async def receive_json(self, content, **kwargs):
+        if content.get('type') == 'ping':
+            await self.send_json({'type': 'pong'})
+
+    async def chat_message(self, event):
+        await self.send_json({'type': 'message', 'message': event['message']})
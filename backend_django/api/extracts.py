@@ -0,0 +1,151 @@
+"""
+Extractos de filas crudas (solicitudes, ofertas, leads, reseñas) para análisis.
+
+Las filas salen de .values_list().iterator(chunk_size): en Postgres es un cursor
+del lado del servidor y Django trae chunk_size filas por vez, así que la memoria
+no depende del tamaño de la tabla. Los encoders devuelven texto por trozos para
+escribirlo a disco (export_report) o enviarlo en una respuesta en streaming
+(/api/me/export, ver user_export).
+"""
+import csv
+import io
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from uuid import UUID
+
+from django.db.models import Q
+
+from .models import ChatMessage, Lead, Offer, Request, Review
+
+DEFAULT_CHUNK_SIZE = 2000
+ROWS_PER_WRITE = 500
+
+EXTRACTS = {
+    'requests': (Request, ('id', 'owner_id', 'title', 'category', 'location', 'urgency', 'status', 'budget',
+                           'description', 'offer_count', 'accepted_offer_id', 'created_at', 'last_activity_at')),
+    'offers': (Offer, ('id', 'request_id', 'provider_id', 'price', 'status', 'message', 'created_at')),
+    'leads': (Lead, ('id', 'service_id', 'provider_id', 'client_id', 'status', 'message', 'contact', 'created_at')),
+    'reviews': (Review, ('id', 'request_id', 'to_user_id', 'from_user_id', 'rating', 'comment', 'created_at')),
+}
+
+# Lo que un usuario puede descargar de su cuenta: kind -> (modelo, columnas, filtro, campo de orden)
+USER_EXPORTS = {
+    'requests': (Request, EXTRACTS['requests'][1], lambda u: Q(owner=u), 'created_at'),
+    'offers': (Offer, EXTRACTS['offers'][1], lambda u: Q(provider=u) | Q(request__owner=u), 'created_at'),
+    'leads': (Lead, EXTRACTS['leads'][1], lambda u: Q(provider=u) | Q(client=u), 'created_at'),
+    'chats': (ChatMessage, ('id', 'request_id', 'sender_id', 'recipient_id', 'text', 'ts'),
+              lambda u: Q(sender=u) | Q(recipient=u), 'ts'),
+}
+
+
+def columns(kind):
+    return EXTRACTS[kind][1]
+
+
+def queryset(kind, since=None):
+    """Filas de `kind` creadas desde `since` (incluido), en orden de creación."""
+    model = EXTRACTS[kind][0]
+    qs = model.objects.all()
+    if since is not None:
+        qs = qs.filter(created_at__gte=since)
+    return qs.order_by('created_at', 'id')
+
+
+def user_export(kind, user):
+    """(columnas, queryset) con las filas de `kind` que pertenecen a `user`, en orden cronológico."""
+    model, cols, scope, order = USER_EXPORTS[kind]
+    return cols, model.objects.filter(scope(user)).order_by(order, 'id')
+
+
+def rows(qs, cols, chunk_size=DEFAULT_CHUNK_SIZE):
+    return qs.values_list(*cols).iterator(chunk_size=chunk_size)
+
+
+def plain(value):
+    """UUID/Decimal/fechas a texto; lo demás queda igual (None incluido)."""
+    if isinstance(value, (UUID, Decimal)):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def csv_chunks(cols, rows, rows_per_write=ROWS_PER_WRITE):
+    """Encabezado (solo, de inmediato) + filas CSV en trozos de texto de ~rows_per_write filas."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(cols)
+    yield buf.getvalue()
+    buf.seek(0)
+    buf.truncate()
+    n = 0
+    for row in rows:
+        writer.writerow([plain(v) for v in row])
+        n += 1
+        if n >= rows_per_write:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+            n = 0
+    if buf.tell():
+        yield buf.getvalue()
+
+
+def ndjson_chunks(cols, rows, rows_per_write=ROWS_PER_WRITE):
+    """Un objeto JSON por línea, en trozos de texto de ~rows_per_write filas."""
+    lines = []
+    for row in rows:
+        lines.append(json.dumps({c: plain(v) for c, v in zip(cols, row)}, ensure_ascii=False))
+        if len(lines) >= rows_per_write:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def arrow_schema(kind):
+    """Esquema pyarrow según los campos del modelo (requiere pyarrow)."""
+    import pyarrow as pa
+
+    model, cols = EXTRACTS[kind]
+    fields = []
+    for col in cols:
+        field = model._meta.get_field(col)
+        if field.is_relation:
+            field = field.target_field
+        internal = field.get_internal_type()
+        if internal == 'DecimalField':
+            typ = pa.decimal128(field.max_digits, field.decimal_places)
+        elif internal == 'DateTimeField':
+            typ = pa.timestamp('us', tz='UTC')
+        elif internal.endswith('IntegerField'):
+            typ = pa.int64()
+        else:
+            typ = pa.string()
+        fields.append(pa.field(col, typ))
+    return pa.schema(fields)
+
+
+def write_parquet(path, kind, rows, chunk_size=DEFAULT_CHUNK_SIZE, compression='gzip'):
+    """Escribe un row group por cada chunk_size filas: en memoria nunca hay más que un chunk."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = arrow_schema(kind)
+    as_text = [pa.types.is_string(f.type) for f in schema]
+
+    def flush(writer, batch):
+        data = [[(str(v) if v is not None else None) for v in col] if text else list(col)
+                for col, text in zip(zip(*batch), as_text)]
+        writer.write_batch(pa.record_batch([pa.array(d, type=f.type) for d, f in zip(data, schema)], schema=schema))
+
+    with pq.ParquetWriter(str(path), schema, compression=compression) as writer:
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= chunk_size:
+                flush(writer, batch)
+                batch = []
+        if batch:
+            flush(writer, batch)
@@ -0,0 +1,136 @@
+"""
+FAQ del asistente (assistant/faq.json) en memoria.
+
+Se parsea una vez por proceso y se arma un índice invertido token -> entradas;
+en cada consulta solo se hace un stat del archivo (se recarga si cambian mtime
+o tamaño y, además, el contenido). Acepta entradas {q, a} o {question, answer}.
+
+Tokens: minúsculas, sin tildes ni puntuación, de más de 2 letras, sin
+STOPWORDS y recortados a STEM_LEN caracteres, así "publico"/"publicar" u
+"oferta"/"ofertas" coinciden. Un token de la pregunta pesa el doble que uno
+que solo aparece en la respuesta.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import unicodedata
+from pathlib import Path
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+STEM_LEN = 6
+_PUNCT = re.compile(r'[^\w\s]')
+_SPACES = re.compile(r'\s+')
+# Palabras que aparecen en casi todas las preguntas y no distinguen entre entradas
+STOPWORDS = frozenset('''
+    como cuando donde que cual cuales quien para por con sin una uno unos unas los las del
+    mis tus sus mas este esta esto ese esa hay puedo puede debo tengo son
+'''.split())
+
+
+def normalize(text):
+    text = unicodedata.normalize('NFKD', (text or '').lower())
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return _SPACES.sub(' ', _PUNCT.sub(' ', text)).strip()
+
+
+def tokens(text):
+    return {w[:STEM_LEN] for w in normalize(text).split() if len(w) > 2 and w not in STOPWORDS}
+
+
+def faq_path():
+    return Path(settings.BASE_DIR) / 'assistant' / 'faq.json'
+
+
+class FaqStore:
+    def __init__(self, path):
+        self.path = Path(path)
+        # (entries, postings, digest) en una sola tupla inmutable: se reemplaza con una
+        # asignación y los lectores, sin lock, nunca ven entries de un archivo y
+        # postings de otro.
+        #   entries:  tupla de {'q': ..., 'a': ...}
+        #   postings: token -> tupla de (posición en entries, peso)
+        self._index = ((), {}, None)
+        self._stat = None
+        self._lock = threading.Lock()
+
+    def _refresh(self):
+        try:
+            st = os.stat(self.path)
+            stat = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            stat = None
+        if stat == self._stat:
+            return
+        with self._lock:
+            if stat == self._stat:
+                return
+            raw = b''
+            if stat is not None:
+                try:
+                    raw = self.path.read_bytes()
+                except OSError:
+                    logger.exception("No se pudo leer %s", self.path)
+            digest = hashlib.sha256(raw).hexdigest()
+            if digest != self._index[2]:
+                self._index = self._build(raw) + (digest,)
+            self._stat = stat
+
+    def _build(self, raw):
+        """Devuelve (entries, postings) sin tocar el índice actual."""
+        try:
+            data = json.loads(raw.decode('utf-8')) if raw else []
+        except ValueError:
+            logger.exception("faq.json inválido; se ignora")
+            data = []
+        entries, postings = [], {}
+        for item in data if isinstance(data, list) else []:
+            if not isinstance(item, dict):
+                continue
+            q = (item.get('q') or item.get('question') or '').strip()
+            a = (item.get('a') or item.get('answer') or '').strip()
+            if not q or not a:
+                continue
+            pos = len(entries)
+            entries.append({'q': q, 'a': a})
+            q_tokens = tokens(q)
+            for tok in q_tokens | tokens(a):
+                postings.setdefault(tok, []).append((pos, 2 if tok in q_tokens else 1))
+        return tuple(entries), {tok: tuple(hits) for tok, hits in postings.items()}
+
+    def all(self):
+        self._refresh()
+        return self._index[0]
+
+    def version(self):
+        self._refresh()
+        return self._index[2]
+
+    def search(self, message, k=5):
+        """Entradas con más tokens en común con el mensaje (solo las que comparten alguno)."""
+        self._refresh()
+        entries, postings, _ = self._index
+        scores = {}
+        for tok in tokens(message):
+            for pos, weight in postings.get(tok, ()):
+                scores[pos] = scores.get(pos, 0) + weight
+        best = sorted(scores, key=lambda pos: (-scores[pos], pos))[:k]
+        return [entries[pos] for pos in best]
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = FaqStore(faq_path())
+    return _store
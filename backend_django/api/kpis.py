@@ -0,0 +1,78 @@
+"""
+KPIs diarios precalculados (DailyKPI) para export_report.
+
+refresh() recalcula solo desde el último día guardado (menos `lookback` días,
+porque una oferta puede aceptarse después del día en que se creó) hasta hoy,
+con un GROUP BY TruncDate por tabla. Los reportes la leen como bi.daily_volume
+(ver api.bi): una fila por día en vez de recorrer Request/Offer completas. Si
+se borran datos antiguos, refresh(full=True) reconstruye todo.
+"""
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Count, Max, Min, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import DailyKPI, Lead, Offer, Request, Review, Service
+
+DEFAULT_LOOKBACK = 7
+FIELDS = ('requests', 'offers', 'offers_accepted', 'accepted_price_total', 'services', 'leads', 'reviews')
+
+
+def _sources():
+    """(queryset, {campo DailyKPI: agregado}) por tabla de origen."""
+    accepted = Q(status='accepted')
+    return [
+        (Request.objects, {'requests': Count('id')}),
+        (Offer.objects, {
+            'offers': Count('id'),
+            'offers_accepted': Count('id', filter=accepted),
+            'accepted_price_total': Sum('price', filter=accepted),
+        }),
+        (Service.objects, {'services': Count('id')}),
+        (Lead.objects, {'leads': Count('id')}),
+        (Review.objects, {'reviews': Count('id')}),
+    ]
+
+
+def _first_day():
+    firsts = [qs.aggregate(first=Min('created_at'))['first'] for qs, _ in _sources()]
+    firsts = [timezone.localtime(f).date() for f in firsts if f]
+    return min(firsts) if firsts else None
+
+
+def daily_counts(since=None):
+    """{día: {campo: valor}} desde `since` (incluido), un GROUP BY por tabla; solo días con datos."""
+    rows = {}
+    start = timezone.make_aware(datetime.combine(since, time.min)) if since else None
+    for qs, aggregates in _sources():
+        if start is not None:
+            qs = qs.filter(created_at__gte=start)
+        for row in qs.annotate(day=TruncDate('created_at')).values('day').order_by().annotate(**aggregates):
+            day = row.pop('day')
+            rows.setdefault(day, {}).update({k: v or 0 for k, v in row.items()})
+    return rows
+
+
+def refresh(full=False, lookback=DEFAULT_LOOKBACK):
+    """Recalcula DailyKPI desde el último día guardado - lookback (o todo). Devuelve (desde, días escritos)."""
+    today = timezone.localdate()
+    last = None if full else DailyKPI.objects.aggregate(last=Max('day'))['last']
+    since = last - timedelta(days=max(0, lookback)) if last else _first_day()
+    if since is None:
+        if full:
+            DailyKPI.objects.all().delete()
+        return None, 0
+    counts = daily_counts(since)
+    days = [since + timedelta(days=i) for i in range((today - since).days + 1)]
+    objs = [DailyKPI(day=d, **counts.get(d, {})) for d in days]
+    with transaction.atomic():
+        if full:
+            DailyKPI.objects.filter(day__lt=since).delete()
+        DailyKPI.objects.bulk_create(
+            objs, batch_size=1000, update_conflicts=True,
+            unique_fields=['day'], update_fields=list(FIELDS) + ['updated_at'],
+        )
+    return since, len(objs)
+
@@ -0,0 +1,191 @@
+"""
+Bandeja de salida de correos.
+
+Las vistas solo hacen enqueue_email() (un INSERT). El worker
+(`manage.py run_mail_worker`) reclama lotes con SELECT ... FOR UPDATE SKIP LOCKED,
+los envía por la API HTTP de SendGrid con una sesión keep-alive (o por SMTP con
+una sola conexión si no hay API key) y reprograma los fallos con backoff
+exponencial hasta MAIL_MAX_ATTEMPTS; después quedan en estado 'dead'.
+
+Al reclamar, next_attempt_at se adelanta MAIL_LEASE_SECONDS: si el worker muere
+a mitad de un envío, la fila vuelve a estar disponible cuando vence ese plazo.
+"""
+import json
+import logging
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import EmailOutbox
+
+try:
+    import requests as _requests
+    from requests.adapters import HTTPAdapter
+except Exception:  # fallback mínimo con urllib
+    _requests = None
+    import urllib.request as _urlreq
+
+logger = logging.getLogger(__name__)
+
+SENDGRID_URL = "https://api.sendgrid.com/v3/mail/send"
+# Límite de personalizations por llamada de SendGrid
+SENDGRID_MAX_RECIPIENTS = 1000
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def enqueue_email(subject, txt, html, to_email):
+    return EmailOutbox.objects.create(to_email=to_email, subject=subject, text=txt, html=html or '')
+
+
+def backoff(attempts):
+    base = _setting('MAIL_BACKOFF_BASE', 30)
+    return min(base * (2 ** max(attempts - 1, 0)), _setting('MAIL_BACKOFF_MAX', 3600))
+
+
+def claim_batch(limit):
+    """Reserva hasta `limit` correos vencidos. Otros workers saltan las filas bloqueadas."""
+    now = timezone.now()
+    with transaction.atomic():
+        rows = list(
+            EmailOutbox.objects.select_for_update(skip_locked=True)
+            .filter(status='pending', next_attempt_at__lte=now)
+            .order_by('next_attempt_at')[:limit]
+        )
+        if rows:
+            EmailOutbox.objects.filter(pk__in=[r.pk for r in rows]).update(
+                attempts=F('attempts') + 1,
+                next_attempt_at=now + timedelta(seconds=_setting('MAIL_LEASE_SECONDS', 300)),
+            )
+            for r in rows:
+                r.attempts += 1
+    return rows
+
+
+def mark_sent(rows):
+    EmailOutbox.objects.filter(pk__in=[r.pk for r in rows]).update(
+        status='sent', sent_at=timezone.now(), last_error='')
+
+
+def mark_failed(rows, error):
+    now = timezone.now()
+    max_attempts = _setting('MAIL_MAX_ATTEMPTS', 8)
+    for r in rows:
+        if r.attempts >= max_attempts:
+            r.status = 'dead'
+            logger.error("Correo %s a %s descartado tras %s intentos: %s", r.pk, r.to_email, r.attempts, error)
+        else:
+            r.next_attempt_at = now + timedelta(seconds=backoff(r.attempts))
+        r.last_error = str(error)[:2000]
+    EmailOutbox.objects.bulk_update(rows, ['status', 'next_attempt_at', 'last_error'])
+
+
+def _group_identical(rows):
+    """Agrupa correos con igual contenido: SendGrid los envía en una llamada (una personalization c/u)."""
+    groups = {}
+    for r in rows:
+        groups.setdefault((r.subject, r.text, r.html), []).append(r)
+    for group in groups.values():
+        for i in range(0, len(group), SENDGRID_MAX_RECIPIENTS):
+            yield group[i:i + SENDGRID_MAX_RECIPIENTS]
+
+
+class Sender:
+    """Un Sender por proceso worker: mantiene la sesión HTTP (o conexión SMTP) abierta."""
+
+    def __init__(self):
+        self.api_key = os.getenv("SENDGRID_API_KEY") or os.getenv("EMAIL_HOST_PASSWORD")
+        self.from_email = _setting('DEFAULT_FROM_EMAIL', 'no-reply@fixly.test')
+        self.session = None
+        if self.api_key and _requests is not None:
+            self.session = _requests.Session()
+            self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+            self.session.headers.update({
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json",
+            })
+
+    def close(self):
+        if self.session is not None:
+            self.session.close()
+
+    def send(self, rows):
+        """Envía un lote ya reclamado. Devuelve (enviados, fallidos)."""
+        if self.api_key:
+            return self._send_sendgrid(rows)
+        return self._send_smtp(rows)
+
+    def _sendgrid_payload(self, group):
+        head = group[0]
+        content = [{"type": "text/plain", "value": head.text}]
+        if head.html:
+            content.append({"type": "text/html", "value": head.html})
+        return {
+            "personalizations": [{"to": [{"email": r.to_email}]} for r in group],
+            "from": {"email": self.from_email},
+            "subject": head.subject,
+            "content": content,
+        }
+
+    def _post(self, payload):
+        if self.session is not None:
+            r = self.session.post(SENDGRID_URL, json=payload, timeout=10)
+            r.raise_for_status()
+            return
+        req = _urlreq.Request(
+            SENDGRID_URL,
+            data=json.dumps(payload).encode("utf-8"),
+            headers={"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"},
+        )
+        with _urlreq.urlopen(req, timeout=10):
+            return
+
+    def _send_sendgrid(self, rows):
+        sent = failed = 0
+        for group in _group_identical(rows):
+            try:
+                self._post(self._sendgrid_payload(group))
+            except Exception as e:
+                logger.exception("Fallo usando la API HTTP de SendGrid (%s destinatarios)", len(group))
+                mark_failed(group, e)
+                failed += len(group)
+            else:
+                mark_sent(group)
+                sent += len(group)
+        return sent, failed
+
+    def _send_smtp(self, rows):
+        sent = failed = 0
+        ok = []
+        try:
+            conn = get_connection(fail_silently=False)
+            conn.open()
+        except Exception as e:
+            # Sin conexión no se envía nada: todo el lote vuelve a la cola con backoff
+            logger.exception("Fallo conectando al servidor SMTP (%s correos)", len(rows))
+            mark_failed(rows, e)
+            return 0, len(rows)
+        with conn:
+            for r in rows:
+                msg = EmailMultiAlternatives(r.subject, r.text, self.from_email, [r.to_email], connection=conn)
+                if r.html:
+                    msg.attach_alternative(r.html, "text/html")
+                try:
+                    msg.send()
+                except Exception as e:
+                    logger.exception("Fallo SMTP enviando correo %s a %s", r.pk, r.to_email)
+                    mark_failed([r], e)
+                    failed += 1
+                else:
+                    ok.append(r)
+        if ok:
+            mark_sent(ok)
+            sent = len(ok)
+        return sent, failed
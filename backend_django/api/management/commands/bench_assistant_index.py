@@ -0,0 +1,98 @@
+import json
+import multiprocessing
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.rag import INDEX_DTYPES, Index, load_index, meta_path_for, write_binary
+
+
+def _rss_kb():
+    """(RssAnon, RssFile) en kB: memoria privada del proceso vs. páginas compartidas del page cache."""
+    anon = file = 0
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('RssAnon:'):
+                    anon = int(line.split()[1])
+                elif line.startswith('RssFile:'):
+                    file = int(line.split()[1])
+    except OSError:
+        pass
+    return anon, file
+
+
+def _load_in_worker(args):
+    """Lo que hace un worker al arrancar: cargar el índice y responder una consulta."""
+    kind, path, query = args
+    anon0, file0 = _rss_kb()
+    t0 = time.perf_counter()
+    idx = Index.from_json(path) if kind == 'json' else Index.from_binary(path)
+    load_s = time.perf_counter() - t0
+    t1 = time.perf_counter()
+    idx.top_k(query, 4)
+    query_s = time.perf_counter() - t1
+    anon1, file1 = _rss_kb()
+    return load_s, query_s, anon1 - anon0, file1 - file0
+
+
+class Command(BaseCommand):
+    help = ("Compara el índice del asistente en JSON vs. binario (.npy con mmap): tamaño en disco, "
+            "tiempo de carga por worker y memoria privada (RssAnon) vs. compartida (RssFile).")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--synthetic", type=int, default=0,
+                            help="Genera un índice sintético de N chunks en vez de usar el real")
+        parser.add_argument("--dim", type=int, default=768)
+        parser.add_argument("--workers", type=int, default=4, help="Procesos que cargan el índice a la vez")
+
+    def handle(self, *args, **opts):
+        with tempfile.TemporaryDirectory() as tmp:
+            base = Path(tmp) / "index.json"
+            model, items, vectors = self._source(opts)
+            if not len(items):
+                raise CommandError("El índice está vacío; ejecuta build_assistant_index o usa --synthetic N")
+            query = vectors[0]
+
+            with base.open("w", encoding="utf-8") as f:
+                json.dump({"model": model, "count": len(items),
+                           "items": [dict(it, vector=v.tolist()) for it, v in zip(items, vectors)]}, f, ensure_ascii=False)
+            cases = [("json", base, base.stat().st_size)]
+            for dtype in INDEX_DTYPES:
+                d = Path(tmp) / dtype
+                d.mkdir()
+                meta = write_binary(d / "index.json", model, items, vectors, dtype)
+                size = sum(p.stat().st_size for p in d.iterdir())
+                cases.append((f"npy {dtype}", meta, size))
+
+            self.stdout.write(f"Chunks: {len(items)}  dim: {vectors.shape[1]}  workers: {opts['workers']}")
+            ctx = multiprocessing.get_context("fork")
+            for label, path, size in cases:
+                kind = "json" if label == "json" else "npy"
+                with ctx.Pool(opts["workers"]) as pool:
+                    results = pool.map(_load_in_worker, [(kind, str(path), query)] * opts["workers"])
+                load_ms = statistics.median(r[0] for r in results) * 1000
+                query_ms = statistics.median(r[1] for r in results) * 1000
+                anon = statistics.median(r[2] for r in results) / 1024
+                shared = statistics.median(r[3] for r in results) / 1024
+                self.stdout.write(self.style.SUCCESS(label))
+                self.stdout.write(f"  disco {size / 1024 / 1024:.2f} MB  carga {load_ms:.1f} ms  primera consulta {query_ms:.2f} ms")
+                self.stdout.write(f"  RSS por worker: privada +{anon:.1f} MB  compartida +{shared:.1f} MB")
+
+    def _source(self, opts):
+        if opts["synthetic"]:
+            rng = np.random.default_rng(0)
+            vectors = rng.standard_normal((opts["synthetic"], opts["dim"]), dtype=np.float32)
+            items = [{"id": f"doc{i // 4}.md:{i % 4}", "path": f"doc{i // 4}.md", "chunk": i % 4,
+                      "hash": f"{i:064x}", "text": "lorem ipsum " * 80} for i in range(opts["synthetic"])]
+            return "synthetic", items, vectors
+        path = Path(settings.ASSISTANT_INDEX_PATH)
+        if not (path.exists() or meta_path_for(path).exists()):
+            raise CommandError(f"No existe el índice {path}")
+        idx = load_index(path, mmap=False)
+        return idx.model, idx.items, idx.vectors()
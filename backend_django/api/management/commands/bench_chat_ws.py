@@ -0,0 +1,91 @@
+import asyncio
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from api.models import Request
+from api import chat as chat_sync
+
+
+def _percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    k = min(len(values) - 1, max(0, int(round(p / 100 * (len(values) - 1)))))
+    return values[k]
+
+
+class Command(BaseCommand):
+    help = "Benchmark de difusión del chat por WebSocket: mensajes/s y latencia p50/p99 con N sockets conectados."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--request", help="Id de la solicitud (por defecto, la primera con oferta aceptada)")
+        parser.add_argument("--sockets", type=int, default=200)
+        parser.add_argument("--messages", type=int, default=50)
+        parser.add_argument("--timeout", type=float, default=10.0)
+
+    def handle(self, *args, **opts):
+        qs = Request.objects.select_related("owner", "accepted_offer__provider").filter(accepted_offer__isnull=False)
+        req = qs.filter(pk=opts["request"]).first() if opts["request"] else qs.first()
+        if not req:
+            raise CommandError("No hay una solicitud con oferta aceptada para el benchmark.")
+        tokens = [
+            str(RefreshToken.for_user(req.owner).access_token),
+            str(RefreshToken.for_user(req.accepted_offer.provider).access_token),
+        ]
+        stats = asyncio.run(self._run(req.pk, tokens, opts["sockets"], opts["messages"], opts["timeout"]))
+
+        lat = [x * 1000 for x in stats["latencies"]]
+        self.stdout.write(f"Sockets: {opts['sockets']}  mensajes: {opts['messages']}  "
+                          f"entregas: {len(lat)}/{opts['sockets'] * opts['messages']}")
+        self.stdout.write(f"Conexión: {stats['connect_s']:.2f}s")
+        self.stdout.write(f"Throughput: {stats['delivered_per_s']:,.0f} entregas/s "
+                          f"({stats['sent_per_s']:,.0f} mensajes/s publicados)")
+        self.stdout.write(self.style.SUCCESS(
+            f"Latencia: p50 {_percentile(lat, 50):.2f} ms  p99 {_percentile(lat, 99):.2f} ms  "
+            f"max {max(lat or [0]):.2f} ms"))
+
+    async def _run(self, request_id, tokens, n_sockets, n_messages, timeout):
+        from channels.layers import get_channel_layer
+        from channels.testing import WebsocketCommunicator
+        from backend.asgi import application
+
+        path = f"/ws/chats/{request_id}"
+        comms = [
+            WebsocketCommunicator(application, f"{path}?token={tokens[i % 2]}", headers=[(b"origin", b"http://localhost")])
+            for i in range(n_sockets)
+        ]
+        t0 = time.perf_counter()
+        results = await asyncio.gather(*(c.connect(timeout=timeout) for c in comms))
+        connect_s = time.perf_counter() - t0
+        if not all(ok for ok, _ in results):
+            raise CommandError("Algunos sockets fueron rechazados (¿token o permisos?).")
+
+        latencies = []
+        last_rx = [0.0]
+
+        async def reader(comm):
+            for _ in range(n_messages):
+                event = await comm.receive_json_from(timeout=timeout)
+                now = time.perf_counter()
+                latencies.append(now - event["message"]["sent"])
+                last_rx[0] = max(last_rx[0], now)
+
+        readers = [asyncio.create_task(reader(c)) for c in comms]
+        layer = get_channel_layer()
+        group = chat_sync.group_name(request_id)
+        start = time.perf_counter()
+        for i in range(n_messages):
+            await layer.group_send(group, {"type": "chat.message", "message": {"seq": i, "sent": time.perf_counter()}})
+        sent_s = time.perf_counter() - start
+        await asyncio.gather(*readers, return_exceptions=True)
+        await asyncio.gather(*(c.disconnect() for c in comms))
+
+        elapsed = max(last_rx[0] - start, 1e-9)
+        return {
+            "connect_s": connect_s,
+            "latencies": latencies,
+            "delivered_per_s": len(latencies) / elapsed,
+            "sent_per_s": n_messages / max(sent_s, 1e-9),
+        }
@@ -0,0 +1,94 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connections
+from django.test import Client
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from api.models import Request
+
+
+def _percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    k = min(len(values) - 1, max(0, int(round(p / 100 * (len(values) - 1)))))
+    return values[k]
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark de GET /api/requests/<id> abriendo una conexión a Postgres por request "
+        "(CONN_MAX_AGE=0) vs. conexiones persistentes. Corre en proceso y reproduce el ciclo "
+        "del handler real (close_old_connections al empezar y al terminar cada request)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--request", help="Id de la solicitud (por defecto, la más reciente)")
+        parser.add_argument("--requests", type=int, default=500, help="Requests por escenario")
+        parser.add_argument("--concurrency", type=int, default=4, help="Hilos (cada uno con su conexión)")
+        parser.add_argument("--max-age", type=int, default=60, help="CONN_MAX_AGE del escenario persistente")
+
+    def handle(self, *args, **opts):
+        req = Request.objects.filter(pk=opts["request"]).first() if opts["request"] else Request.objects.order_by("-created_at").first()
+        if not req:
+            raise CommandError("No hay solicitudes para el benchmark.")
+        path = f"/api/requests/{req.pk}"
+        token = str(RefreshToken.for_user(req.owner).access_token)
+
+        db = connections["default"].settings_dict
+        original = (db["CONN_MAX_AGE"], db["CONN_HEALTH_CHECKS"])
+        try:
+            rows = []
+            for label, max_age, health in (
+                ("sin persistencia (CONN_MAX_AGE=0)", 0, False),
+                (f"persistente (CONN_MAX_AGE={opts['max_age']}, health checks)", opts["max_age"], True),
+            ):
+                db["CONN_MAX_AGE"], db["CONN_HEALTH_CHECKS"] = max_age, health
+                rows.append((label, self._run(path, token, opts["requests"], opts["concurrency"])))
+        finally:
+            db["CONN_MAX_AGE"], db["CONN_HEALTH_CHECKS"] = original
+            connections.close_all()
+
+        for label, stats in rows:
+            lat = [x * 1000 for x in stats["latencies"]]
+            self.stdout.write(self.style.SUCCESS(label))
+            self.stdout.write(f"  {stats['rps']:,.0f} req/s  p50 {_percentile(lat, 50):.2f} ms  "
+                              f"p95 {_percentile(lat, 95):.2f} ms  conexiones abiertas: {stats['connects']}")
+            if stats["errors"]:
+                self.stdout.write(self.style.WARNING(f"  respuestas != 200: {stats['errors']}"))
+
+    def _run(self, path, token, total, concurrency):
+        latencies, errors, connects = [], [0], [0]
+        lock = threading.Lock()
+        per_thread = max(1, total // concurrency)
+
+        def worker():
+            client = Client(HTTP_HOST="localhost", HTTP_AUTHORIZATION=f"Bearer {token}")
+            conn = connections["default"]
+            local_lat, local_err, local_conn = [], 0, 0
+            for _ in range(per_thread):
+                t0 = time.perf_counter()
+                close_old_connections()
+                if conn.connection is None:
+                    local_conn += 1
+                resp = client.get(path)
+                close_old_connections()
+                local_lat.append(time.perf_counter() - t0)
+                if resp.status_code != 200:
+                    local_err += 1
+            connections.close_all()
+            with lock:
+                latencies.extend(local_lat)
+                errors[0] += local_err
+                connects[0] += local_conn
+
+        threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = max(time.perf_counter() - start, 1e-9)
+        return {"latencies": latencies, "rps": len(latencies) / elapsed, "errors": errors[0], "connects": connects[0]}
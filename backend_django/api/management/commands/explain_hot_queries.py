@@ -0,0 +1,96 @@
+import re
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from api.models import Request, Offer, Service, Lead, ChatMessage, Review
+
+
+def _sample(model, attr):
+    value = model.objects.values_list(attr, flat=True).first()
+    return value or uuid.uuid4()
+
+
+def hot_queries():
+    """(nombre, queryset, índices esperados) para los accesos más frecuentes de las vistas."""
+    req_id = _sample(Request, 'id')
+    user_id = _sample(Request, 'owner_id')
+    provider_id = _sample(Lead, 'provider_id')
+    to_user_id = _sample(Review, 'to_user_id')
+    service_owner = _sample(Service, 'owner_id')
+    return [
+        ('requests: listado por fecha',
+         Request.objects.order_by('-created_at', '-id')[:20],
+         ['request_created_id_idx']),
+        ('requests: filtro por estado',
+         Request.objects.filter(status='pendiente').order_by('-created_at')[:20],
+         ['request_status_created_idx']),
+        ('requests: filtro por categoría',
+         Request.objects.filter(category='gasfiteria').order_by('-created_at')[:20],
+         ['request_category_created_idx']),
+        ('offers: aceptada de una solicitud',
+         Offer.objects.filter(request_id=req_id, status='accepted'),
+         ['uniq_offer_accepted_per_req', 'offer_request_status_idx']),
+        ('offers: por solicitud',
+         Offer.objects.filter(request_id=req_id).order_by('-created_at'),
+         ['offer_request_status_idx', 'uniq_offer_request_provider']),
+        ('chat: mensajes de una solicitud',
+         ChatMessage.objects.filter(request_id=req_id).order_by('ts'),
+         ['chat_request_ts_idx']),
+        ('reviews: recibidas por usuario',
+         Review.objects.filter(to_user_id=to_user_id).order_by('-created_at'),
+         ['review_to_user_created_idx']),
+        ('leads: recibidos por proveedor',
+         Lead.objects.filter(provider_id=provider_id).order_by('-created_at'),
+         ['lead_provider_created_idx']),
+        ('services: del dueño',
+         Service.objects.filter(owner_id=service_owner).order_by('-created_at'),
+         ['service_owner_created_idx']),
+        ('services: listado por fecha',
+         Service.objects.order_by('-created_at')[:20],
+         ['service_created_idx']),
+        ('services: estado y categoría',
+         Service.objects.filter(status='activo', category='gasfiteria'),
+         ['service_status_category_idx']),
+        ('requests: mis solicitudes',
+         Request.objects.filter(owner_id=user_id).order_by('-created_at'),
+         ['api_request_owner_id']),
+    ]
+
+
+class Command(BaseCommand):
+    help = "Ejecuta EXPLAIN ANALYZE sobre las consultas más usadas e informa si usan índice."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--verbose-plan", action="store_true", help="Imprime el plan completo de cada consulta")
+        parser.add_argument("--no-seqscan", action="store_true",
+                            help="Desactiva seq scan (útil con tablas pequeñas donde el planner prefiere recorrer todo)")
+
+    def handle(self, *args, **opts):
+        is_pg = connection.vendor == "postgresql"
+        if not is_pg:
+            self.stdout.write(self.style.WARNING(f"Motor {connection.vendor}: se usa EXPLAIN sin ANALYZE."))
+        missing = 0
+        with transaction.atomic():
+            if is_pg and opts["no_seqscan"]:
+                with connection.cursor() as cur:
+                    cur.execute("SET LOCAL enable_seqscan = off")
+            for label, qs, expected in hot_queries():
+                plan = qs.explain(analyze=True) if is_pg else qs.explain()
+                used = re.findall(r"(?:Index|Index Only|Bitmap Index) Scan (?:Backward )?(?:using|on) (\w+)", plan)
+                hit = [name for name in expected if any(u.startswith(name) for u in used)]
+                timing = re.search(r"Execution Time: ([\d.]+) ms", plan)
+                took = f" ({timing.group(1)} ms)" if timing else ""
+                if hit:
+                    self.stdout.write(self.style.SUCCESS(f"OK   {label}: usa {hit[0]}{took}"))
+                else:
+                    missing += 1
+                    detail = ", ".join(used) if used else "seq scan"
+                    self.stdout.write(self.style.WARNING(f"NO   {label}: {detail}{took}"))
+                if opts["verbose_plan"]:
+                    self.stdout.write(plan + "\n")
+        if missing:
+            self.stdout.write(self.style.WARNING(
+                f"{missing} consulta(s) sin el índice esperado. Con pocas filas el planner puede preferir seq scan; "
+                "prueba con --no-seqscan."))
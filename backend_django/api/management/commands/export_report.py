@@ -1,26 +1,44 @@
+import gzip
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 from datetime import datetime, timedelta
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
 from django.utils import timezone
+from django.utils.text import slugify
+from django.utils.dateparse import parse_date, parse_datetime
 
-from api.models import Request, Offer, Review, Service, Lead
-
-
-def fmt(n):
-    try:
-        return f"{float(n):,.0f}".replace(",", ".")
-    except Exception:
-        return str(n)
+from api import bi, extracts, reports
 
 
 class Command(BaseCommand):
-    help = "Genera un reporte (HTML y opcionalmente PDF) con KPIs del sistema."
+    help = ("Genera un reporte (HTML y opcionalmente PDF) con KPIs del sistema, uno por categoría/proveedor "
+            "(--per-category/--per-provider, en paralelo), o con --format csv|jsonl|parquet extractos crudos "
+            "de solicitudes, ofertas, leads y reseñas.")
 
     def add_arguments(self, parser):
         parser.add_argument("--outdir", default="reports", help="Carpeta de salida (por defecto: reports)")
         parser.add_argument("--days", type=int, default=30, help="Ventana de días para resumen temporal (default 30)")
+        group = parser.add_mutually_exclusive_group()
+        group.add_argument("--per-category", action="store_true", help="Un reporte por categoría")
+        group.add_argument("--per-provider", action="store_true", help="Un estado de cuenta por proveedor")
+        parser.add_argument("--workers", type=int, default=0,
+                            help="Procesos para --per-category/--per-provider (default: núcleos disponibles)")
+        parser.add_argument("--limit", type=int, default=0,
+                            help="Máximo de reportes (categorías con más solicitudes / proveedores con más ventas)")
+        parser.add_argument("--no-pdf", action="store_true", help="Solo HTML")
+        parser.add_argument("--refresh", action="store_true",
+                            help="Actualiza el esquema bi antes de leerlo (lo mismo que refresh_bi)")
+        parser.add_argument("--format", choices=("html", "csv", "jsonl", "parquet"), default="html",
+                            help="html: reporte de KPIs; csv/jsonl (gzip) o parquet (requiere pyarrow): extractos")
+        parser.add_argument("--tables", default=",".join(extracts.EXTRACTS),
+                            help="Extractos a generar, separados por coma (default: todos)")
+        parser.add_argument("--since", help="Solo filas creadas desde esta fecha (YYYY-MM-DD o ISO 8601)")
+        parser.add_argument("--chunk-size", type=int, default=extracts.DEFAULT_CHUNK_SIZE,
+                            help="Filas por viaje al cursor del servidor (y por row group en parquet)")
 
     def handle(self, *args, **opts):
         outdir = Path(opts["outdir"]).resolve()
@@ -29,108 +47,174 @@ class Command(BaseCommand):
         now = timezone.now()
         ts = now.strftime("%Y-%m-%d_%H%M")
 
+        if opts["format"] != "html":
+            self._extract(opts, outdir, ts)
+            return
+
+        # Todo sale del esquema bi (ver api.bi / refresh_bi); nada se agrega sobre las tablas api_*
+        if opts["refresh"]:
+            t0 = time.perf_counter()
+            bi.refresh()
+            self.stdout.write(f"bi actualizado ({time.perf_counter() - t0:.2f}s)")
+
+        acc = bi.acceptance()
+        generated = timezone.localtime(now).strftime("%Y-%m-%d %H:%M")
+        refreshed = timezone.localtime(acc["refreshed_at"]).strftime("%Y-%m-%d %H:%M") if acc["refreshed_at"] else "-"
+
+        if opts["per_category"] or opts["per_provider"]:
+            self._fan_out(opts, outdir, ts, generated, refreshed)
+            return
+
         # KPIs generales
-        total_requests = Request.objects.count()
-        by_status = (
-            Request.objects.values_list("status").order_by().annotate(cnt_count=__import__("django").db.models.Count("id"))
-        )
-        status_rows = [(s or "-", c) for s, c in by_status]
-
-        offers_total = Offer.objects.count()
-        offers_accepted = Offer.objects.filter(status="accepted").count()
-        acceptance_rate = (offers_accepted / offers_total * 100) if offers_total else 0
-
-        # Precio aceptado promedio
-        from django.db.models import Avg
-        avg_accepted_price = Offer.objects.filter(status="accepted").aggregate(avg=Avg("price")).get("avg") or 0
-
-        # Top 5 categorías por solicitudes
-        by_category = (
-            Request.objects.values_list("category").order_by().annotate(cnt_count=__import__("django").db.models.Count("id")).order_by("-cnt_count")[:5]
-        )
-        category_rows = [(c or "-", n) for c, n in by_category]
+        funnel = bi.funnel()
+        data = {
+            "total_requests": sum(r["requests"] for r in funnel),
+            "offers_total": acc["offers"],
+            "acceptance_rate": float(acc["acceptance_rate"]),
+            "avg_accepted_price": acc["avg_accepted_price"],
+            "status_rows": [(r["status"], r["requests"], r["with_offers"], r["with_accepted_offer"]) for r in funnel],
+            # Top 5 categorías por solicitudes
+            "category_rows": [(r["category"], r["requests"], r["offers_accepted"], r["avg_accepted_price"])
+                              for r in bi.categories(limit=5)],
+        }
 
         # Serie temporal últimos N días
         days = int(opts["days"]) or 30
         start = (now - timedelta(days=days)).date()
-        series = []
-        for d in (start + timedelta(days=i) for i in range(days + 1)):
-            c = Request.objects.filter(created_at__date=d).count()
-            series.append((d.isoformat(), c))
-
-        # Construir HTML
-        html = f"""
-<!doctype html>
-<html lang=\"es\">
-<head>
-  <meta charset=\"utf-8\" />
-  <title>Reporte Fixly - {ts}</title>
-  <style>
-    body {{ font-family: Arial, Helvetica, sans-serif; color:#1f2937; }}
-    .wrap {{ max-width: 900px; margin: 0 auto; padding: 24px; }}
-    h1 {{ font-size: 22px; margin: 0 0 12px; }}
-    h2 {{ font-size: 18px; margin: 24px 0 8px; }}
-    table {{ border-collapse: collapse; width: 100%; margin: 8px 0 16px; }}
-    th, td {{ border: 1px solid #e5e7eb; padding: 6px 8px; text-align: left; }}
-    th {{ background: #f3f4f6; font-weight: 600; }}
-    .kpis {{ display: grid; grid-template-columns: repeat(3,1fr); gap: 12px; margin: 12px 0 16px; }}
-    .card {{ border:1px solid #e5e7eb; border-radius:8px; padding:12px; background:#fafafa; }}
-    .muted {{ color:#6b7280; font-size:12px; }}
-  </style>
-  <meta name=\"viewport\" content=\"width=device-width, initial-scale=1\" />
-  <meta name=\"generator\" content=\"Django export_report\" />
-  <meta name=\"created\" content=\"{ts}\" />
-  <meta name=\"robots\" content=\"noindex\" />
-  <meta name=\"description\" content=\"Reporte automático de Fixly\" />
-  <meta charset=\"utf-8\" />
-  <meta http-equiv=\"Content-Type\" content=\"text/html; charset=utf-8\" />
-</head>
-<body>
-  <div class=\"wrap\">
-    <h1>Reporte automático — Fixly</h1>
-    <div class=\"muted\">Generado: {now.strftime('%Y-%m-%d %H:%M')}</div>
-
-    <div class=\"kpis\">
-      <div class=\"card\"><div>Total solicitudes</div><div><strong>{fmt(total_requests)}</strong></div></div>
-      <div class=\"card\"><div>Total ofertas</div><div><strong>{fmt(offers_total)}</strong></div></div>
-      <div class=\"card\"><div>Tasa aceptación</div><div><strong>{acceptance_rate:.1f}%</strong></div></div>
-    </div>
-
-    <h2>Solicitudes por estado</h2>
-    <table><thead><tr><th>Estado</th><th>Cantidad</th></tr></thead><tbody>
-      {''.join(f'<tr><td>{s}</td><td>{fmt(c)}</td></tr>' for s,c in status_rows)}
-    </tbody></table>
-
-    <h2>Precio aceptado promedio</h2>
-    <div class=\"card\">CLP <strong>{fmt(avg_accepted_price)}</strong></div>
-
-    <h2>Top 5 categorías por solicitudes</h2>
-    <table><thead><tr><th>Categoría</th><th>Cantidad</th></tr></thead><tbody>
-      {''.join(f'<tr><td>{c}</td><td>{fmt(n)}</td></tr>' for c,n in category_rows)}
-    </tbody></table>
-
-    <h2>Solicitudes por día (últimos {days} días)</h2>
-    <table><thead><tr><th>Fecha</th><th>Cantidad</th></tr></thead><tbody>
-      {''.join(f'<tr><td>{d}</td><td>{fmt(n)}</td></tr>' for d,n in series)}
-    </tbody></table>
-
-    <div class=\"muted\">Fuente: vistas bi.* o tablas api_*.</div>
-  </div>
-</body>
-</html>
-"""
-
-        html_path = outdir / f"report_{ts}.html"
-        html_path.write_text(html, encoding="utf-8")
-        self.stdout.write(self.style.SUCCESS(f"HTML generado: {html_path}"))
-
-        # Intentar PDF con WeasyPrint si está instalado
+        data["days"] = days
+        data["series"] = [(d.isoformat(), n) for d, n in bi.daily_series(start, timezone.localdate(now))]
+
+        result = reports.render_job({
+            "kind": "summary", "stem": str(outdir / f"report_{ts}"), "title": "Reporte automático — Fixly",
+            "data": data, "generated": generated, "refreshed": refreshed, "pdf": not opts["no_pdf"],
+        })
+        self.stdout.write(self.style.SUCCESS(f"HTML generado: {result['html']}"))
+        if result["pdf"]:
+            self.stdout.write(self.style.SUCCESS(f"PDF generado: {result['pdf']}"))
+        elif result["pdf_error"]:
+            self.stdout.write(self.style.WARNING(
+                f"PDF no generado (WeasyPrint no disponible o error: {result['pdf_error']}). Conservado HTML."))
+
+    def _fan_out(self, opts, outdir, ts, generated, refreshed):
+        """
+        Un reporte por categoría o por proveedor. Los datos salen de una sola lectura
+        de bi.category_stats / bi.provider_stats; el HTML y el PDF (lo caro) se generan
+        en un pool de procesos, así que escala con los núcleos.
+        """
+        if opts["per_category"]:
+            kind, rows = "category", bi.categories(limit=opts["limit"])
+            subdir = outdir / f"categories_{ts}"
+            names = [(f"Reporte por categoría — {r['category']}", slugify(r["category"]) or "sin-categoria") for r in rows]
+        else:
+            kind, rows = "provider", bi.providers(limit=opts["limit"])
+            subdir = outdir / f"providers_{ts}"
+            names = [(f"Estado de cuenta — {r['display_name']}",
+                      f"{slugify(r['username']) or 'proveedor'}-{str(r['provider_id'])[:8]}") for r in rows]
+        if not rows:
+            self.stdout.write(self.style.WARNING("No hay datos en bi.*; ejecuta refresh_bi"))
+            return
+        subdir.mkdir(parents=True, exist_ok=True)
+
+        jobs, used = [], set()
+        for row, (title, slug) in zip(rows, names):
+            # slugify puede juntar nombres distintos ("Gasfitería" / "gasfiteria")
+            stem, n = slug, 1
+            while stem in used:
+                n += 1
+                stem = f"{slug}-{n}"
+            used.add(stem)
+            jobs.append({"kind": kind, "stem": str(subdir / stem), "title": title, "data": row,
+                         "generated": generated, "refreshed": refreshed, "pdf": not opts["no_pdf"]})
+
+        workers = max(1, min(opts["workers"] or os.cpu_count() or 1, len(jobs)))
+        procs = f"{workers} proceso{'s' if workers > 1 else ''}"
+        self.stdout.write(f"{len(jobs)} reportes en {subdir} con {procs}")
+        t0 = time.perf_counter()
+        results = []
+        if workers == 1:
+            completed = map(reports.render_job, jobs)
+            pool = None
+        else:
+            # Los workers no usan la base de datos; no deben heredar la conexión abierta
+            connections.close_all()
+            pool = ProcessPoolExecutor(max_workers=workers)
+            completed = (f.result() for f in as_completed([pool.submit(reports.render_job, j) for j in jobs]))
         try:
-            from weasyprint import HTML
-            pdf_path = outdir / f"report_{ts}.pdf"
-            HTML(string=html, base_url=str(outdir)).write_pdf(target=str(pdf_path))
-            self.stdout.write(self.style.SUCCESS(f"PDF generado: {pdf_path}"))
-        except Exception as e:
+            for r in completed:
+                results.append(r)
+                pdf = f"pdf {r['pdf_s'] * 1000:.0f} ms" if r["pdf"] else "sin pdf"
+                self.stdout.write(f"  {r['title']}: html {r['html_s'] * 1000:.0f} ms, {pdf} (pid {r['pid']})")
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        wall = time.perf_counter() - t0
+
+        busy = sum(r["html_s"] + r["pdf_s"] for r in results)
+        slowest = max(results, key=lambda r: r["html_s"] + r["pdf_s"])
+        failed = [r for r in results if r["pdf_error"]]
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(results)} reportes en {wall:.2f}s (trabajo {busy:.2f}s, x{busy / wall if wall else 0:.1f} "
+            f"con {procs}); más lento: {slowest['title']} "
+            f"({(slowest['html_s'] + slowest['pdf_s']) * 1000:.0f} ms)"))
+        if failed:
             self.stdout.write(self.style.WARNING(
-                f"PDF no generado (WeasyPrint no disponible o error: {e}). Conservado HTML."))
-
+                f"{len(failed)} PDF no generados (WeasyPrint no disponible o error: {failed[0]['pdf_error']}). "
+                "Conservado HTML."))
+
+    def _extract(self, opts, outdir, ts):
+        kinds = [k.strip() for k in opts["tables"].split(",") if k.strip()]
+        unknown = [k for k in kinds if k not in extracts.EXTRACTS]
+        if unknown:
+            raise CommandError(f"Extracto desconocido: {', '.join(unknown)} (opciones: {', '.join(extracts.EXTRACTS)})")
+        since = self._parse_since(opts["since"]) if opts["since"] else None
+        fmt_ = opts["format"]
+        if fmt_ == "parquet":
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                raise CommandError("--format parquet requiere pyarrow (pip install pyarrow)")
+        chunk_size = max(1, opts["chunk_size"])
+
+        for kind in kinds:
+            t0 = time.perf_counter()
+            cols = extracts.columns(kind)
+            seen = {"rows": 0, "last": None}
+            created = cols.index("created_at")
+
+            def counted(rows):
+                for row in rows:
+                    seen["rows"] += 1
+                    seen["last"] = row[created]
+                    yield row
+
+            rows = counted(extracts.rows(extracts.queryset(kind, since), cols, chunk_size))
+            ext = {"csv": "csv.gz", "jsonl": "jsonl.gz", "parquet": "parquet"}[fmt_]
+            path = outdir / f"{kind}_{ts}.{ext}"
+            # Se escribe a .part y se renombra al final: nunca queda un extracto a medias con el nombre final
+            tmp = path.with_name(path.name + ".part")
+            try:
+                if fmt_ == "parquet":
+                    extracts.write_parquet(tmp, kind, rows, chunk_size)
+                else:
+                    encode = extracts.csv_chunks if fmt_ == "csv" else extracts.ndjson_chunks
+                    with gzip.open(tmp, "wt", encoding="utf-8", newline="", compresslevel=6) as f:
+                        for chunk in encode(cols, rows):
+                            f.write(chunk)
+                os.replace(tmp, path)
+            except BaseException:
+                tmp.unlink(missing_ok=True)
+                raise
+            self.stdout.write(self.style.SUCCESS(
+                f"{kind}: {seen['rows']} filas -> {path} ({path.stat().st_size / 1024:.0f} kB, "
+                f"{time.perf_counter() - t0:.2f}s)"))
+            if seen["last"] is not None:
+                self.stdout.write(f"  siguiente extracto incremental: --since {seen['last'].isoformat()} (incluido; deduplicar por id)")
+
+    def _parse_since(self, value):
+        dt = parse_datetime(value)
+        if dt is None:
+            d = parse_date(value)
+            if d is None:
+                raise CommandError(f"--since inválido: {value}")
+            dt = datetime.combine(d, datetime.min.time())
+        return timezone.make_aware(dt) if timezone.is_naive(dt) else dt
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from api import bi, kpis
+
+
+class Command(BaseCommand):
+    help = ("Actualiza el esquema bi: DailyKPI de forma incremental y las vistas materializadas "
+            "con REFRESH ... CONCURRENTLY (sin bloquear a quien las lee). Pensado para cron.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--no-concurrently", action="store_true",
+                            help="REFRESH normal: más rápido, pero bloquea las lecturas mientras dura")
+        parser.add_argument("--kpi-lookback", type=int, default=kpis.DEFAULT_LOOKBACK,
+                            help="Días ya guardados en DailyKPI que se vuelven a calcular (ofertas aceptadas tarde)")
+        parser.add_argument("--rebuild-kpis", action="store_true", help="Recalcula DailyKPI completo")
+
+    def handle(self, *args, **opts):
+        timings = bi.refresh(
+            concurrently=not opts["no_concurrently"],
+            full_kpis=opts["rebuild_kpis"],
+            lookback=opts["kpi_lookback"],
+        )
+        for name, seconds in timings:
+            self.stdout.write(f"{name}: {seconds:.2f}s")
+        self.stdout.write(self.style.SUCCESS(f"bi actualizado en {sum(s for _, s in timings):.2f}s"))
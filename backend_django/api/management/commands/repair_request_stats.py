@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.models import Request
+from api.offers import stats_queryset, repair
+
+
+class Command(BaseCommand):
+    help = "Recalcula accepted_offer, offer_count y last_activity_at de Request desde Offer/ChatMessage."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Solo informa diferencias, no escribe")
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **opts):
+        batch_size = max(1, opts["batch_size"])
+        fields = ["offer_count", "accepted_offer", "last_activity_at"]
+        scanned = fixed = 0
+        batch = []
+
+        def flush():
+            if batch and not opts["dry_run"]:
+                with transaction.atomic():
+                    Request.objects.bulk_update(batch, fields)
+            batch.clear()
+
+        qs = stats_queryset(Request.objects.only("id", "created_at", *fields)).order_by()
+        for obj in qs.iterator(chunk_size=batch_size):
+            scanned += 1
+            changed = repair(obj)
+            if not changed:
+                continue
+            fixed += 1
+            if opts["verbosity"] > 1:
+                self.stdout.write(f"{obj.pk}: {', '.join(changed)}")
+            batch.append(obj)
+            if len(batch) >= batch_size:
+                flush()
+        flush()
+
+        verb = "con diferencias" if opts["dry_run"] else "corregidas"
+        self.stdout.write(self.style.SUCCESS(f"{scanned} solicitudes revisadas, {fixed} {verb}."))
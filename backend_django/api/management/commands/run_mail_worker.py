@@ -0,0 +1,45 @@
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from api import mailer
+
+
+class Command(BaseCommand):
+    help = "Envía los correos pendientes de la bandeja de salida (EmailOutbox), con reintentos y backoff."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Procesa lo pendiente y termina")
+        parser.add_argument("--batch-size", type=int, default=100)
+        parser.add_argument("--idle-sleep", type=float, default=2.0, help="Segundos de espera cuando no hay correos")
+
+    def handle(self, *args, **opts):
+        self._stop = False
+        if not opts["once"]:
+            signal.signal(signal.SIGTERM, self._request_stop)
+            signal.signal(signal.SIGINT, self._request_stop)
+
+        sender = mailer.Sender()
+        total_sent = total_failed = 0
+        try:
+            while not self._stop:
+                close_old_connections()
+                rows = mailer.claim_batch(opts["batch_size"])
+                if rows:
+                    sent, failed = sender.send(rows)
+                    total_sent += sent
+                    total_failed += failed
+                    self.stdout.write(f"Lote: {sent} enviados, {failed} con error")
+                    continue
+                if opts["once"]:
+                    break
+                time.sleep(opts["idle_sleep"])
+        finally:
+            sender.close()
+        self.stdout.write(self.style.SUCCESS(f"Listo. Enviados: {total_sent}  con error: {total_failed}"))
+
+    def _request_stop(self, signum, frame):
+        # Termina el lote en curso y sale; lo reclamado y no enviado vuelve tras el lease
+        self._stop = True
@@ -0,0 +1,92 @@
+# Generated by Django 5.0.4 on 2026-10-18 19:57
+
+import django.core.validators
+from django.db import migrations, models
+
+
+def reject_duplicate_accepted(apps, schema_editor):
+    # Antes de la restricción parcial: deja solo la aceptada más reciente por solicitud
+    Offer = apps.get_model('api', 'Offer')
+    seen = set()
+    stale = []
+    for off in Offer.objects.filter(status='accepted').order_by('request_id', '-created_at').only('id', 'request_id'):
+        if off.request_id in seen:
+            stale.append(off.id)
+        seen.add(off.request_id)
+    if stale:
+        Offer.objects.filter(id__in=stale).update(status='rejected')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_constraints'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='offer',
+            name='price',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12, validators=[django.core.validators.MinValueValidator(0)]),
+        ),
+        migrations.AlterField(
+            model_name='request',
+            name='budget',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True, validators=[django.core.validators.MinValueValidator(0)]),
+        ),
+        migrations.AlterField(
+            model_name='review',
+            name='rating',
+            field=models.PositiveSmallIntegerField(validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(5)]),
+        ),
+        migrations.AlterField(
+            model_name='service',
+            name='price_from',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12, validators=[django.core.validators.MinValueValidator(0)]),
+        ),
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(fields=['request', 'ts'], name='chat_request_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lead',
+            index=models.Index(fields=['provider', '-created_at'], name='lead_provider_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='offer',
+            index=models.Index(fields=['request', 'status'], name='offer_request_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='request',
+            index=models.Index(fields=['-created_at', '-id'], name='request_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='request',
+            index=models.Index(fields=['status', '-created_at'], name='request_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='request',
+            index=models.Index(fields=['category', '-created_at'], name='request_category_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['to_user', '-created_at'], name='review_to_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='service',
+            index=models.Index(fields=['-created_at'], name='service_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='service',
+            index=models.Index(fields=['owner', '-created_at'], name='service_owner_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='service',
+            index=models.Index(fields=['status', 'category'], name='service_status_category_idx'),
+        ),
+        migrations.RunPython(reject_duplicate_accepted, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='offer',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'accepted')), fields=('request',), name='uniq_offer_accepted_per_req'),
+        ),
+    ]
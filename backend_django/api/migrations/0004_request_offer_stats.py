@@ -0,0 +1,53 @@
+# Generated by Django 5.0.4 on 2026-10-18 19:58
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def backfill(apps, schema_editor):
+    Request = apps.get_model('api', 'Request')
+    Offer = apps.get_model('api', 'Offer')
+    ChatMessage = apps.get_model('api', 'ChatMessage')
+    counts = dict(Offer.objects.values_list('request_id').annotate(c=Count('id')).order_by())
+    last_offer = dict(Offer.objects.values_list('request_id').annotate(m=Max('created_at')).order_by())
+    last_msg = dict(ChatMessage.objects.values_list('request_id').annotate(m=Max('ts')).order_by())
+    accepted = dict(Offer.objects.filter(status='accepted').values_list('request_id', 'id'))
+    batch = []
+    for req in Request.objects.only('id', 'created_at').iterator(chunk_size=1000):
+        req.offer_count = counts.get(req.id, 0)
+        req.accepted_offer_id = accepted.get(req.id)
+        req.last_activity_at = max(t for t in (req.created_at, last_offer.get(req.id), last_msg.get(req.id)) if t)
+        batch.append(req)
+        if len(batch) >= 1000:
+            Request.objects.bulk_update(batch, ['offer_count', 'accepted_offer', 'last_activity_at'])
+            batch = []
+    if batch:
+        Request.objects.bulk_update(batch, ['offer_count', 'accepted_offer', 'last_activity_at'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='request',
+            name='accepted_offer',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='api.offer'),
+        ),
+        migrations.AddField(
+            model_name='request',
+            name='last_activity_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='request',
+            name='offer_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,97 @@
+# Generated by Django 5.0.4 on 2026-10-18 20:02
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations, transaction
+
+
+# Configuración de búsqueda en español; con la extensión unaccent ignora tildes.
+SEARCH_CONFIG = 'fixly_es'
+
+# (tabla, columnas con su peso)
+SEARCH_TABLES = {
+    'api_request': (('title', 'A'), ('category', 'B'), ('location', 'C'), ('description', 'D')),
+    'api_service': (('title', 'A'), ('category', 'B'), ('location', 'C'), ('description', 'D')),
+}
+
+
+def create_search_config(apps, schema_editor):
+    with schema_editor.connection.cursor() as cur:
+        cur.execute("SELECT 1 FROM pg_ts_config WHERE cfgname = %s", [SEARCH_CONFIG])
+        if cur.fetchone():
+            return
+        cur.execute(f"CREATE TEXT SEARCH CONFIGURATION {SEARCH_CONFIG} (COPY = pg_catalog.spanish)")
+        try:
+            with transaction.atomic(using=schema_editor.connection.alias):
+                cur.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+        except Exception:
+            # Sin permisos o sin contrib: se mantiene el stemming en español sin unaccent.
+            # search.ensure_unaccent (post_migrate) avisa y lo agrega cuando esté disponible.
+            return
+        cur.execute(
+            f"ALTER TEXT SEARCH CONFIGURATION {SEARCH_CONFIG} "
+            "ALTER MAPPING FOR hword, hword_part, word WITH unaccent, spanish_stem"
+        )
+
+
+def drop_search_config(apps, schema_editor):
+    schema_editor.execute(f"DROP TEXT SEARCH CONFIGURATION IF EXISTS {SEARCH_CONFIG}")
+
+
+def _trigger_sql(table, columns):
+    vector = ' || '.join(
+        f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(NEW.{col}, '')), '{weight}')"
+        for col, weight in columns
+    )
+    cols = ', '.join(col for col, _ in columns)
+    return f"""
+        CREATE FUNCTION {table}_search_update() RETURNS trigger AS $$
+        BEGIN
+            NEW.search_vector := {vector};
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql;
+        CREATE TRIGGER {table}_search_update
+            BEFORE INSERT OR UPDATE OF {cols} ON {table}
+            FOR EACH ROW EXECUTE FUNCTION {table}_search_update();
+        UPDATE {table} SET title = title;
+    """
+
+
+def _drop_trigger_sql(table):
+    return f"""
+        DROP TRIGGER IF EXISTS {table}_search_update ON {table};
+        DROP FUNCTION IF EXISTS {table}_search_update();
+    """
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_request_offer_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='request',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='service',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='request',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='request_search_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='service',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='service_search_idx'),
+        ),
+        migrations.RunPython(create_search_config, drop_search_config),
+    ] + [
+        migrations.RunSQL(_trigger_sql(table, columns), _drop_trigger_sql(table))
+        for table, columns in SEARCH_TABLES.items()
+    ]
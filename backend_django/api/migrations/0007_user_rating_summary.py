@@ -0,0 +1,47 @@
+# Generated by Django 5.0.4 on 2026-10-18 20:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def backfill(apps, schema_editor):
+    Review = apps.get_model('api', 'Review')
+    UserRatingSummary = apps.get_model('api', 'UserRatingSummary')
+    rows = (
+        Review.objects.values('to_user').order_by()
+        .annotate(
+            count=Count('id'),
+            total=Sum('rating'),
+            **{f'stars_{s}': Count('id', filter=Q(rating=s)) for s in range(1, 6)},
+        )
+    )
+    UserRatingSummary.objects.bulk_create(
+        [UserRatingSummary(user_id=row.pop('to_user'), **row) for row in rows], batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_email_outbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserRatingSummary',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='rating_summary', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('stars_1', models.PositiveIntegerField(default=0)),
+                ('stars_2', models.PositiveIntegerField(default=0)),
+                ('stars_3', models.PositiveIntegerField(default=0)),
+                ('stars_4', models.PositiveIntegerField(default=0)),
+                ('stars_5', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.0.4 on 2026-10-18 20:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_user_rating_summary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyKPI',
+            fields=[
+                ('day', models.DateField(primary_key=True, serialize=False)),
+                ('requests', models.PositiveIntegerField(default=0)),
+                ('offers', models.PositiveIntegerField(default=0)),
+                ('offers_accepted', models.PositiveIntegerField(default=0)),
+                ('accepted_price_total', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('services', models.PositiveIntegerField(default=0)),
+                ('leads', models.PositiveIntegerField(default=0)),
+                ('reviews', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='lead',
+            index=models.Index(fields=['created_at'], name='lead_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='offer',
+            index=models.Index(fields=['created_at'], name='offer_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['created_at'], name='review_created_idx'),
+        ),
+    ]
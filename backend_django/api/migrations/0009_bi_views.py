@@ -0,0 +1,79 @@
+from django.db import migrations
+
+
+# Vistas materializadas para reportes (las lee api.bi y las actualiza `manage.py refresh_bi`).
+# Cada una tiene un índice único: REFRESH ... CONCURRENTLY lo exige y así los lectores
+# nunca quedan bloqueados mientras se recalculan.
+BI_SQL = """
+CREATE SCHEMA IF NOT EXISTS bi;
+
+CREATE MATERIALIZED VIEW bi.request_funnel AS
+SELECT coalesce(nullif(status, ''), '-') AS status,
+       count(*) AS requests,
+       count(*) FILTER (WHERE offer_count > 0) AS with_offers,
+       count(*) FILTER (WHERE accepted_offer_id IS NOT NULL) AS with_accepted_offer,
+       now() AS refreshed_at
+FROM api_request
+GROUP BY 1;
+CREATE UNIQUE INDEX request_funnel_status_uniq ON bi.request_funnel (status);
+
+CREATE MATERIALIZED VIEW bi.offer_acceptance AS
+SELECT 1 AS id,
+       count(*) AS offers,
+       count(*) FILTER (WHERE status = 'accepted') AS accepted,
+       count(*) FILTER (WHERE status = 'rejected') AS rejected,
+       count(*) FILTER (WHERE status = 'pending') AS pending,
+       coalesce(round(100.0 * count(*) FILTER (WHERE status = 'accepted') / nullif(count(*), 0), 2), 0) AS acceptance_rate,
+       coalesce(avg(price) FILTER (WHERE status = 'accepted'), 0) AS avg_accepted_price,
+       now() AS refreshed_at
+FROM api_offer;
+CREATE UNIQUE INDEX offer_acceptance_id_uniq ON bi.offer_acceptance (id);
+
+CREATE MATERIALIZED VIEW bi.category_stats AS
+WITH req AS (
+    SELECT coalesce(nullif(category, ''), '-') AS category, count(*) AS requests
+    FROM api_request
+    GROUP BY 1
+), off AS (
+    SELECT coalesce(nullif(r.category, ''), '-') AS category,
+           count(*) AS offers,
+           count(*) FILTER (WHERE o.status = 'accepted') AS offers_accepted,
+           avg(o.price) FILTER (WHERE o.status = 'accepted') AS avg_accepted_price
+    FROM api_offer o
+    JOIN api_request r ON r.id = o.request_id
+    GROUP BY 1
+)
+SELECT req.category,
+       req.requests,
+       coalesce(off.offers, 0) AS offers,
+       coalesce(off.offers_accepted, 0) AS offers_accepted,
+       coalesce(off.avg_accepted_price, 0) AS avg_accepted_price,
+       now() AS refreshed_at
+FROM req
+LEFT JOIN off USING (category);
+CREATE UNIQUE INDEX category_stats_category_uniq ON bi.category_stats (category);
+
+-- Volúmenes diarios: api_dailykpi ya se mantiene incrementalmente (api.kpis), basta una vista
+CREATE VIEW bi.daily_volume AS
+SELECT day, requests, offers, offers_accepted, accepted_price_total, services, leads, reviews
+FROM api_dailykpi;
+"""
+
+DROP_SQL = """
+DROP VIEW IF EXISTS bi.daily_volume;
+DROP MATERIALIZED VIEW IF EXISTS bi.category_stats;
+DROP MATERIALIZED VIEW IF EXISTS bi.offer_acceptance;
+DROP MATERIALIZED VIEW IF EXISTS bi.request_funnel;
+DROP SCHEMA IF EXISTS bi;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_daily_kpi'),
+    ]
+
+    operations = [
+        migrations.RunSQL(BI_SQL, DROP_SQL),
+    ]
@@ -0,0 +1,61 @@
+from django.db import migrations
+
+
+# Una fila por proveedor (con ofertas, leads o servicios) para los estados de cuenta
+# de `export_report --per-provider`; la actualiza refresh_bi junto con el resto de bi.*
+PROVIDER_STATS_SQL = """
+CREATE MATERIALIZED VIEW bi.provider_stats AS
+WITH off AS (
+    SELECT provider_id,
+           count(*) AS offers,
+           count(*) FILTER (WHERE status = 'accepted') AS offers_accepted,
+           coalesce(sum(price) FILTER (WHERE status = 'accepted'), 0) AS accepted_total,
+           avg(price) FILTER (WHERE status = 'accepted') AS avg_accepted_price
+    FROM api_offer
+    GROUP BY provider_id
+), ld AS (
+    SELECT provider_id, count(*) AS leads
+    FROM api_lead
+    GROUP BY provider_id
+), sv AS (
+    SELECT owner_id AS provider_id, count(*) AS services
+    FROM api_service
+    GROUP BY owner_id
+), ids AS (
+    SELECT provider_id FROM off
+    UNION SELECT provider_id FROM ld
+    UNION SELECT provider_id FROM sv
+)
+SELECT ids.provider_id,
+       u.username,
+       coalesce(nullif(p.display_name, ''), u.username) AS display_name,
+       coalesce(off.offers, 0) AS offers,
+       coalesce(off.offers_accepted, 0) AS offers_accepted,
+       coalesce(round(100.0 * off.offers_accepted / nullif(off.offers, 0), 2), 0) AS acceptance_rate,
+       coalesce(off.accepted_total, 0) AS accepted_total,
+       coalesce(off.avg_accepted_price, 0) AS avg_accepted_price,
+       coalesce(ld.leads, 0) AS leads,
+       coalesce(sv.services, 0) AS services,
+       coalesce(rs.count, 0) AS rating_count,
+       coalesce(round(rs.total::numeric / nullif(rs.count, 0), 2), 0) AS rating_avg,
+       now() AS refreshed_at
+FROM ids
+JOIN api_user u ON u.id = ids.provider_id
+LEFT JOIN api_profile p ON p.user_id = u.id
+LEFT JOIN off USING (provider_id)
+LEFT JOIN ld USING (provider_id)
+LEFT JOIN sv USING (provider_id)
+LEFT JOIN api_userratingsummary rs ON rs.user_id = ids.provider_id;
+CREATE UNIQUE INDEX provider_stats_provider_uniq ON bi.provider_stats (provider_id);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_bi_views'),
+    ]
+
+    operations = [
+        migrations.RunSQL(PROVIDER_STATS_SQL, "DROP MATERIALIZED VIEW IF EXISTS bi.provider_stats;"),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.0.4 on 2026-10-18 20:44
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_bi_provider_stats'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='request',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+        # Filas creadas con last_activity_at unos microsegundos antes que created_at
+        migrations.RunSQL(
+            "UPDATE api_request SET last_activity_at = created_at WHERE last_activity_at < created_at;",
+            migrations.RunSQL.noop,
+        ),
+    ]
@@ -1,5 +1,9 @@
 import uuid
 from django.db import models
+from django.db.models import Q
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.utils import timezone
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.contrib.auth.models import AbstractUser
 
@@ -30,7 +34,33 @@ class Request(models.Model):
     status = models.CharField(max_length=20, default='pendiente')
     budget = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True,
                                  validators=[MinValueValidator(0)])
-    created_at = models.DateTimeField(auto_now_add=True)
+    # default (no auto_now_add): así save() puede copiarlo a last_activity_at al crear
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
+    # Desnormalizados: se mantienen en api.offers (ver repair_request_stats)
+    accepted_offer = models.ForeignKey('Offer', on_delete=models.SET_NULL, null=True, blank=True,
+                                       related_name='+')
+    offer_count = models.PositiveIntegerField(default=0)
+    last_activity_at = models.DateTimeField(default=timezone.now)
+    # Lo mantiene un trigger de Postgres (migración 0005); ver api.search
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='request_created_id_idx'),
+            models.Index(fields=['status', '-created_at'], name='request_status_created_idx'),
+            models.Index(fields=['category', '-created_at'], name='request_category_created_idx'),
+            GinIndex(fields=['search_vector'], name='request_search_idx'),
+        ]
+        constraints = [
+            models.CheckConstraint(check=Q(budget__isnull=True) | Q(budget__gte=0), name='request_budget_gte_0_or_null'),
+        ]
+
+    def save(self, *args, **kwargs):
+        # Una solicitud nueva no puede tener actividad anterior a su creación
+        # (repair() la daría por desfasada)
+        if self._state.adding and self.last_activity_at < self.created_at:
+            self.last_activity_at = self.created_at
+        super().save(*args, **kwargs)
 
 
 class Offer(models.Model):
@@ -43,6 +73,19 @@ class Offer(models.Model):
     status = models.CharField(max_length=20, default='pending')  # pending|accepted|rejected
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['request', 'status'], name='offer_request_status_idx'),
+            models.Index(fields=['created_at'], name='offer_created_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=('request', 'provider'), name='uniq_offer_request_provider'),
+            models.CheckConstraint(check=Q(price__gte=0), name='offer_price_gte_0'),
+            # Como máximo una oferta aceptada por solicitud
+            models.UniqueConstraint(fields=('request',), condition=Q(status='accepted'),
+                                    name='uniq_offer_accepted_per_req'),
+        ]
+
 
 class Service(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -55,6 +98,18 @@ class Service(models.Model):
     description = models.TextField(blank=True)
     status = models.CharField(max_length=20, default='activo')
     created_at = models.DateTimeField(auto_now_add=True)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at'], name='service_created_idx'),
+            models.Index(fields=['owner', '-created_at'], name='service_owner_created_idx'),
+            models.Index(fields=['status', 'category'], name='service_status_category_idx'),
+            GinIndex(fields=['search_vector'], name='service_search_idx'),
+        ]
+        constraints = [
+            models.CheckConstraint(check=Q(price_from__gte=0), name='service_price_from_gte_0'),
+        ]
 
 
 class Lead(models.Model):
@@ -67,6 +122,12 @@ class Lead(models.Model):
     status = models.CharField(max_length=20, default='nuevo')
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['provider', '-created_at'], name='lead_provider_created_idx'),
+            models.Index(fields=['created_at'], name='lead_created_idx'),
+        ]
+
 
 class ChatMessage(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -76,6 +137,11 @@ class ChatMessage(models.Model):
     text = models.TextField()
     ts = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['request', 'ts'], name='chat_request_ts_idx'),
+        ]
+
 
 class Review(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -85,3 +151,65 @@ class Review(models.Model):
     rating = models.PositiveSmallIntegerField(validators=[MinValueValidator(1), MaxValueValidator(5)])
     comment = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['to_user', '-created_at'], name='review_to_user_created_idx'),
+            models.Index(fields=['created_at'], name='review_created_idx'),
+        ]
+        constraints = [
+            models.CheckConstraint(check=Q(rating__gte=1) & Q(rating__lte=5), name='review_rating_between_1_5'),
+        ]
+
+
+class UserRatingSummary(models.Model):
+    """Agregado de las reseñas recibidas por un usuario; lo mantiene api.ratings."""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='rating_summary')
+    count = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(default=0)
+    stars_1 = models.PositiveIntegerField(default=0)
+    stars_2 = models.PositiveIntegerField(default=0)
+    stars_3 = models.PositiveIntegerField(default=0)
+    stars_4 = models.PositiveIntegerField(default=0)
+    stars_5 = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def avg(self):
+        return self.total / self.count if self.count else 0.0
+
+
+class EmailOutbox(models.Model):
+    """Correos pendientes de envío; los despacha `manage.py run_mail_worker` (api.mailer)."""
+    to_email = models.EmailField()
+    subject = models.CharField(max_length=255)
+    text = models.TextField()
+    html = models.TextField(blank=True)
+    status = models.CharField(max_length=10, default='pending')  # pending|sent|dead
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['next_attempt_at'], name='outbox_pending_due_idx', condition=Q(status='pending')),
+        ]
+
+
+class DailyKPI(models.Model):
+    """
+    Contadores por día (fecha de creación, zona TIME_ZONE) para export_report.
+    Los recalcula api.kpis.refresh de forma incremental.
+    """
+    day = models.DateField(primary_key=True)
+    requests = models.PositiveIntegerField(default=0)
+    offers = models.PositiveIntegerField(default=0)
+    # Ofertas creadas ese día que hoy están aceptadas, y la suma de sus precios
+    offers_accepted = models.PositiveIntegerField(default=0)
+    accepted_price_total = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    services = models.PositiveIntegerField(default=0)
+    leads = models.PositiveIntegerField(default=0)
+    reviews = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
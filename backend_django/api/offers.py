@@ -0,0 +1,130 @@
+"""
+Cambios de estado de ofertas que además mantienen los campos desnormalizados
+de Request (accepted_offer, offer_count, last_activity_at).
+Vistas y admin deben pasar por aquí en vez de actualizar Offer directamente.
+"""
+from django.db import transaction
+from django.db.models import Case, Count, F, OuterRef, Q, Subquery, Max, Value, When
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from .models import Request, Offer, ChatMessage
+
+
+def save_offer(req, provider, message, price):
+    """Crea o actualiza la oferta del proveedor. Devuelve (offer, created)."""
+    now = timezone.now()
+    with transaction.atomic():
+        off = req.offers.filter(provider=provider).first()
+        if off:
+            off.message = message if message is not None else off.message
+            off.price = (price if price is not None else off.price) or 0
+            off.status = 'accepted' if off.status == 'accepted' else 'pending'
+            off.save()
+            Request.objects.filter(pk=req.pk).update(last_activity_at=now)
+            return off, False
+        off = Offer.objects.create(request=req, provider=provider, message=message or '', price=price or 0)
+        Request.objects.filter(pk=req.pk).update(offer_count=F('offer_count') + 1, last_activity_at=now)
+        return off, True
+
+
+def accept_offer(request_id, offer_id):
+    """
+    Acepta offer_id y rechaza el resto de ofertas de la solicitud.
+    La fila de Request se bloquea (select_for_update) para serializar aceptaciones
+    concurrentes. Lanza Offer.DoesNotExist si la oferta no pertenece a la solicitud.
+    Devuelve un dict con la transición aplicada.
+    """
+    with transaction.atomic():
+        req = Request.objects.select_for_update().get(pk=request_id)
+        if not Offer.objects.filter(pk=offer_id, request_id=req.pk).exists():
+            raise Offer.DoesNotExist(offer_id)
+        previous = req.accepted_offer_id
+        # El índice único parcial se valida fila a fila: se libera primero la aceptada anterior
+        # (usa uniq_offer_accepted_per_req, a lo más una fila)
+        released = req.offers.filter(status='accepted').exclude(pk=offer_id).update(status='rejected')
+        # Un solo UPDATE para el resto, tocando solo las filas que cambian de estado
+        changed = req.offers.filter(
+            (Q(pk=offer_id) & ~Q(status='accepted')) | (~Q(pk=offer_id) & ~Q(status='rejected'))
+        ).update(status=Case(When(pk=offer_id, then=Value('accepted')), default=Value('rejected')))
+        old_status = req.status
+        req.accepted_offer_id = offer_id
+        req.last_activity_at = timezone.now()
+        fields = ['accepted_offer', 'last_activity_at']
+        if req.status == 'pendiente':
+            req.status = 'en_progreso'
+            fields.append('status')
+        req.save(update_fields=fields)
+    return {
+        'request': str(req.pk),
+        'accepted': str(offer_id),
+        'previous': str(previous) if previous else None,
+        'changed': previous != offer_id,
+        'offers_updated': released + changed,
+        'status': [old_status, req.status],
+    }
+
+
+@transaction.atomic
+def reject_offers(offers):
+    """
+    Rechaza un queryset de ofertas. Donde se rechaza la oferta aceptada se limpia
+    accepted_offer y la solicitud vuelve a 'pendiente' si estaba 'en_progreso'
+    (deshace la transición de accept_offer).
+    """
+    ids = list(offers.values_list('pk', flat=True))
+    Offer.objects.filter(pk__in=ids).update(status='rejected')
+    Request.objects.filter(accepted_offer_id__in=ids).update(
+        accepted_offer=None,
+        status=Case(When(status='en_progreso', then=Value('pendiente')), default=F('status')),
+    )
+    Request.objects.filter(offers__pk__in=ids).update(last_activity_at=timezone.now())
+
+
+def offer_deleted(sender, instance, **kwargs):
+    """
+    post_delete de Offer (admin, inline o cascada al borrar el proveedor): descuenta
+    offer_count y, si era la aceptada, deshace la transición de accept_offer.
+    accepted_offer ya lo deja en NULL el on_delete=SET_NULL antes de esta señal.
+    """
+    changes = {'offer_count': Greatest(F('offer_count') - 1, 0)}
+    if instance.status == 'accepted':
+        changes['accepted_offer'] = Case(When(accepted_offer_id=instance.pk, then=None), default=F('accepted_offer'))
+        changes['status'] = Case(When(status='en_progreso', then=Value('pendiente')), default=F('status'))
+    Request.objects.filter(pk=instance.request_id).update(**changes)
+
+
+def touch(request_id):
+    Request.objects.filter(pk=request_id).update(last_activity_at=timezone.now())
+
+
+def stats_queryset(qs=None):
+    """Anota cada solicitud con los valores reales calculados desde Offer/ChatMessage."""
+    qs = Request.objects.all() if qs is None else qs
+    offers = Offer.objects.filter(request=OuterRef('pk')).order_by()
+    return qs.annotate(
+        real_offer_count=Coalesce(Subquery(offers.values('request').annotate(c=Count('pk')).values('c')), 0),
+        real_accepted_id=Subquery(offers.filter(status='accepted').order_by('-created_at').values('pk')[:1]),
+        last_offer_at=Subquery(offers.values('request').annotate(m=Max('created_at')).values('m')),
+        last_message_at=Subquery(
+            ChatMessage.objects.filter(request=OuterRef('pk')).order_by()
+            .values('request').annotate(m=Max('ts')).values('m')
+        ),
+    )
+
+
+def repair(obj):
+    """Corrige en memoria los campos desnormalizados. Devuelve la lista de campos cambiados."""
+    changed = []
+    if obj.offer_count != obj.real_offer_count:
+        obj.offer_count = obj.real_offer_count
+        changed.append('offer_count')
+    if obj.accepted_offer_id != obj.real_accepted_id:
+        obj.accepted_offer_id = obj.real_accepted_id
+        changed.append('accepted_offer')
+    # Aceptar/rechazar también cuentan como actividad y no dejan rastro; solo se avanza
+    latest = max(t for t in (obj.created_at, obj.last_offer_at, obj.last_message_at) if t is not None)
+    if obj.last_activity_at is None or obj.last_activity_at < latest:
+        obj.last_activity_at = latest
+        changed.append('last_activity_at')
+    return changed
@@ -0,0 +1,170 @@
+"""
+Cliente de Ollama para el asistente.
+
+- chat() / embed(): síncronos, con una requests.Session por proceso (keep-alive, sin
+  handshake TCP por llamada; sin requests cae a urllib). Lo usa POST /api/assistant/chat.
+- stream_chat(): asíncrono (httpx.AsyncClient, un cliente por event loop) que va
+  entregando los tokens a medida que Ollama los genera (NDJSON con stream=True).
+  Lo usa POST /api/assistant/chat/stream bajo ASGI.
+
+Las generaciones concurrentes se limitan con un semáforo por event loop
+(ASSISTANT_MAX_CONCURRENCY): Ollama procesa pocas a la vez y encolar más solo
+alarga el tiempo al primer token de todas. Si no hay cupo en
+ASSISTANT_QUEUE_TIMEOUT segundos se lanza Busy y la vista responde 503.
+"""
+import asyncio
+import json
+import threading
+import weakref
+
+from django.conf import settings
+
+try:
+    import requests as _requests
+    from requests.adapters import HTTPAdapter
+except Exception:  # fallback mínimo con urllib
+    _requests = None
+    import urllib.error as _urlerr
+    import urllib.request as _urlreq
+
+try:
+    import httpx
+except Exception:  # sin httpx no hay endpoint de streaming
+    httpx = None
+
+
+class OllamaError(RuntimeError):
+    pass
+
+
+class Busy(Exception):
+    pass
+
+
+def _url(path):
+    return f"{settings.OLLAMA_BASE_URL.rstrip('/')}{path}"
+
+
+def chat_payload(messages, model=None, temperature=0.2, stream=False):
+    return {
+        'model': model or settings.OLLAMA_MODEL,
+        'messages': messages,
+        'stream': stream,
+        'keep_alive': settings.OLLAMA_KEEP_ALIVE,
+        'options': {
+            'temperature': temperature,
+            'num_predict': settings.OLLAMA_NUM_PREDICT,
+            'num_thread': settings.OLLAMA_THREADS,
+        },
+    }
+
+
+# ---- síncrono ----
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def session():
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                s = _requests.Session()
+                s.mount('http://', HTTPAdapter(pool_maxsize=settings.ASSISTANT_MAX_CONCURRENCY * 2))
+                s.mount('https://', HTTPAdapter(pool_maxsize=settings.ASSISTANT_MAX_CONCURRENCY * 2))
+                _session = s
+    return _session
+
+
+def _post_json(path, payload, timeout, base_url=None):
+    url = f"{(base_url or settings.OLLAMA_BASE_URL).rstrip('/')}{path}"
+    if _requests is None:
+        req = _urlreq.Request(url, data=json.dumps(payload).encode('utf-8'), headers={'Content-Type': 'application/json'})
+        try:
+            with _urlreq.urlopen(req, timeout=timeout) as resp:
+                return json.loads(resp.read().decode('utf-8'))
+        except _urlerr.HTTPError as e:
+            raise OllamaError(f'Ollama {e.code}')
+        except (_urlerr.URLError, OSError) as e:
+            raise OllamaError(f'No se pudo conectar a Ollama: {e}')
+    try:
+        r = session().post(url, json=payload, timeout=timeout)
+    except _requests.exceptions.RequestException as e:
+        raise OllamaError(f'No se pudo conectar a Ollama: {e}')
+    if not r.ok:
+        raise OllamaError(f'Ollama {r.status_code}')
+    return r.json()
+
+
+def embed(texts, model=None, timeout=None, base_url=None):
+    """Embeddings de una lista de textos en una sola llamada (/api/embed acepta input como lista)."""
+    texts = list(texts)
+    data = _post_json(
+        '/api/embed',
+        {'model': model or settings.OLLAMA_EMBED_MODEL, 'input': texts, 'keep_alive': settings.OLLAMA_KEEP_ALIVE},
+        timeout or settings.OLLAMA_TIMEOUT,
+        base_url,
+    )
+    vectors = data.get('embeddings') or []
+    if len(vectors) != len(texts):
+        raise OllamaError('Ollama devolvió una cantidad inesperada de embeddings')
+    return vectors
+
+
+def chat(messages, model=None, temperature=0.2, timeout=None):
+    """Respuesta completa (stream=False). Lanza OllamaError."""
+    data = _post_json('/api/chat', chat_payload(messages, model, temperature), timeout or settings.OLLAMA_TIMEOUT)
+    return data.get('message', {}).get('content') or ''
+
+
+# ---- asíncrono ----
+
+_loops = weakref.WeakKeyDictionary()
+
+
+def _loop_state():
+    """(cliente, semáforo) del event loop actual; ni httpx ni asyncio.Semaphore se comparten entre loops."""
+    loop = asyncio.get_running_loop()
+    state = _loops.get(loop)
+    if state is None:
+        if httpx is None:
+            raise OllamaError('Falta la dependencia httpx')
+        limits = httpx.Limits(max_connections=settings.ASSISTANT_MAX_CONCURRENCY * 2, max_keepalive_connections=settings.ASSISTANT_MAX_CONCURRENCY)
+        timeout = httpx.Timeout(settings.OLLAMA_TIMEOUT, connect=5.0)
+        state = (httpx.AsyncClient(limits=limits, timeout=timeout), asyncio.Semaphore(settings.ASSISTANT_MAX_CONCURRENCY))
+        _loops[loop] = state
+    return state
+
+
+async def acquire_slot():
+    """Reserva un cupo de generación. Lanza Busy si no se libera a tiempo."""
+    _, sem = _loop_state()
+    try:
+        await asyncio.wait_for(sem.acquire(), timeout=settings.ASSISTANT_QUEUE_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise Busy()
+    return sem
+
+
+async def stream_chat(messages, model=None, temperature=0.2):
+    """Genera los fragmentos de texto a medida que llegan. Lanza OllamaError."""
+    client, _ = _loop_state()
+    payload = chat_payload(messages, model, temperature, stream=True)
+    try:
+        async with client.stream('POST', _url('/api/chat'), json=payload) as resp:
+            if resp.status_code >= 400:
+                raise OllamaError(f'Ollama {resp.status_code}')
+            async for line in resp.aiter_lines():
+                if not line:
+                    continue
+                data = json.loads(line)
+                if data.get('error'):
+                    raise OllamaError(data['error'])
+                text = data.get('message', {}).get('content') or ''
+                if text:
+                    yield text
+                if data.get('done'):
+                    break
+    except httpx.HTTPError as e:
+        raise OllamaError(f'No se pudo conectar a Ollama: {e}')
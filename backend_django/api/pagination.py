@@ -0,0 +1,56 @@
+import base64
+import uuid
+from datetime import datetime
+
+from django.db.models import Q
+
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(created_at, pk):
+    raw = f"{created_at.isoformat()}|{pk}".encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Devuelve (created_at, id) a partir de un cursor opaco."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8')
+        ts, pk = raw.split('|', 1)
+        return datetime.fromisoformat(ts), uuid.UUID(pk)
+    except Exception:
+        raise InvalidCursor(cursor)
+
+
+def page_size(value, default=DEFAULT_PAGE_SIZE):
+    try:
+        n = int(value)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(n, MAX_PAGE_SIZE))
+
+
+def keyset_page(qs, cursor=None, limit=DEFAULT_PAGE_SIZE, field='created_at'):
+    """
+    Paginación por cursor sobre (field, id) descendente.
+    Siempre hace una sola consulta (limit + 1 filas) sin importar la profundidad.
+    Devuelve (items, next_cursor).
+    """
+    qs = qs.order_by(f'-{field}', '-id')
+    if cursor:
+        ts, pk = decode_cursor(cursor)
+        qs = qs.filter(Q(**{f'{field}__lt': ts}) | Q(**{field: ts, 'id__lt': pk}))
+    items = list(qs[:limit + 1])
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        last = items[-1]
+        next_cursor = encode_cursor(getattr(last, field), last.pk)
+    return items, next_cursor
@@ -0,0 +1,71 @@
+"""
+Caché de perfiles (rol y datos visibles) para no hacer Profile.get_or_create
+en cada escritura.
+
+Dos niveles:
+- por request: se memoriza en el objeto user (vive lo que dura la request);
+- por proceso/compartido: django.core.cache con TTL PROFILE_CACHE_TTL.
+  El rol se usa para autorizar (views._role_of), así que la invalidación tiene que
+  llegar a todos los workers: fuera de DEBUG se exige caché compartida (REDIS_URL,
+  ver authentication.check_shared_cache). Con LocMem otro worker puede seguir usando
+  el rol anterior hasta PROFILE_CACHE_TTL segundos.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import User, Profile
+from .serializers import ProfileSerializer
+
+
+def _ttl():
+    return int(getattr(settings, 'PROFILE_CACHE_TTL', 60))
+
+
+def _profile_key(user_id):
+    return f'profile:v1:{user_id}'
+
+
+def _card_key(user_id):
+    return f'usercard:v1:{user_id}'
+
+
+def get_profile(user):
+    """Datos de ProfileSerializer del usuario (dict), creando el perfil si no existe."""
+    memo = getattr(user, '_cached_profile', None)
+    if memo is not None:
+        return memo
+    key = _profile_key(user.pk)
+    data = cache.get(key)
+    if data is None:
+        prof, _ = Profile.objects.get_or_create(user_id=user.pk)
+        data = dict(ProfileSerializer(prof).data)
+        cache.set(key, data, _ttl())
+    user._cached_profile = data
+    return data
+
+
+def get_role(user):
+    try:
+        return (get_profile(user).get('role') or '').strip()
+    except Exception:
+        return ''
+
+
+def get_user_card(user_id):
+    """Payload público de user_detail. Lanza User.DoesNotExist."""
+    key = _card_key(user_id)
+    data = cache.get(key)
+    if data is None:
+        u = User.objects.only('id', 'username', 'email').get(id=user_id)
+        data = {'id': str(u.id), 'username': u.username, 'email': u.email, 'profile': get_profile(u)}
+        cache.set(key, data, _ttl())
+    return data
+
+
+def invalidate(user, data=None):
+    """Llamar tras modificar el perfil; data (opcional) repuebla el memo de la request."""
+    cache.delete_many([_profile_key(user.pk), _card_key(user.pk)])
+    if data is not None:
+        user._cached_profile = dict(data)
+    elif hasattr(user, '_cached_profile'):
+        del user._cached_profile
@@ -0,0 +1,258 @@
+"""
+Recuperación de contexto para el asistente (RAG).
+
+El índice que escribe `manage.py build_assistant_index` se carga una vez por
+proceso como matriz (n_chunks x dim) con las filas ya normalizadas; en cada
+consulta se embebe el mensaje y la similitud coseno con todos los chunks sale
+de un único producto matriz-vector. Si el archivo cambia (mtime) se recarga en
+la siguiente consulta.
+
+Formatos:
+- binario (por defecto): `index.meta.json` (modelo, dtype y textos) + un .npy
+  con los vectores que se abre con mmap: los workers comparten las páginas del
+  page cache en vez de tener cada uno su copia. dtype float32, float16 o int8
+  (cuantizado simétrico: valor * 127, válido porque las filas tienen norma 1).
+- JSON (`index.json`, vectores como listas): formato anterior, se sigue leyendo
+  si no hay índice binario.
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+
+from . import ollama
+
+logger = logging.getLogger(__name__)
+
+INDEX_DTYPES = ('float32', 'float16', 'int8')
+INT8_SCALE = 127.0
+SCORE_BLOCK_ROWS = 4096
+
+
+def normalize_rows(matrix):
+    matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+    matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+    return matrix
+
+
+class Index:
+    def __init__(self, model, items, matrix, mtime=None, scale=1.0):
+        self.model = model
+        self.items = items          # dicts con id, path, chunk, text (sin el vector)
+        self.matrix = matrix        # (n, dim), filas de norma 1 (multiplicadas por scale)
+        self.mtime = mtime
+        self.scale = scale
+
+    def __len__(self):
+        return len(self.items)
+
+    @classmethod
+    def from_json(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        items, vectors = [], []
+        for it in data.get('items', []):
+            vec = it.get('vector') or []
+            if not vec:
+                continue
+            vectors.append(vec)
+            items.append({k: v for k, v in it.items() if k != 'vector'})
+        matrix = normalize_rows(vectors) if vectors else np.zeros((0, 0), dtype=np.float32)
+        return cls(data.get('model'), items, matrix, os.stat(path).st_mtime_ns)
+
+    @classmethod
+    def from_binary(cls, meta_path, mmap=True):
+        mtime = os.stat(meta_path).st_mtime_ns
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        matrix = np.load(Path(meta_path).parent / meta['vectors'], mmap_mode='r' if mmap else None)
+        if matrix.shape[0] != len(meta['items']):
+            raise ValueError(f"El índice tiene {matrix.shape[0]} vectores y {len(meta['items'])} chunks")
+        return cls(meta.get('model'), meta['items'], matrix, mtime, meta.get('scale', 1.0))
+
+    def vectors(self):
+        """Vectores normalizados en float32 (para reutilizarlos al reconstruir)."""
+        return np.asarray(self.matrix, dtype=np.float32) / self.scale
+
+    def _scores(self, q):
+        if self.matrix.dtype == np.float32:
+            return self.matrix @ q
+        # float16/int8 no pasan por BLAS: se convierten por bloques y cada bloque sí
+        out = np.empty(self.matrix.shape[0], dtype=np.float32)
+        for start in range(0, self.matrix.shape[0], SCORE_BLOCK_ROWS):
+            block = self.matrix[start:start + SCORE_BLOCK_ROWS]
+            np.matmul(block.astype(np.float32), q, out=out[start:start + len(block)])
+        return out
+
+    def top_k(self, vector, k, min_score=0.0):
+        """[(score, item)] de mayor a menor similitud coseno."""
+        if not len(self) or k <= 0:
+            return []
+        q = np.asarray(vector, dtype=np.float32)
+        if q.shape != (self.matrix.shape[1],):
+            logger.warning("Embedding de dimensión %s no calza con el índice (%s)", q.shape, self.matrix.shape[1])
+            return []
+        q = q / (max(float(np.linalg.norm(q)), 1e-12) * self.scale)
+        scores = self._scores(q)
+        k = min(k, len(scores))
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+        return [(float(scores[i]), self.items[i]) for i in best if scores[i] >= min_score]
+
+
+def meta_path_for(path):
+    """index.json -> index.meta.json (sidecar del índice binario)."""
+    path = Path(path)
+    return path.with_name(f'{path.stem}.meta.json')
+
+
+def write_binary(path, model, items, vectors, dtype='float32'):
+    """
+    Escribe el índice binario junto a `path`. Los vectores van a un .npy con
+    nombre por contenido y el sidecar se reemplaza al final (os.replace): un
+    lector nunca combina metadatos nuevos con vectores viejos, y quien ya tenía
+    el archivo anterior mapeado lo sigue leyendo hasta recargar. Se conservan
+    los vectores de la generación anterior (un lector puede haber leído el
+    sidecar viejo y aún no abrir su .npy); solo se borran los más antiguos.
+    """
+    if dtype not in INDEX_DTYPES:
+        raise ValueError(f'dtype no soportado: {dtype}')
+    path = Path(path)
+    matrix = normalize_rows(vectors) if len(vectors) else np.zeros((0, 0), dtype=np.float32)
+    scale = 1.0
+    if dtype == 'int8':
+        scale = INT8_SCALE
+        matrix = np.clip(np.rint(matrix * INT8_SCALE), -127, 127).astype(np.int8)
+    else:
+        matrix = matrix.astype(dtype)
+    digest = hashlib.sha256(matrix.tobytes()).hexdigest()[:16]
+    vectors_name = f'{path.stem}-{digest}.npy'
+    meta_path = meta_path_for(path)
+
+    previous = _vectors_name(meta_path)
+    vectors_path = path.parent / vectors_name
+    if not vectors_path.exists():
+        _atomic(vectors_path, lambda f: np.save(f, matrix), binary=True)
+    meta = {
+        'model': model,
+        'count': len(items),
+        'dim': int(matrix.shape[1]) if matrix.ndim == 2 else 0,
+        'dtype': dtype,
+        'scale': scale,
+        'vectors': vectors_name,
+        'items': [{k: v for k, v in it.items() if k != 'vector'} for it in items],
+    }
+    _atomic(meta_path, lambda f: json.dump(meta, f, ensure_ascii=False))
+
+    # Vectores de builds anteriores a la previa, que ya no referencia nadie
+    keep = {vectors_name, previous}
+    for old in path.parent.glob(f'{path.stem}-*.npy'):
+        if old.name not in keep:
+            try:
+                old.unlink()
+            except OSError:
+                pass
+    return meta_path
+
+
+def _vectors_name(meta_path):
+    """Nombre del .npy que referencia el sidecar actual (None si no hay o no se puede leer)."""
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            return json.load(f).get('vectors')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _atomic(path, write, binary=False):
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f'.{path.name}.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb' if binary else 'w', **({} if binary else {'encoding': 'utf-8'})) as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def load_index(path=None, mmap=True):
+    """Índice binario si existe su sidecar; si no, el JSON. Lanza OSError/ValueError."""
+    path = Path(path or settings.ASSISTANT_INDEX_PATH)
+    meta = meta_path_for(path)
+    if meta.exists():
+        try:
+            return Index.from_binary(meta, mmap=mmap)
+        except FileNotFoundError:
+            # Sidecar leído justo antes de que otros builds lo reemplazaran y borraran
+            # sus vectores: el sidecar actual apunta a un .npy que sí existe
+            return Index.from_binary(meta, mmap=mmap)
+    return Index.from_json(path)
+
+
+_index = None
+_lock = threading.Lock()
+
+
+def index_mtime():
+    path = Path(settings.ASSISTANT_INDEX_PATH)
+    for p in (meta_path_for(path), path):
+        try:
+            return os.stat(p).st_mtime_ns
+        except OSError:
+            continue
+    return None
+
+
+def get_index():
+    """Índice del proceso; se recarga si el archivo cambió. None si no existe."""
+    global _index
+    mtime = index_mtime()
+    if mtime is None:
+        return None
+    if _index is None or _index.mtime != mtime:
+        with _lock:
+            if _index is None or _index.mtime != mtime:
+                try:
+                    _index = load_index()
+                except (OSError, ValueError, KeyError):
+                    logger.exception("No se pudo cargar el índice del asistente")
+                    return _index
+    return _index
+
+
+def embed_query(text):
+    """Embedding del texto con el modelo del índice (o OLLAMA_EMBED_MODEL). None si Ollama falla."""
+    idx = get_index()
+    model = idx.model if idx is not None and idx.model else settings.OLLAMA_EMBED_MODEL
+    try:
+        return ollama.embed([text], model=model, timeout=settings.ASSISTANT_EMBED_TIMEOUT)[0]
+    except ollama.OllamaError:
+        logger.warning("No se pudo embeber la consulta del asistente")
+        return None
+
+
+def retrieve(text, k=None, min_score=None, vector=None):
+    """Chunks más parecidos al texto (o al vector ya calculado). Sin índice u Ollama, devuelve []."""
+    idx = get_index()
+    if idx is None or not len(idx):
+        return []
+    if vector is None:
+        vector = embed_query(text)
+        if vector is None:
+            return []
+    return idx.top_k(
+        vector,
+        settings.ASSISTANT_RAG_TOP_K if k is None else k,
+        settings.ASSISTANT_RAG_MIN_SCORE if min_score is None else min_score,
+    )
@@ -0,0 +1,152 @@
+"""
+Rate limiting compartido entre workers.
+
+Ventana deslizante aproximada (sliding window counter): por cada clave se guardan
+dos contadores, el de la ventana actual y el de la anterior, y se estima
+
+    usados = anterior * (1 - fracción transcurrida) + actual
+
+Son dos claves por identidad y una operación O(1) por chequeo, sin listas de
+timestamps. Backends:
+- 'cache' (por defecto): django.core.cache. Con REDIS_URL el límite es global a
+  todos los workers; con LocMem es por proceso.
+- 'memory': dict LRU acotado a RATELIMIT_MEMORY_MAX_KEYS (tests / desarrollo).
+
+Uso en vistas (debajo de @permission_classes, así ya corre la autenticación):
+
+    @api_view(['POST'])
+    @permission_classes([AllowAny])
+    @ratelimit('login', rate='10/m', key='ip')
+    def login_view(request): ...
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.response import Response
+
+
+_PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """'5/m', '100/h', '3/10m' -> (límite, segundos)."""
+    num, _, per = rate.partition('/')
+    mult = per.rstrip('smhd') or '1'
+    return int(num), int(mult) * _PERIODS[per[-1]]
+
+
+class CacheBackend:
+    def hit(self, key, window):
+        idx = int(time.time() // window)
+        cur, prev = f'rl:{key}:{idx}', f'rl:{key}:{idx - 1}'
+        # add no pisa un contador existente; incr es atómico en Redis y LocMem
+        cache.add(cur, 0, timeout=window * 2)
+        try:
+            current = cache.incr(cur)
+        except ValueError:  # expiró entre add e incr
+            cache.set(cur, 1, timeout=window * 2)
+            current = 1
+        previous = cache.get(prev) or 0
+        return current, previous
+
+
+class MemoryBackend:
+    def __init__(self, max_keys=10000):
+        self.max_keys = max_keys
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key, window):
+        idx = int(time.time() // window)
+        with self._lock:
+            slot = self._data.pop(key, None)
+            if slot is None or slot[0] < idx - 1:
+                slot = [idx, 0, 0]
+            elif slot[0] == idx - 1:
+                slot = [idx, 0, slot[1]]
+            slot[1] += 1
+            self._data[key] = slot
+            while len(self._data) > self.max_keys:
+                self._data.popitem(last=False)
+            return slot[1], slot[2]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        if getattr(settings, 'RATELIMIT_BACKEND', 'cache') == 'memory':
+            _backend = MemoryBackend(getattr(settings, 'RATELIMIT_MEMORY_MAX_KEYS', 10000))
+        else:
+            _backend = CacheBackend()
+    return _backend
+
+
+def hit(scope, ident, rate):
+    """Registra un intento. Devuelve (permitido, segundos para reintentar)."""
+    if not getattr(settings, 'RATELIMIT_ENABLED', True):
+        return True, 0
+    limit, window = parse_rate(rate)
+    now = time.time()
+    current, previous = get_backend().hit(f'{scope}:{ident}', window)
+    elapsed = (now % window) / window
+    used = previous * (1 - elapsed) + current
+    if used <= limit:
+        return True, 0
+    # Cuándo el peso de la ventana anterior baja lo suficiente (o empieza la próxima)
+    if previous and current <= limit:
+        wait = (1 - (limit - current) / previous - elapsed) * window
+    else:
+        wait = (1 - elapsed) * window
+    return False, max(1, math.ceil(wait))
+
+
+def client_ip(request):
+    if getattr(settings, 'RATELIMIT_TRUST_FORWARDED', False):
+        fwd = request.META.get('HTTP_X_FORWARDED_FOR', '')
+        if fwd:
+            return fwd.split(',')[0].strip()
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def _ident(request, key):
+    if callable(key):
+        return key(request)
+    if key == 'user':
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            return f'u{user.pk}'
+    return f'ip{client_ip(request)}'
+
+
+def too_many(retry_in, message='Demasiadas solicitudes, intenta más tarde'):
+    resp = Response({'error': message, 'retry_in': retry_in}, status=429)
+    resp['Retry-After'] = str(retry_in)
+    return resp
+
+
+def ratelimit(scope, rate, key='ip', methods=('POST',)):
+    """key: 'ip', 'user' (cae a IP si es anónimo) o callable(request) -> str."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method in methods:
+                ident = _ident(request, key)
+                if ident:
+                    allowed, retry_in = hit(scope, ident, rate)
+                    if not allowed:
+                        return too_many(retry_in)
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
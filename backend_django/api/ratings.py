@@ -0,0 +1,75 @@
+"""
+Resúmenes de calificaciones por usuario (UserRatingSummary).
+
+review_create suma cada reseña nueva al resumen del destinatario en la misma
+transacción (UPDATE con F(), sin releer las reseñas); las lecturas de rating
+pasan por aquí y cuestan una fila por usuario en vez de un AVG/COUNT sobre
+Review. Si se borran o editan reseñas por fuera (admin, shell), rebuild()
+recalcula desde Review.
+"""
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+
+from .models import Review, UserRatingSummary
+
+STARS = range(1, 6)
+
+
+def add_review(**fields):
+    """Crea la reseña y la suma al resumen de to_user. Devuelve la reseña."""
+    with transaction.atomic():
+        review = Review.objects.create(**fields)
+        UserRatingSummary.objects.get_or_create(user_id=review.to_user_id)
+        UserRatingSummary.objects.filter(user_id=review.to_user_id).update(**{
+            'count': F('count') + 1,
+            'total': F('total') + review.rating,
+            f'stars_{review.rating}': F(f'stars_{review.rating}') + 1,
+        })
+    return review
+
+
+def payload(summary):
+    """Lo que devuelve la API: {count, avg, stars: {"1": n, ..., "5": n}}."""
+    if summary is None:
+        return {'count': 0, 'avg': 0.0, 'stars': {str(s): 0 for s in STARS}}
+    return {
+        'count': summary.count,
+        'avg': round(summary.avg, 2),
+        'stars': {str(s): getattr(summary, f'stars_{s}') for s in STARS},
+    }
+
+
+def summaries(user_ids):
+    """{user_id: payload} en una sola consulta; usuarios sin reseñas aparecen en cero."""
+    found = {s.user_id: s for s in UserRatingSummary.objects.filter(user_id__in=user_ids)}
+    return {uid: payload(found.get(uid)) for uid in user_ids}
+
+
+def aggregate(queryset):
+    """Agrega reseñas por to_user: filas {to_user, count, total, stars_1..stars_5}."""
+    return (
+        queryset.values('to_user').order_by()
+        .annotate(
+            count=Count('id'),
+            total=Sum('rating'),
+            **{f'stars_{s}': Count('id', filter=Q(rating=s)) for s in STARS},
+        )
+    )
+
+
+def rebuild(user_ids=None):
+    """Recalcula los resúmenes desde Review (todos o solo user_ids). Devuelve cuántos escribió."""
+    reviews = Review.objects.all()
+    summaries_qs = UserRatingSummary.objects.all()
+    if user_ids is not None:
+        user_ids = list(user_ids)
+        reviews = reviews.filter(to_user_id__in=user_ids)
+        summaries_qs = summaries_qs.filter(user_id__in=user_ids)
+    fields = ['count', 'total'] + [f'stars_{s}' for s in STARS]
+    rows = [UserRatingSummary(user_id=row.pop('to_user'), **row) for row in aggregate(reviews)]
+    with transaction.atomic():
+        summaries_qs.exclude(user_id__in=[r.user_id for r in rows]).delete()
+        UserRatingSummary.objects.bulk_create(
+            rows, update_conflicts=True, unique_fields=['user'], update_fields=fields + ['updated_at'],
+        )
+    return len(rows)
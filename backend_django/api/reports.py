@@ -0,0 +1,149 @@
+"""
+HTML (y PDF con WeasyPrint, si está instalado) de los reportes de export_report.
+
+No usa Django ni la base de datos: recibe los datos ya leídos del esquema bi,
+así que render_job() corre igual en el proceso principal que en los workers del
+pool de --per-category / --per-provider (donde se reparte el costo del PDF).
+"""
+import os
+import time
+from html import escape
+from pathlib import Path
+
+STYLE = """
+    body { font-family: Arial, Helvetica, sans-serif; color:#1f2937; }
+    .wrap { max-width: 900px; margin: 0 auto; padding: 24px; }
+    h1 { font-size: 22px; margin: 0 0 12px; }
+    h2 { font-size: 18px; margin: 24px 0 8px; }
+    table { border-collapse: collapse; width: 100%; margin: 8px 0 16px; }
+    th, td { border: 1px solid #e5e7eb; padding: 6px 8px; text-align: left; }
+    th { background: #f3f4f6; font-weight: 600; }
+    .kpis { display: grid; grid-template-columns: repeat(3,1fr); gap: 12px; margin: 12px 0 16px; }
+    .card { border:1px solid #e5e7eb; border-radius:8px; padding:12px; background:#fafafa; }
+    .muted { color:#6b7280; font-size:12px; }
+"""
+
+
+def fmt(n):
+    try:
+        return f"{float(n):,.0f}".replace(",", ".")
+    except Exception:
+        return str(n)
+
+
+def page(title, generated, refreshed, body):
+    return f"""
+<!doctype html>
+<html lang="es">
+<head>
+  <meta charset="utf-8" />
+  <title>{escape(title)}</title>
+  <style>{STYLE}</style>
+  <meta name="viewport" content="width=device-width, initial-scale=1" />
+  <meta name="generator" content="Django export_report" />
+  <meta name="created" content="{generated}" />
+  <meta name="robots" content="noindex" />
+  <meta name="description" content="Reporte automático de Fixly" />
+</head>
+<body>
+  <div class="wrap">
+    <h1>{escape(title)}</h1>
+    <div class="muted">Generado: {generated}</div>
+{body}
+    <div class="muted">Fuente: vistas bi.* (actualizadas {refreshed}; ver refresh_bi).</div>
+  </div>
+</body>
+</html>
+"""
+
+
+def cards(items):
+    return '    <div class="kpis">\n' + ''.join(
+        f'      <div class="card"><div>{label}</div><div><strong>{value}</strong></div></div>\n'
+        for label, value in items
+    ) + '    </div>\n'
+
+
+def table(headers, rows):
+    head = ''.join(f'<th>{h}</th>' for h in headers)
+    body = ''.join('<tr>' + ''.join(f'<td>{escape(str(c))}</td>' for c in row) + '</tr>' for row in rows)
+    return f'    <table><thead><tr>{head}</tr></thead><tbody>\n      {body}\n    </tbody></table>\n'
+
+
+def summary_body(d):
+    return (
+        cards([
+            ('Total solicitudes', fmt(d['total_requests'])),
+            ('Total ofertas', fmt(d['offers_total'])),
+            ('Tasa aceptación', f"{d['acceptance_rate']:.1f}%"),
+        ])
+        + '\n    <h2>Solicitudes por estado</h2>\n'
+        + table(('Estado', 'Cantidad', 'Con ofertas', 'Con oferta aceptada'),
+                [(s, fmt(c), fmt(o), fmt(a)) for s, c, o, a in d['status_rows']])
+        + '\n    <h2>Precio aceptado promedio</h2>\n'
+        + f'    <div class="card">CLP <strong>{fmt(d["avg_accepted_price"])}</strong></div>\n'
+        + '\n    <h2>Top 5 categorías por solicitudes</h2>\n'
+        + table(('Categoría', 'Cantidad', 'Ofertas aceptadas', 'Precio aceptado promedio'),
+                [(c, fmt(n), fmt(a), f'CLP {fmt(p)}') for c, n, a, p in d['category_rows']])
+        + f"\n    <h2>Solicitudes por día (últimos {d['days']} días)</h2>\n"
+        + table(('Fecha', 'Cantidad'), [(day, fmt(n)) for day, n in d['series']])
+    )
+
+
+def category_body(d):
+    rate = (d['offers_accepted'] / d['offers'] * 100) if d['offers'] else 0
+    return (
+        cards([
+            ('Solicitudes', fmt(d['requests'])),
+            ('Ofertas', fmt(d['offers'])),
+            ('Tasa aceptación', f'{rate:.1f}%'),
+        ])
+        + '\n    <h2>Ofertas aceptadas</h2>\n'
+        + table(('Aceptadas', 'Precio aceptado promedio'),
+                [(fmt(d['offers_accepted']), f"CLP {fmt(d['avg_accepted_price'])}")])
+    )
+
+
+def provider_body(d):
+    return (
+        cards([
+            ('Ofertas enviadas', fmt(d['offers'])),
+            ('Ofertas aceptadas', fmt(d['offers_accepted'])),
+            ('Tasa aceptación', f"{float(d['acceptance_rate']):.1f}%"),
+        ])
+        + '\n    <h2>Ingresos por ofertas aceptadas</h2>\n'
+        + table(('Total', 'Promedio por oferta'),
+                [(f"CLP {fmt(d['accepted_total'])}", f"CLP {fmt(d['avg_accepted_price'])}")])
+        + '\n    <h2>Actividad</h2>\n'
+        + table(('Servicios publicados', 'Leads recibidos', 'Reseñas', 'Calificación promedio'),
+                [(fmt(d['services']), fmt(d['leads']), fmt(d['rating_count']),
+                  f"{float(d['rating_avg']):.2f}" if d['rating_count'] else '-')])
+    )
+
+
+BODIES = {'summary': summary_body, 'category': category_body, 'provider': provider_body}
+
+
+def render_job(job):
+    """
+    job: {kind, stem, title, data, generated, refreshed, pdf}. Escribe stem.html y,
+    si job['pdf'], stem.pdf. Devuelve tiempos y el error del PDF (si lo hubo).
+    """
+    t0 = time.perf_counter()
+    html = page(job['title'], job['generated'], job['refreshed'], BODIES[job['kind']](job['data']))
+    stem = Path(job['stem'])
+    html_path = stem.with_name(stem.name + '.html')
+    html_path.write_text(html, encoding='utf-8')
+    result = {'title': job['title'], 'html': str(html_path), 'pdf': None, 'pdf_error': None,
+              'html_s': time.perf_counter() - t0, 'pdf_s': 0.0, 'pid': os.getpid()}
+    if job.get('pdf'):
+        t1 = time.perf_counter()
+        try:
+            from weasyprint import HTML
+            pdf_path = stem.with_name(stem.name + '.pdf')
+            HTML(string=html, base_url=str(stem.parent)).write_pdf(target=str(pdf_path))
+            result['pdf'] = str(pdf_path)
+        except Exception as e:
+            result['pdf_error'] = str(e)
+        result['pdf_s'] = time.perf_counter() - t1
+    return result
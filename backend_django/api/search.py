@@ -0,0 +1,121 @@
+"""
+Búsqueda de texto completo (Postgres) sobre Request y Service.
+Los vectores los mantiene un trigger (migración 0005) con la configuración
+SEARCH_CONFIG: stemming en español y, si está disponible, unaccent
+(ensure_unaccent lo reaplica después de cada migrate).
+"""
+import logging
+
+from django.utils.html import escape
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank
+from django.db.models import F, Value
+from django.db.models.functions import Concat
+
+from .models import Request, Service
+
+logger = logging.getLogger(__name__)
+
+SEARCH_CONFIG = 'fixly_es'
+
+# Marcadores de control: el texto se escapa y recién después se convierten en <mark>
+_START, _STOP = '\x02', '\x03'
+
+HEADLINE_OPTIONS = {
+    'start_sel': _START,
+    'stop_sel': _STOP,
+    'max_words': 30,
+    'min_words': 10,
+    'max_fragments': 2,
+}
+
+# Tope de resultados paginables: cada página trae offset + limit + 1 filas por modelo,
+# así que sin tope un ?page= alto obliga a rankear y transferir casi toda la tabla.
+MAX_RESULTS = 200
+
+SEARCH_TYPES = {
+    'requests': Request,
+    'services': Service,
+}
+
+
+def ensure_unaccent(connection):
+    """
+    Agrega unaccent al mapeo de SEARCH_CONFIG si la extensión está disponible en el
+    servidor (la crea si hace falta) y recalcula los vectores cuando el mapeo cambia.
+    Sin la extensión deja un warning: la búsqueda sigue funcionando, pero distingue tildes.
+    """
+    with connection.cursor() as cur:
+        cur.execute("SELECT 1 FROM pg_ts_config WHERE cfgname = %s", [SEARCH_CONFIG])
+        if not cur.fetchone():
+            return
+        cur.execute(
+            "SELECT 1 FROM pg_ts_config_map m "
+            "JOIN pg_ts_config c ON c.oid = m.mapcfg JOIN pg_ts_dict d ON d.oid = m.mapdict "
+            "WHERE c.cfgname = %s AND d.dictname = 'unaccent'",
+            [SEARCH_CONFIG],
+        )
+        if cur.fetchone():
+            return
+        cur.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'unaccent'")
+        if not cur.fetchone():
+            logger.warning(
+                "La extensión unaccent no está disponible en Postgres: la búsqueda (%s) "
+                "distingue tildes. Instale postgresql-contrib y vuelva a ejecutar migrate.",
+                SEARCH_CONFIG,
+            )
+            return
+        # Sin permisos para crear la extensión falla aquí, a la vista
+        cur.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+        cur.execute(
+            f"ALTER TEXT SEARCH CONFIGURATION {SEARCH_CONFIG} "
+            "ALTER MAPPING FOR hword, hword_part, word WITH unaccent, spanish_stem"
+        )
+        # Los triggers recalculan search_vector con el nuevo mapeo
+        for model in SEARCH_TYPES.values():
+            cur.execute(f"UPDATE {model._meta.db_table} SET title = title")
+
+
+def _highlight(headline):
+    return escape(headline or '').replace(_START, '<mark>').replace(_STOP, '</mark>')
+
+
+def _ranked(model, query):
+    text = Concat('title', Value(' — '), 'description')
+    return (
+        model.objects.filter(search_vector=query)
+        .annotate(
+            rank=SearchRank(F('search_vector'), query),
+            headline=SearchHeadline(text, query, config=SEARCH_CONFIG, **HEADLINE_OPTIONS),
+        )
+        .only('id', 'title', 'category', 'location', 'status', 'created_at')
+        .order_by('-rank', '-created_at')
+    )
+
+
+def search(q, kinds=('requests', 'services'), offset=0, limit=20):
+    """
+    Devuelve (items, has_more) ordenados por relevancia. Cada modelo aporta como
+    máximo offset + limit + 1 filas (usando el índice GIN) y se mezclan por rank.
+    Solo se pagina dentro de los primeros MAX_RESULTS resultados.
+    """
+    if offset >= MAX_RESULTS:
+        return [], False
+    limit = min(limit, MAX_RESULTS - offset)
+    query = SearchQuery(q, config=SEARCH_CONFIG, search_type='websearch')
+    window = offset + limit + 1
+    rows = []
+    for kind in kinds:
+        for obj in _ranked(SEARCH_TYPES[kind], query)[:window]:
+            rows.append({
+                'type': kind[:-1],
+                'id': str(obj.id),
+                'title': obj.title,
+                'category': obj.category,
+                'location': obj.location,
+                'status': obj.status,
+                'created_at': obj.created_at,
+                'rank': round(float(obj.rank), 6),
+                'headline': _highlight(obj.headline),
+            })
+    rows.sort(key=lambda r: (r['rank'], r['created_at']), reverse=True)
+    return rows[offset:offset + limit], len(rows) > offset + limit and offset + limit < MAX_RESULTS
@@ -2,6 +2,17 @@ from rest_framework import serializers
 from .models import User, Profile, Request, Offer, Service, Lead, ChatMessage, Review
 
 
+class FieldsMixin:
+    """Permite recortar la salida: Serializer(obj, fields=['id', 'title'])."""
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        if fields:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
@@ -47,7 +58,7 @@ class OfferSerializer(serializers.ModelSerializer):
             return ''
 
 
-class RequestSerializer(serializers.ModelSerializer):
+class RequestSerializer(FieldsMixin, serializers.ModelSerializer):
     _count = serializers.SerializerMethodField()
     ownerId = serializers.SerializerMethodField()
     acceptedOfferId = serializers.SerializerMethodField()
@@ -61,24 +72,25 @@ class RequestSerializer(serializers.ModelSerializer):
         model = Request
         fields = (
             'id', 'owner', 'title', 'category', 'location', 'urgency', 'description', 'status', 'budget', 'created_at',
-            '_count', 'ownerId',
+            'last_activity_at', '_count', 'ownerId',
             'acceptedOfferId', 'acceptedPrice', 'acceptedProviderId', 'acceptedProviderName', 'acceptedProviderPhoto',
             'offers'
         )
-        read_only_fields = ('owner', 'created_at', 'offers')
+        read_only_fields = ('owner', 'created_at', 'last_activity_at', 'offers')
 
     def get__count(self, obj):
-        return {'offers': obj.offers.count()}
+        return {'offers': obj.offer_count}
 
     def get_ownerId(self, obj):
         return str(obj.owner_id)
 
     def _accepted(self, obj):
-        return obj.offers.filter(status='accepted').first()
+        # Columna desnormalizada: sin oferta aceptada no hay consulta;
+        # los listados la traen con select_related('accepted_offer__provider__profile').
+        return obj.accepted_offer if obj.accepted_offer_id else None
 
     def get_acceptedOfferId(self, obj):
-        acc = self._accepted(obj)
-        return str(acc.id) if acc else None
+        return str(obj.accepted_offer_id) if obj.accepted_offer_id else None
 
     def get_acceptedPrice(self, obj):
         acc = self._accepted(obj)
@@ -110,7 +122,7 @@ class RequestSerializer(serializers.ModelSerializer):
             return ''
 
 
-class ServiceSerializer(serializers.ModelSerializer):
+class ServiceSerializer(FieldsMixin, serializers.ModelSerializer):
     ownerId = serializers.SerializerMethodField()
     class Meta:
         model = Service
@@ -124,7 +136,45 @@ class ServiceSerializer(serializers.ModelSerializer):
         return str(obj.owner_id)
 
 
-class LeadSerializer(serializers.ModelSerializer):
+class RequestSummarySerializer(FieldsMixin, serializers.ModelSerializer):
+    """Representación liviana para listados: sin descripción ni ofertas anidadas."""
+    _count = serializers.SerializerMethodField()
+    ownerId = serializers.SerializerMethodField()
+    acceptedOfferId = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Request
+        fields = ('id', 'owner', 'ownerId', 'title', 'category', 'location', 'urgency', 'status', 'budget',
+                  'created_at', 'last_activity_at', '_count', 'acceptedOfferId')
+
+    def get__count(self, obj):
+        return {'offers': obj.offer_count}
+
+    def get_acceptedOfferId(self, obj):
+        return str(obj.accepted_offer_id) if obj.accepted_offer_id else None
+
+    def get_ownerId(self, obj):
+        return str(obj.owner_id)
+
+
+class ServiceSummarySerializer(FieldsMixin, serializers.ModelSerializer):
+    ownerId = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Service
+        fields = ('id', 'owner', 'ownerId', 'title', 'category', 'price_from', 'location', 'status', 'created_at')
+
+    def get_ownerId(self, obj):
+        return str(obj.owner_id)
+
+
+class LeadSummarySerializer(FieldsMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Lead
+        fields = ('id', 'service', 'client', 'contact', 'status', 'created_at')
+
+
+class LeadSerializer(FieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Lead
         fields = ('id', 'service', 'provider', 'client', 'message', 'contact', 'status', 'created_at')
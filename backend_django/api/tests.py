@@ -0,0 +1,152 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import Barrier
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .models import User, Request, Offer
+from . import authentication
+from . import offers as offer_ops
+from .views import _filter_requests
+
+
+class AcceptOfferConcurrencyTests(TransactionTestCase):
+    """accept_offer en paralelo (un hilo = una conexión): al final queda una sola aceptada."""
+
+    PROVIDERS = 6
+    ROUNDS = 3
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username='cliente', email='cliente@fixly.test', password='x')
+        self.providers = [
+            User.objects.create_user(username=f'prov{i}', email=f'prov{i}@fixly.test', password='x')
+            for i in range(self.PROVIDERS)
+        ]
+
+    def _accept_all_at_once(self, req, offer_ids):
+        barrier = Barrier(len(offer_ids))
+
+        def accept(offer_id):
+            try:
+                barrier.wait()
+                return offer_ops.accept_offer(req.pk, offer_id)
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=len(offer_ids)) as pool:
+            return list(pool.map(accept, offer_ids))
+
+    def _assert_single_accepted(self, req, offer_ids):
+        accepted = list(Offer.objects.filter(request=req, status='accepted').values_list('pk', flat=True))
+        self.assertEqual(len(accepted), 1)
+        self.assertIn(accepted[0], offer_ids)
+        req.refresh_from_db()
+        self.assertEqual(req.accepted_offer_id, accepted[0])
+        self.assertEqual(req.status, 'en_progreso')
+        self.assertEqual(
+            Offer.objects.filter(request=req, status='rejected').count(), len(offer_ids) - 1)
+
+    def test_parallel_accepts_leave_one_accepted_offer(self):
+        for n in range(self.ROUNDS):
+            req = Request.objects.create(owner=self.owner, title=f'Solicitud {n}', category='Gasfitería')
+            offer_ids = [offer_ops.save_offer(req, p, 'oferta', 1000 + i)[0].pk
+                         for i, p in enumerate(self.providers)]
+
+            results = self._accept_all_at_once(req, offer_ids)
+
+            self.assertEqual(sorted(r['accepted'] for r in results), sorted(str(pk) for pk in offer_ids))
+            self._assert_single_accepted(req, offer_ids)
+
+    def test_parallel_accepts_of_the_same_offer(self):
+        req = Request.objects.create(owner=self.owner, title='Solicitud', category='Electricidad')
+        offer_ids = [offer_ops.save_offer(req, p, 'oferta', 500)[0].pk for p in self.providers]
+        target = offer_ids[0]
+
+        results = self._accept_all_at_once(req, [target] * self.PROVIDERS)
+
+        # Solo la primera aceptación cambia algo; el resto encuentra la oferta ya aceptada
+        self.assertEqual(sum(r['changed'] for r in results), 1)
+        self._assert_single_accepted(req, offer_ids)
+        req.refresh_from_db()
+        self.assertEqual(req.accepted_offer_id, target)
+
+
+class OfferDeletedTests(TestCase):
+    """Borrar ofertas por fuera de las vistas (admin, cascada) mantiene offer_count y accepted_offer."""
+
+    def setUp(self):
+        owner = User.objects.create_user(username='cliente', email='cliente@fixly.test', password='x')
+        self.providers = [
+            User.objects.create_user(username=f'prov{i}', email=f'prov{i}@fixly.test', password='x')
+            for i in range(3)
+        ]
+        self.req = Request.objects.create(owner=owner, title='Solicitud', category='Gasfitería')
+        self.offers = [offer_ops.save_offer(self.req, p, 'oferta', 1000)[0] for p in self.providers]
+        offer_ops.accept_offer(self.req.pk, self.offers[0].pk)
+
+    def test_deleting_a_pending_offer_decrements_offer_count(self):
+        self.offers[1].delete()
+        self.req.refresh_from_db()
+        self.assertEqual(self.req.offer_count, 2)
+        self.assertEqual(self.req.accepted_offer_id, self.offers[0].pk)
+        self.assertEqual(self.req.status, 'en_progreso')
+
+    def test_deleting_the_accepted_offer_reopens_the_request(self):
+        Offer.objects.filter(pk=self.offers[0].pk).delete()
+        self.req.refresh_from_db()
+        self.assertEqual(self.req.offer_count, 2)
+        self.assertIsNone(self.req.accepted_offer_id)
+        self.assertEqual(self.req.status, 'pendiente')
+
+    def test_deleting_the_provider_cascades_to_offer_count(self):
+        self.providers[2].delete()
+        self.req.refresh_from_db()
+        self.assertEqual(self.req.offer_count, 2)
+
+
+class BudgetFilterTests(SimpleTestCase):
+    """budget_min/budget_max fuera de numeric(12, 2) son 400, no un DataError de Postgres."""
+
+    def test_rejects_values_the_column_cannot_hold(self):
+        for value in ('NaN', 'sNaN', 'Infinity', '-inf', '1e999999999', '-1e999999999', '10000000000', 'abc'):
+            with self.subTest(value=value), self.assertRaisesMessage(ValueError, 'budget_min inválido'):
+                _filter_requests(Request.objects.all(), {'budget_min': value})
+
+    def test_accepts_values_within_the_column(self):
+        for value, expected in (('9999999999.99', '9999999999.99'), ('12.345', '12.34'), ('1e-999999999', '0.00')):
+            with self.subTest(value=value):
+                qs = _filter_requests(Request.objects.all(), {'budget_max': value})
+                self.assertEqual(str(qs.query.where.children[0].rhs), expected)
+
+
+class RevokeUserTokensTests(SimpleTestCase):
+    """revoke_user_tokens corta en microsegundos: iat (segundos) no distingue antes/después."""
+
+    USER_ID = '00000000-0000-0000-0000-000000000001'
+
+    def setUp(self):
+        cache.clear()
+
+    def _token(self, issued_ms=None):
+        token = AccessToken()
+        token['user_id'] = self.USER_ID
+        if issued_ms is not None:
+            token['iat_us'] = issued_ms
+        return token
+
+    def test_tokens_issued_before_in_the_same_second_are_revoked(self):
+        before = self._token(authentication.epoch_us())
+        authentication.revoke_user_tokens(self.USER_ID)
+        self.assertTrue(authentication.is_revoked(before))
+
+    def test_tokens_issued_after_the_revocation_are_valid(self):
+        authentication.revoke_user_tokens(self.USER_ID)
+        self.assertFalse(authentication.is_revoked(self._token(authentication.epoch_us() + 1)))
+
+    def test_tokens_without_iat_us_from_the_same_second_are_revoked(self):
+        legacy = self._token()
+        authentication.revoke_user_tokens(self.USER_ID)
+        self.assertTrue(authentication.is_revoked(legacy))
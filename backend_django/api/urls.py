@@ -24,14 +24,20 @@ urlpatterns = [
 
     path('services/<uuid:service_id>/contact', v.lead_create),
     path('me/leads', v.my_leads),
+    path('me/export', v.my_export),  # GET ?kind=&format=csv|ndjson (streaming)
 
     path('chats/<uuid:request_id>/messages', v.chat_view),  # GET/POST
 
+    path('search', v.search_view),  # GET ?q=&type=&page=&limit=
+
     path('reviews', v.review_create),
+    path('users/ratings', v.users_ratings),
     path('users/<uuid:user_id>/reviews', v.user_reviews),
     path('users/<uuid:user_id>/rating', v.user_rating),
     path('users/<uuid:user_id>', v.user_detail),
 
     # Assistant (Ollama local)
     path('assistant/chat', v.assistant_chat),
+    path('assistant/chat/stream', v.assistant_chat_stream),
+    path('assistant/cache-stats', v.assistant_cache_stats),
 ]
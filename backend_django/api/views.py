@@ -1,19 +1,23 @@
 from django.contrib.auth import authenticate
-from django.db.models import Q, Avg, Count
+from django.utils import timezone
+from django.db import transaction
+from django.db.models import Q, Prefetch
 from django.views.decorators.csrf import csrf_exempt
+from django.http import JsonResponse, StreamingHttpResponse
+from django.core.handlers.asgi import ASGIRequest
+from asgiref.sync import sync_to_async
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAuthenticated, IsAdminUser
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth.tokens import default_token_generator
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.utils.encoding import force_bytes, force_str
-from django.core.mail import send_mail
-from threading import Thread
 from django.core.validators import validate_email
 from django.core.exceptions import ValidationError
 import re
+import uuid
 import logging
 logger = logging.getLogger(__name__)
 
@@ -28,23 +32,29 @@ def _contains_bad(text):
 from .models import User, Profile, Request, Offer, Service, Lead, ChatMessage, Review
 from .serializers import (
     UserSerializer, ProfileSerializer, RequestSerializer, OfferSerializer,
-    ServiceSerializer, LeadSerializer, ChatMessageSerializer, ReviewSerializer
+    ServiceSerializer, LeadSerializer, ChatMessageSerializer, ReviewSerializer,
+    RequestSummarySerializer, ServiceSummarySerializer, LeadSummarySerializer,
 )
-import os
+from .pagination import keyset_page, page_size, InvalidCursor
+from . import offers as offer_ops
+from . import chat as chat_sync
+from . import search as fts
+from . import profile_cache
+from . import ratings
+from . import extracts
+from . import mailer
+from . import ollama
+from . import rag
+from . import assistant_cache
+from . import faq as faq_store
+from .ratelimit import ratelimit, hit as rate_hit, too_many, client_ip
+from .authentication import ClaimsJWTAuthentication, epoch_us, revoke_user_tokens
+from decimal import Decimal, InvalidOperation
 import urllib.parse
 import json
-from pathlib import Path
-import time
 from django.conf import settings
-from django.utils.text import slugify
 from rest_framework.permissions import AllowAny
 from rest_framework.decorators import permission_classes
-try:
-    import requests as _requests
-except Exception:  # fallback mÃ­nimo con urllib
-    _requests = None
-    import urllib.request as _urlreq
-    import urllib.error as _urlerr
 
 
 @api_view(['GET'])
@@ -55,15 +65,17 @@ def health(request):
 
 def _jwt_for_user(user):
     token = RefreshToken.for_user(user)
-    return str(token.access_token)
+    access = token.access_token
+    # Claims que usa api.authentication.ClaimsJWTAuthentication para no consultar User
+    access['username'] = user.username
+    access['is_active'] = user.is_active
+    # iat va en segundos; la revocación (revoke_user_tokens) compara en microsegundos
+    access['iat_us'] = epoch_us(access.current_time)
+    return str(access)
 
 
 def _role_of(user):
-    try:
-        prof, _ = Profile.objects.get_or_create(user=user)
-        return (prof.role or '').strip()
-    except Exception:
-        return ''
+    return profile_cache.get_role(user)
 
 
 def _is_strong_password(pw):
@@ -78,65 +90,9 @@ def _is_strong_password(pw):
     return True
 
 
-def _send_email_generic(subject, txt, html, to_email):
-    """
-    Intenta enviar usando la API HTTP de SendGrid (evita bloqueos SMTP en el host),
-    y si falla, usa send_mail tradicional.
-    """
-    api_key = os.getenv("SENDGRID_API_KEY") or os.getenv("EMAIL_HOST_PASSWORD")
-    from_email = getattr(settings, 'DEFAULT_FROM_EMAIL', 'no-reply@fixly.test')
-    payload = {
-        "personalizations": [{"to": [{"email": to_email}]}],
-        "from": {"email": from_email},
-        "subject": subject,
-        "content": [
-            {"type": "text/plain", "value": txt},
-            {"type": "text/html", "value": html},
-        ],
-    }
-    if api_key:
-        try:
-            if _requests is not None:
-                r = _requests.post(
-                    "https://api.sendgrid.com/v3/mail/send",
-                    headers={
-                        "Authorization": f"Bearer {api_key}",
-                        "Content-Type": "application/json",
-                    },
-                    json=payload,
-                    timeout=10,
-                )
-                r.raise_for_status()
-                return True
-            else:
-                data = json.dumps(payload).encode("utf-8")
-                req = _urlreq.Request(
-                    "https://api.sendgrid.com/v3/mail/send",
-                    data=data,
-                    headers={
-                        "Authorization": f"Bearer {api_key}",
-                        "Content-Type": "application/json",
-                    },
-                )
-                with _urlreq.urlopen(req, timeout=10):
-                    return True
-        except Exception:
-            logger.exception("Fallo usando la API HTTP de SendGrid para %s", to_email)
-
-    # Fallback a SMTP si la API no se pudo usar
-    send_mail(
-        subject,
-        txt,
-        from_email,
-        [to_email],
-        html_message=html,
-        fail_silently=False,
-    )
-    return True
-
-
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@ratelimit('register', rate='10/h', key='ip')
 def register(request):
     username = (request.data.get('username') or '').strip().lower()
     email = (request.data.get('email') or '').strip().lower()
@@ -161,23 +117,21 @@ def register(request):
     if User.objects.filter(Q(username=username) | Q(email=email)).exists():
         return Response({'error': 'Usuario o email ya registrados'}, status=409)
 
-    user = User.objects.create_user(username=username, email=email, password=password)
-
-    try:
-        user.is_active = False
-        user.save(update_fields=["is_active"])
-    except Exception:
-        logger.exception("Error marcando usuario %s como inactivo tras registro", user.id)
-
-    Profile.objects.get_or_create(user=user)
-
-    Thread(target=_send_verification_email, args=(user,), daemon=True).start()
+    # Usuario, perfil y correo de verificación van juntos: si no se puede encolar el
+    # correo no queda una cuenta inactiva sin forma de activarse (y el email tomado).
+    with transaction.atomic():
+        user = User.objects.create_user(username=username, email=email, password=password, is_active=False)
+        Profile.objects.get_or_create(user=user)
+        if not _send_verification_email(user):
+            transaction.set_rollback(True)
+            return Response({'error': 'No pudimos enviar el correo de verificación. Intenta nuevamente.'}, status=503)
 
     return Response({'ok': True, 'user': UserSerializer(user).data}, status=201)
 
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@ratelimit('login', rate='10/m', key='ip')
 def login_view(request):
     user_or_email = (request.data.get('userOrEmail') or '').strip().lower()
     password = request.data.get('password') or ''
@@ -191,7 +145,7 @@ def login_view(request):
 
     if not user.is_active:
         # Reenvía verificación si el usuario intenta loguear sin activar
-        Thread(target=_send_verification_email, args=(user,), daemon=True).start()
+        _send_verification_email(user)
         return Response({'error': 'Email no verificado', 'code': 'email_not_verified'}, status=403)
 
     token = _jwt_for_user(user)
@@ -199,7 +153,7 @@ def login_view(request):
 
 
 def _send_verification_email(user):
-    """Envía el correo de verificación. Lanza excepción si algo falla."""
+    """Encola el correo de verificación (lo envía run_mail_worker). Devuelve False si no se pudo encolar."""
     uid = urlsafe_base64_encode(force_bytes(user.pk))
     token = default_token_generator.make_token(user)
     base = getattr(settings, 'FRONTEND_URL', 'http://localhost:5173').rstrip('/')
@@ -235,23 +189,19 @@ def _send_verification_email(user):
   </table>
 </div>"""
 
-    logger.error(
-        "Enviando verificación a %s vía %s (from=%s, user=%s)",
-        user.email,
-        settings.EMAIL_HOST,
-        getattr(settings, 'DEFAULT_FROM_EMAIL', 'no-reply@fixly.test'),
-        settings.EMAIL_HOST_USER,
-    )
     try:
-        _send_email_generic(subject, txt, html, user.email)
-        logger.error("Verificación enviada a %s (sin error)", user.email)
+        # Savepoint propio: un INSERT fallido no deja abortada la transacción del llamador
+        with transaction.atomic():
+            mailer.enqueue_email(subject, txt, html, user.email)
     except Exception:
-        logger.exception("Fallo al enviar verificación a %s", user.email)
-        raise
+        logger.exception("Fallo al encolar verificación para %s", user.email)
+        return False
+    logger.info("Verificación encolada para %s", user.email)
+    return True
 
 
 def _send_password_reset_email(user):
-    """Envía el correo de reseteo de contraseña. Lanza excepción si algo falla."""
+    """Encola el correo de reseteo de contraseña (lo envía run_mail_worker). Devuelve False si no se pudo encolar."""
     uid = urlsafe_base64_encode(force_bytes(user.pk))
     token = default_token_generator.make_token(user)
     base = getattr(settings, 'FRONTEND_URL', 'http://localhost:5173').rstrip('/')
@@ -291,19 +241,15 @@ def _send_password_reset_email(user):
   </table>
 </div>"""
 
-    logger.error(
-        "Enviando reset a %s vía %s (from=%s, user=%s)",
-        user.email,
-        settings.EMAIL_HOST,
-        getattr(settings, 'DEFAULT_FROM_EMAIL', 'no-reply@fixly.test'),
-        settings.EMAIL_HOST_USER,
-    )
     try:
-        _send_email_generic(subject, txt, html, user.email)
-        logger.error("Reset enviado a %s (sin error)", user.email)
+        # Savepoint propio: un INSERT fallido no deja abortada la transacción del llamador
+        with transaction.atomic():
+            mailer.enqueue_email(subject, txt, html, user.email)
     except Exception:
-        logger.exception("Fallo al enviar reset a %s", user.email)
-        raise
+        logger.exception("Fallo al encolar reset para %s", user.email)
+        return False
+    logger.info("Reset encolado para %s", user.email)
+    return True
 
 
 @api_view(['POST'])
@@ -319,24 +265,18 @@ def send_verification_email(request):
         if not u:
             return Response({'error': 'No existe usuario'}, status=404)
 
-    # Rate limit simple: 1 solicitud cada 60s por usuario/email
-    key = (u.email or str(u.id) or '').lower()
-    store = getattr(send_verification_email, '_last', {})
-    now = time.time()
-    last = store.get(key, 0)
-    if now - last < 60:
-        return Response(
-            {'error': 'Espera antes de reenviar', 'retry_in': int(60 - (now - last))},
-            status=429,
-        )
+    # 1 reenvío por minuto por usuario/email (compartido entre workers)
+    allowed, retry_in = rate_hit('verify-email', (u.email or str(u.id)).lower(), '1/m')
+    if not allowed:
+        return too_many(retry_in, 'Espera antes de reenviar')
 
-    Thread(target=_send_verification_email, args=(u,), daemon=True).start()
-    store[key] = now
-    setattr(send_verification_email, '_last', store)
+    if not _send_verification_email(u):
+        return Response({'error': 'No pudimos enviar el correo de verificación. Intenta nuevamente.'}, status=503)
     return Response({'ok': True})
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@ratelimit('password-reset', rate='5/h', key='ip')
 def password_reset_request(request):
     email = (request.data.get('email') or '').strip().lower()
     if not email:
@@ -344,20 +284,9 @@ def password_reset_request(request):
 
     user = User.objects.filter(email=email).first()
     if user:
-        Thread(target=_send_password_reset_email, args=(user,), daemon=True).start()
+        _send_password_reset_email(user)
 
-    # No revelamos si existe o no
-    return Response({'ok': True})
-
-    user = User.objects.filter(email=email).first()
-    if user:
-        try:
-            _send_password_reset_email(user)
-        except Exception as e:
-            # Por seguridad seguimos devolviendo ok, pero lo registramos en logs
-            logger.exception("Error enviando correo de reset a %s: %s", user.email, e)
-
-    # No revelamos si existe o no
+    # No revelamos si existe o no (ni si falló el encolado: queda en los logs)
     return Response({'ok': True})
 
 
@@ -380,6 +309,8 @@ def password_reset_confirm(request):
         return Response({'error': 'Token inválido o expirado'}, status=400)
     user.set_password(password)
     user.save(update_fields=['password'])
+    # Los tokens emitidos antes del reseteo dejan de valer
+    revoke_user_tokens(user.pk)
     return Response({'ok': True})
 
 
@@ -423,23 +354,92 @@ def verify_email(request):
 def profile_view(request):
     if request.method == 'GET':
         u = request.user
-        prof, _ = Profile.objects.get_or_create(user=u)
-        return Response({'id': str(u.id), 'username': u.username, 'email': u.email, 'profile': ProfileSerializer(prof).data})
+        return Response({'id': str(u.id), 'username': u.username, 'email': u.email, 'profile': profile_cache.get_profile(u)})
     # PUT
     prof, _ = Profile.objects.get_or_create(user=request.user)
     ser = ProfileSerializer(prof, data=request.data, partial=True)
     if ser.is_valid():
         ser.save()
+        profile_cache.invalidate(request.user, ser.data)
         return Response(ser.data)
     return Response({'error': 'Datos invalidos', 'issues': ser.errors}, status=400)
 
 
+def _requests_queryset():
+    # Oferta aceptada vía la columna desnormalizada; ofertas anidadas en una sola consulta extra
+    offers = Offer.objects.select_related('provider__profile').order_by('-created_at')
+    return Request.objects.defer('search_vector').select_related('accepted_offer__provider__profile').prefetch_related(
+        Prefetch('offers', queryset=offers),
+    )
+
+
+# Columnas que leen las representaciones resumidas (?view=summary)
+REQUEST_SUMMARY_COLUMNS = ('id', 'owner_id', 'title', 'category', 'location', 'urgency', 'status', 'budget', 'created_at',
+                           'offer_count', 'accepted_offer_id', 'last_activity_at')
+SERVICE_SUMMARY_COLUMNS = ('id', 'owner_id', 'title', 'category', 'price_from', 'location', 'status', 'created_at')
+LEAD_SUMMARY_COLUMNS = ('id', 'service_id', 'client_id', 'contact', 'status', 'created_at')
+
+
+def _list_options(request):
+    """Lee ?view=summary y ?fields=a,b de un listado. Devuelve (summary, fields)."""
+    summary = (request.query_params.get('view') or '').strip().lower() == 'summary'
+    fields = [f.strip() for f in (request.query_params.get('fields') or '').split(',') if f.strip()]
+    return summary, fields or None
+
+
+# Cota de Request.budget (max_digits=12, decimal_places=2)
+BUDGET_STEP = Decimal('0.01')
+BUDGET_LIMIT = Decimal(10) ** 10
+
+
+def _filter_requests(qs, params):
+    """Aplica filtros de listado (?status=&category=&urgency=&owner=&budget_min=&budget_max=)."""
+    for field in ('status', 'category', 'urgency'):
+        value = (params.get(field) or '').strip()
+        if value:
+            qs = qs.filter(**{field: value})
+    owner = (params.get('owner') or '').strip()
+    if owner:
+        try:
+            qs = qs.filter(owner_id=uuid.UUID(owner))
+        except ValueError:
+            raise ValueError('owner inválido')
+    for param, lookup in (('budget_min', 'budget__gte'), ('budget_max', 'budget__lte')):
+        value = (params.get(param) or '').strip()
+        if value:
+            # Decimal acepta 'NaN', 'Infinity' y exponentes enormes (1e999999999,
+            # 1e-999999999) que Postgres no puede comparar (DataError -> 500): se lleva
+            # a la escala de la columna, numeric(12, 2), y se acota.
+            try:
+                amount = Decimal(value).quantize(BUDGET_STEP)
+            except InvalidOperation:
+                raise ValueError(f'{param} inválido')
+            if not amount.is_finite() or amount.copy_abs() >= BUDGET_LIMIT:
+                raise ValueError(f'{param} inválido')
+            qs = qs.filter(**{lookup: amount})
+    return qs
+
+
 @api_view(['GET', 'POST'])
 def requests_view(request):
     if request.method == 'GET':
-        qs = Request.objects.all().order_by('-created_at').prefetch_related('offers')
-        data = RequestSerializer(qs, many=True).data
-        return Response(data)
+        params = request.query_params
+        summary, fields = _list_options(request)
+        if summary:
+            base = Request.objects.only(*REQUEST_SUMMARY_COLUMNS)
+            ser_class = RequestSummarySerializer
+        else:
+            base, ser_class = _requests_queryset(), RequestSerializer
+        try:
+            qs = _filter_requests(base, params)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=400)
+        # Siempre paginado (sin ?limit, DEFAULT_PAGE_SIZE): nunca se serializa la tabla completa
+        try:
+            items, next_cursor = keyset_page(qs, params.get('cursor'), page_size(params.get('limit')))
+        except InvalidCursor:
+            return Response({'error': 'Cursor inválido'}, status=400)
+        return Response({'results': ser_class(items, many=True, fields=fields).data, 'next': next_cursor})
     # POST
     if not request.user.is_authenticated:
         return Response({'error': 'Autenticación requerida'}, status=401)
@@ -465,7 +465,7 @@ def requests_view(request):
 @api_view(['GET', 'PUT', 'DELETE'])
 def request_view(request, request_id):
     try:
-        obj = Request.objects.prefetch_related('offers').get(id=request_id)
+        obj = _requests_queryset().get(id=request_id)
     except Request.DoesNotExist:
         return Response({'error': 'No encontrado'}, status=404)
     if request.method == 'GET':
@@ -512,33 +512,23 @@ def offers_view(request, request_id):
             return Response({'error': 'El precio no puede ser negativo'}, status=400)
     except Exception:
         return Response({'error': 'Precio inválido'}, status=400)
-    off = req.offers.filter(provider=me).first()
-    if off:
-        off.message = request.data.get('message', off.message)
-        off.price = request.data.get('price', off.price) or 0
-        off.status = 'accepted' if off.status == 'accepted' else 'pending'
-        off.save()
-        return Response(OfferSerializer(off).data)
-    off = Offer.objects.create(request=req, provider=me, message=request.data.get('message', ''), price=request.data.get('price', 0))
-    return Response(OfferSerializer(off).data, status=201)
+    off, created = offer_ops.save_offer(req, me, request.data.get('message'), request.data.get('price'))
+    return Response(OfferSerializer(off).data, status=201 if created else 200)
 
 
 @api_view(['POST'])
 def offer_accept(request, request_id, offer_id):
     try:
-        req = Request.objects.prefetch_related('offers').get(id=request_id)
+        req = Request.objects.only('id', 'owner_id').get(id=request_id)
     except Request.DoesNotExist:
         return Response({'error': 'Solicitud no existe'}, status=404)
-    if req.owner != request.user:
+    if req.owner_id != request.user.id:
         return Response({'error': 'Prohibido'}, status=403)
-    if not req.offers.filter(id=offer_id).exists():
+    try:
+        transition = offer_ops.accept_offer(req.pk, offer_id)
+    except Offer.DoesNotExist:
         return Response({'error': 'Oferta no existe'}, status=404)
-    req.offers.update(status='rejected')
-    req.offers.filter(id=offer_id).update(status='accepted')
-    if req.status == 'pendiente':
-        req.status = 'en_progreso'
-        req.save()
-    return Response({'ok': True})
+    return Response({'ok': True, 'transition': transition})
 
 
 @api_view(['POST'])
@@ -553,15 +543,23 @@ def offer_reject(request, request_id, offer_id):
         off = Offer.objects.get(id=offer_id, request=req)
     except Offer.DoesNotExist:
         return Response({'error': 'Oferta no existe'}, status=404)
-    off.status = 'rejected'
-    off.save()
+    offer_ops.reject_offers(Offer.objects.filter(pk=off.pk))
     return Response({'ok': True})
 
 
+def _services_list(request, qs):
+    summary, fields = _list_options(request)
+    if summary:
+        qs, ser_class = qs.only(*SERVICE_SUMMARY_COLUMNS), ServiceSummarySerializer
+    else:
+        qs, ser_class = qs.defer('search_vector'), ServiceSerializer
+    return ser_class(qs.order_by('-created_at'), many=True, fields=fields).data
+
+
 @api_view(['GET', 'POST'])
 def services_view(request):
     if request.method == 'GET':
-        return Response(ServiceSerializer(Service.objects.all().order_by('-created_at'), many=True).data)
+        return Response(_services_list(request, Service.objects.all()))
     if not request.user.is_authenticated:
         return Response({'error': 'Autenticación requerida'}, status=401)
     if _role_of(request.user) != 'provider':
@@ -613,10 +611,11 @@ def service_view(request, service_id):
 
 @api_view(['GET'])
 def my_services(request):
-    return Response(ServiceSerializer(Service.objects.filter(owner=request.user).order_by('-created_at'), many=True).data)
+    return Response(_services_list(request, Service.objects.filter(owner=request.user)))
 
 
 @api_view(['POST'])
+@ratelimit('lead', rate='30/h', key='user')
 def lead_create(request, service_id):
     try:
         s = Service.objects.get(id=service_id)
@@ -633,32 +632,105 @@ def lead_create(request, service_id):
 
 @api_view(['GET'])
 def my_leads(request):
-    return Response(LeadSerializer(Lead.objects.filter(provider=request.user).order_by('-created_at'), many=True).data)
+    qs = Lead.objects.filter(provider=request.user).order_by('-created_at')
+    summary, fields = _list_options(request)
+    if summary:
+        return Response(LeadSummarySerializer(qs.only(*LEAD_SUMMARY_COLUMNS), many=True, fields=fields).data)
+    return Response(LeadSerializer(qs, many=True, fields=fields).data)
+
+
+EXPORT_FORMATS = {
+    'csv': (extracts.csv_chunks, 'text/csv; charset=utf-8', 'csv'),
+    'ndjson': (extracts.ndjson_chunks, 'application/x-ndjson; charset=utf-8', 'ndjson'),
+}
+
+
+def _stream_chunks(request, chunks):
+    """
+    Bajo WSGI el generador se entrega tal cual. Bajo ASGI Django consumiría un
+    iterador sync completo antes de enviar nada, así que se envuelve en uno async
+    que pide cada trozo al hilo del request (mismo hilo => misma conexión y cursor).
+    """
+    if not isinstance(request, ASGIRequest):
+        return chunks
+    done = object()
+
+    async def agen():
+        try:
+            while True:
+                chunk = await sync_to_async(next)(chunks, done)
+                if chunk is done:
+                    return
+                yield chunk
+        finally:
+            await sync_to_async(chunks.close)()
+    return agen()
+
+
+def my_export(request):
+    """
+    GET ?kind=leads|requests|offers|chats&format=csv|ndjson: descarga en streaming
+    de los datos propios. Las filas salen de un cursor del servidor, sin armar la
+    lista en memoria. Vista Django simple (no api_view): DRF reserva ?format= para
+    elegir renderer.
+    """
+    if request.method != 'GET':
+        return JsonResponse({'error': 'Método no permitido'}, status=405)
+    try:
+        auth = ClaimsJWTAuthentication().authenticate(request)
+    except Exception:
+        auth = None
+    if not auth:
+        return JsonResponse({'error': 'Autenticación requerida'}, status=401)
+    user = auth[0]
+    allowed, retry_in = rate_hit('export', f'u{user.pk}', '20/h')
+    if not allowed:
+        resp = JsonResponse({'error': 'Demasiadas solicitudes, intenta más tarde', 'retry_in': retry_in}, status=429)
+        resp['Retry-After'] = str(retry_in)
+        return resp
+    kind = request.GET.get('kind') or ''
+    fmt = request.GET.get('format') or 'csv'
+    if kind not in extracts.USER_EXPORTS:
+        return JsonResponse({'error': f"kind debe ser uno de: {', '.join(extracts.USER_EXPORTS)}"}, status=400)
+    if fmt not in EXPORT_FORMATS:
+        return JsonResponse({'error': f"format debe ser uno de: {', '.join(EXPORT_FORMATS)}"}, status=400)
+    encode, content_type, ext = EXPORT_FORMATS[fmt]
+    cols, qs = extracts.user_export(kind, user)
+    chunks = encode(cols, extracts.rows(qs, cols, chunk_size=1000), rows_per_write=200)
+    resp = StreamingHttpResponse(_stream_chunks(request, chunks), content_type=content_type)
+    resp['Content-Disposition'] = f'attachment; filename="fixly-{kind}-{timezone.localdate():%Y%m%d}.{ext}"'
+    resp['Cache-Control'] = 'no-cache'
+    resp['X-Accel-Buffering'] = 'no'
+    return resp
 
 
 @api_view(['GET', 'POST'])
 @permission_classes([IsAuthenticated])
 def chat_view(request, request_id):
     try:
-        req = Request.objects.prefetch_related('offers').get(id=request_id)
+        req = Request.objects.select_related('owner', 'accepted_offer').get(id=request_id)
     except Request.DoesNotExist:
         return Response({'error': 'Solicitud no existe'}, status=404)
     # authorize
-    winner = req.offers.filter(status='accepted').first()
+    winner = req.accepted_offer
     if not winner:
         return Response({'error': 'No hay oferta aceptada para esta solicitud.'}, status=400)
-    # ComparaciÃ³n robusta por IDs para evitar problemas de identidad
-    uid = str(request.user.id)
-    owner_id = str(req.owner_id)
-    provider_id = str(winner.provider_id)
-    allowed_ids = {owner_id, provider_id}
-    # Fallback adicional por username (por si el front no refrescÃ³ el id todavÃ­a)
-    owner_username = (req.owner.username or '').lower()
-    me_username = (request.user.username or '').lower()
-    if uid not in allowed_ids and me_username != owner_username:
+    if not chat_sync.can_access(req, request.user):
+        uid = str(request.user.id)
+        owner_id = str(req.owner_id)
+        provider_id = str(winner.provider_id)
+        owner_username = (req.owner.username or '').lower()
+        me_username = (request.user.username or '').lower()
         return Response({'error': 'No autorizado.', 'who': uid, 'owner': owner_id, 'provider': provider_id, 'me_username': me_username, 'owner_username': owner_username}, status=403)
     if request.method == 'GET':
-        return Response(ChatMessageSerializer(ChatMessage.objects.filter(request=req).order_by('ts'), many=True).data)
+        # ?since=<id de mensaje|fecha ISO> devuelve solo lo nuevo; ?wait=N espera hasta N s (long-poll)
+        since = request.query_params.get('since')
+        try:
+            since_q = chat_sync.parse_since(req, since)
+            wait = chat_sync.parse_wait(request.query_params.get('wait')) if since else 0
+        except ValueError as e:
+            return Response({'error': str(e)}, status=400)
+        return Response(ChatMessageSerializer(chat_sync.fetch_messages(req, since_q, wait), many=True).data)
     # POST
     # Normaliza saltos de lÃ­nea y elimina secuencias literales "\\n"
     raw = request.data.get('text') or ''
@@ -671,7 +743,33 @@ def chat_view(request, request_id):
         return Response({'error': 'Texto vacio'}, status=400)
     recipient = winner.provider if request.user == req.owner else req.owner
     msg = ChatMessage.objects.create(request=req, sender=request.user, recipient=recipient, text=text)
-    return Response(ChatMessageSerializer(msg).data, status=201)
+    offer_ops.touch(req.pk)
+    data = ChatMessageSerializer(msg).data
+    chat_sync.notify_new_message(req.pk, data)
+    return Response(data, status=201)
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def search_view(request):
+    """
+    GET /api/search?q=&type=requests|services&page=&limit= (por relevancia, con resaltado).
+    Solo los primeros search.MAX_RESULTS resultados: más allá, results vacío y next null.
+    """
+    q = (request.query_params.get('q') or '').strip()
+    if not q:
+        return Response({'error': 'Falta el parámetro q'}, status=400)
+    kind = (request.query_params.get('type') or '').strip()
+    if kind and kind not in fts.SEARCH_TYPES:
+        return Response({'error': 'type inválido'}, status=400)
+    kinds = (kind,) if kind else tuple(fts.SEARCH_TYPES)
+    limit = page_size(request.query_params.get('limit'))
+    try:
+        page = max(1, int(request.query_params.get('page') or 1))
+    except ValueError:
+        return Response({'error': 'page inválido'}, status=400)
+    items, has_more = fts.search(q, kinds, offset=(page - 1) * limit, limit=limit)
+    return Response({'results': items, 'page': page, 'next': page + 1 if has_more else None})
 
 
 @api_view(['POST'])
@@ -685,7 +783,7 @@ def review_create(request):
         return Response({'error': 'Rating inválido'}, status=400)
     ser = ReviewSerializer(data=request.data)
     if ser.is_valid():
-        obj = Review.objects.create(
+        obj = ratings.add_review(
             request_id=ser.validated_data['request'].id,
             to_user_id=ser.validated_data['to_user'].id,
             from_user=request.user,
@@ -705,145 +803,200 @@ def user_reviews(request, user_id):
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def user_rating(request, user_id):
-    agg = Review.objects.filter(to_user_id=user_id).aggregate(count=Count('id'), avg=Avg('rating'))
-    return Response({'count': agg['count'] or 0, 'avg': float(agg['avg'] or 0)})
+    return Response(ratings.summaries([user_id])[user_id])
+
+
+MAX_RATING_IDS = 200
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def users_ratings(request):
+    # ?ids=uuid1,uuid2,... -> {uuid: {count, avg, stars}} con una sola consulta
+    raw = [x.strip() for x in (request.query_params.get('ids') or '').split(',') if x.strip()]
+    if not raw:
+        return Response({'error': 'Falta ids'}, status=400)
+    if len(raw) > MAX_RATING_IDS:
+        return Response({'error': f'Máximo {MAX_RATING_IDS} ids por consulta'}, status=400)
+    try:
+        ids = list(dict.fromkeys(uuid.UUID(x) for x in raw))
+    except ValueError:
+        return Response({'error': 'ids inválidos'}, status=400)
+    return Response({str(uid): data for uid, data in ratings.summaries(ids).items()})
 
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def user_detail(request, user_id):
     try:
-        u = User.objects.get(id=user_id)
-        prof, _ = Profile.objects.get_or_create(user=u)
-        return Response({
-            'id': str(u.id),
-            'username': u.username,
-            'email': u.email,
-            'profile': ProfileSerializer(prof).data,
-        })
+        return Response(profile_cache.get_user_card(user_id))
     except User.DoesNotExist:
         return Response({'error': 'Usuario no encontrado'}, status=404)
 
 
 # ===== Assistant (Ollama local) =====
 
-def _load_faq_entries():
-    try:
-        base = getattr(settings, 'BASE_DIR', Path(__file__).resolve().parent.parent)
-        p = Path(base) / 'assistant' / 'faq.json'
-        with open(p, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except Exception:
-        return []
-
-
-def _pick_relevant_faq(message, k=5):
-    msg = (message or '').lower()
-    if not msg:
-        return []
-    words = [w for w in slugify(msg).split('-') if len(w) > 2]
-    if not words:
-        words = msg.split()
-    entries = _load_faq_entries()
-    def score(item):
-        t = (item.get('q','') + ' ' + item.get('a','')).lower()
-        return sum(1 for w in words if w and w in t)
-    ranked = sorted(entries, key=score, reverse=True)
-    return ranked[:k]
-
-
-def _ollama_chat(messages, model=None, base_url=None, temperature=0.2):
-    model = model or os.getenv('OLLAMA_MODEL', 'phi3.5:3.8b')
-    base_url = base_url or os.getenv('OLLAMA_BASE_URL', 'http://127.0.0.1:11434')
-    url = f"{base_url.rstrip('/')}/api/chat"
-    payload = {
+def _assistant_context(user_msg, vector=None):
+    """Solo lo relevante para la pregunta: chunks recuperados del índice y las FAQ más cercanas."""
+    parts = []
+    faq = faq_store.get_store().search(user_msg, k=settings.ASSISTANT_FAQ_TOP_K)
+    if faq:
+        parts.append("Contexto FAQ:\n" + "\n".join(f"- {f['q']}: {f['a']}" for f in faq))
+    chunks = rag.retrieve(user_msg, vector=vector) if vector is not None else []
+    if chunks:
+        parts.append("Documentación:\n" + "\n---\n".join(item['text'] for _, item in chunks))
+    return "\n\n".join(parts)
+
+
+# Subirlo al cambiar el prompt: invalida las respuestas cacheadas
+PROMPT_VERSION = 1
+
+
+def _assistant_messages(user_msg, vector=None):
+    system_prompt = (
+        "Eres el asistente oficial de Fixly. Responde únicamente sobre cómo usar la plataforma: "
+        "- Cómo publicar una solicitud y gestionarla (estado, ofertas, aceptación). "
+        "- Cómo publicar/editar servicios. "
+        "- Notificaciones y seguimiento. "
+        "- El chat solo se habilita cuando una oferta ha sido aceptada. "
+        "No hables de temas ajenos a Fixly ni ofrezcas chatear como IA general. "
+        "Sé conciso (1-2 frases), en español. Si no tienes la info, sugiere contactar soporte.\n\n"
+        + _assistant_context(user_msg, vector)
+    )
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_msg},
+    ]
+
+
+def _assistant_prepare(user_msg):
+    """
+    (respuesta, None) si está en caché (exacta o semántica); si no,
+    (None, pendiente) con los mensajes para Ollama y lo necesario para cachear.
+    El embedding del mensaje se calcula una vez y sirve para la caché y el RAG.
+    """
+    cache = assistant_cache.get_cache()
+    model = settings.OLLAMA_MODEL
+    version = assistant_cache.content_version(PROMPT_VERSION)
+    reply = cache.get_exact(user_msg, model, version)
+    if reply is None:
+        vector = rag.embed_query(user_msg)
+        reply = cache.get_semantic(vector, model, version)
+    if reply is not None:
+        return reply, None
+    return None, {
+        'messages': _assistant_messages(user_msg, vector),
+        'vector': vector,
         'model': model,
-        'messages': messages,
-        'stream': False,  # devolver JSON Ãºnico (no NDJSON)
-        'keep_alive': os.getenv('OLLAMA_KEEP_ALIVE', '30m'),
-        'options': { 'temperature': temperature, 'num_predict': int(os.getenv('OLLAMA_NUM_PREDICT','256')), 'num_thread': int(os.getenv('OLLAMA_THREADS','4')) }
+        'version': version,
     }
-    data = json.dumps(payload).encode('utf-8')
-    headers = { 'Content-Type': 'application/json' }
-    try:
-        if _requests is not None:
-            r = _requests.post(url, json=payload, timeout=60)
-            r.raise_for_status()
-            return r.json().get('message', {}).get('content', '')
-        # urllib fallback
-        req = _urlreq.Request(url, data=data, headers=headers)
-        with _urlreq.urlopen(req, timeout=60) as resp:
-            js = json.loads(resp.read().decode('utf-8'))
-            return js.get('message', {}).get('content', '')
-    except Exception as e:
-        raise RuntimeError(f"Ollama error: {e}")
-
-
-def _embed_ollama(text, base_url=None, model=None):
-    """Obtiene un embedding desde Ollama para el texto dado."""
-    base_url = base_url or os.getenv('OLLAMA_BASE_URL', 'http://127.0.0.1:11434')
-    model = model or os.getenv('OLLAMA_EMBED_MODEL', 'nomic-embed-text')
-    url = f"{base_url.rstrip('/')}/api/embeddings"
-    payload = {'model': model, 'input': text}
-    data = json.dumps(payload).encode('utf-8')
-    headers = {'Content-Type': 'application/json'}
-    if _requests is not None:
-        r = _requests.post(url, json=payload, timeout=120)
-        r.raise_for_status()
-        return r.json().get('embedding', [])
-    req = _urlreq.Request(url, data=data, headers=headers)
-    with _urlreq.urlopen(req, timeout=120) as resp:
-        js = json.loads(resp.read().decode('utf-8'))
-        return js.get('embedding', [])
+
+
+def _assistant_remember(user_msg, pending, reply):
+    if reply and reply.strip():
+        assistant_cache.get_cache().put(user_msg, pending['model'], pending['version'], reply, pending['vector'])
 
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@ratelimit('assistant', rate='20/m', key='user')
 def assistant_chat(request):
     """
     Proxy sencillo a Ollama (chat) con un prompt corto y contexto de FAQ.
     Devuelve siempre una respuesta breve en español.
     """
-    import requests
-
     user_msg = (request.data.get('message') or '').strip()
     if not user_msg:
         return Response({"error": "Falta el mensaje"}, status=400)
 
-    # Cargar FAQ local para dar un poco de contexto
-    faq_entries = _load_faq_entries()
-    faq_text = "\n".join([f"- {f.get('question','')}: {f.get('answer','')}" for f in faq_entries])
+    cached, pending = _assistant_prepare(user_msg)
+    if cached is not None:
+        return Response({"reply": cached, "cached": True})
+    try:
+        answer = ollama.chat(pending['messages'], timeout=settings.ASSISTANT_SYNC_TIMEOUT)
+    except ollama.OllamaError as e:
+        return Response({"error": str(e)}, status=502)
+    _assistant_remember(user_msg, pending, answer)
+    return Response({"reply": answer})
 
-    system_prompt = (
-        "Eres el asistente oficial de Fixly. Responde únicamente sobre cómo usar la plataforma: "
-        "- Cómo publicar una solicitud y gestionarla (estado, ofertas, aceptación). "
-        "- Cómo publicar/editar servicios. "
-        "- Notificaciones y seguimiento. "
-        "- El chat solo se habilita cuando una oferta ha sido aceptada. "
-        "No hables de temas ajenos a Fixly ni ofrezcas chatear como IA general. "
-        "Sé conciso (1-2 frases), en español. Si no tienes la info, sugiere contactar soporte. "
-        "Contexto FAQ:\n" + faq_text
-    )
 
-    ollama_host = os.getenv("OLLAMA_BASE_URL", "http://127.0.0.1:11434")
-    model = os.getenv("OLLAMA_MODEL", "llama3")
-    url = f"{ollama_host.rstrip('/')}/api/chat"
-
-    payload = {
-        "model": model,
-        "stream": False,
-        "messages": [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_msg},
-        ],
-    }
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def assistant_cache_stats(request):
+    """Aciertos/fallos de la caché de respuestas de este proceso."""
+    return Response(assistant_cache.get_cache().stats())
+
 
+def _assistant_rate_ident(request):
     try:
-        res = requests.post(url, json=payload, timeout=8)
-        if not res.ok:
-            return Response({"error": f"Ollama {res.status_code}"}, status=502)
-        data = res.json()
-        answer = data.get("message", {}).get("content") or ""
-        return Response({"reply": answer})
-    except requests.exceptions.RequestException as e:
-        return Response({"error": f"No se pudo conectar a Ollama: {e}"}, status=502)
+        auth = ClaimsJWTAuthentication().authenticate(request)
+    except Exception:
+        auth = None
+    return f'u{auth[0].pk}' if auth else f'ip{client_ip(request)}'
+
+
+def _ndjson(event):
+    return json.dumps(event, ensure_ascii=False) + "\n"
+
+
+@csrf_exempt
+async def assistant_chat_stream(request):
+    """
+    Igual que assistant_chat pero en streaming (NDJSON, una línea por evento):
+    {"type": "delta", "text": ...} por cada fragmento y al final {"type": "done"}
+    o {"type": "error", "error": ...} (también como único evento si no hay cupo
+    en ASSISTANT_QUEUE_TIMEOUT, con "code": "busy"). Vista async: mientras Ollama genera no se
+    ocupa ningún worker ni hilo. Requiere servir con ASGI (daphne).
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Método no permitido'}, status=405)
+    try:
+        body = json.loads(request.body or b'{}')
+    except ValueError:
+        return JsonResponse({'error': 'JSON inválido'}, status=400)
+    user_msg = (body.get('message') or '').strip() if isinstance(body, dict) else ''
+    if not user_msg:
+        return JsonResponse({'error': 'Falta el mensaje'}, status=400)
+
+    ident = await sync_to_async(_assistant_rate_ident)(request)
+    allowed, retry_in = await sync_to_async(rate_hit)('assistant', ident, '20/m')
+    if not allowed:
+        resp = JsonResponse({'error': 'Demasiadas solicitudes, intenta más tarde', 'retry_in': retry_in}, status=429)
+        resp['Retry-After'] = str(retry_in)
+        return resp
+
+    cached, pending = await sync_to_async(_assistant_prepare)(user_msg)
+    if cached is not None:
+        async def replay():
+            yield _ndjson({'type': 'delta', 'text': cached})
+            yield _ndjson({'type': 'done', 'cached': True})
+        return StreamingHttpResponse(replay(), content_type='application/x-ndjson; charset=utf-8')
+
+    async def events():
+        # El cupo se reserva dentro del generador: si la respuesta nunca se itera
+        # (cliente que corta antes) no queda un cupo tomado para siempre.
+        try:
+            slot = await ollama.acquire_slot()
+        except ollama.Busy:
+            yield _ndjson({'type': 'error', 'error': 'El asistente está ocupado, intenta en unos segundos', 'code': 'busy'})
+            return
+        except ollama.OllamaError as e:
+            yield _ndjson({'type': 'error', 'error': str(e)})
+            return
+        parts = []
+        try:
+            async for text in ollama.stream_chat(pending['messages']):
+                parts.append(text)
+                yield _ndjson({'type': 'delta', 'text': text})
+            await sync_to_async(_assistant_remember)(user_msg, pending, ''.join(parts))
+            yield _ndjson({'type': 'done'})
+        except ollama.OllamaError as e:
+            yield _ndjson({'type': 'error', 'error': str(e)})
+        finally:
+            slot.release()
+
+    resp = StreamingHttpResponse(events(), content_type='application/x-ndjson; charset=utf-8')
+    # Que ningún proxy acumule la respuesta
+    resp['Cache-Control'] = 'no-cache'
+    resp['X-Accel-Buffering'] = 'no'
+    return resp
@@ -1,15 +1,23 @@
+import hashlib
 import json
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from django.conf import settings
-import os
+
+import numpy as np
+
+from api.rag import INDEX_DTYPES, load_index, meta_path_for, write_binary
 
 try:
     import requests as _requests
+    from requests.adapters import HTTPAdapter
 except Exception:  # pragma: no cover
     _requests = None
     import urllib.request as _urlreq
-    import urllib.error as _urlerr
 
 
 def _read_text_files(root: Path):
@@ -39,36 +47,88 @@ def _chunk(text: str, max_chars: int = 1200, overlap: int = 150):
     return [c for c in parts if c]
 
 
-def _embed_ollama(input_text: str, base_url: str, model: str):
-    payload = {'model': model, 'input': input_text}
-    url = f"{base_url.rstrip('/')}/api/embeddings"
-    data = json.dumps(payload).encode('utf-8')
-    headers = {'Content-Type': 'application/json'}
-    if _requests is not None:
-        r = _requests.post(url, json=payload, timeout=120)
+def _chunk_hash(model: str, text: str):
+    # El modelo entra al hash: cambiar de modelo invalida todos los vectores
+    return hashlib.sha256(f'{model}\0{text}'.encode('utf-8')).hexdigest()
+
+
+def _embed_batch(session, texts, base_url: str, model: str, timeout: float):
+    # /api/embed recibe 'input' (texto o lista) y devuelve 'embeddings' en el mismo orden
+    payload = {'model': model, 'input': texts}
+    url = f"{base_url.rstrip('/')}/api/embed"
+    if session is not None:
+        r = session.post(url, json=payload, timeout=timeout)
         r.raise_for_status()
-        return r.json().get('embedding', [])
-    req = _urlreq.Request(url, data=data, headers=headers)
-    with _urlreq.urlopen(req, timeout=120) as resp:
-        js = json.loads(resp.read().decode('utf-8'))
-        return js.get('embedding', [])
+        vectors = r.json().get('embeddings') or []
+    else:
+        data = json.dumps(payload).encode('utf-8')
+        req = _urlreq.Request(url, data=data, headers={'Content-Type': 'application/json'})
+        with _urlreq.urlopen(req, timeout=timeout) as resp:
+            vectors = json.loads(resp.read().decode('utf-8')).get('embeddings') or []
+    if len(vectors) != len(texts):
+        raise CommandError(f'Ollama devolvió {len(vectors)} embeddings para {len(texts)} textos')
+    return vectors
+
+
+def _load_previous(path: Path):
+    """({hash: vector}, formato, dtype, [hashes en orden]) del índice anterior, binario o JSON."""
+    try:
+        idx = load_index(path, mmap=False)
+    except (OSError, ValueError, KeyError):
+        return {}, None, None, []
+    hashes = [it.get('hash') for it in idx.items]
+    fmt = 'npy' if meta_path_for(path).exists() else 'json'
+    dtype = idx.matrix.dtype.name
+    if not len(idx):
+        return {}, fmt, dtype, hashes
+    vectors = idx.vectors()
+    return {h: vectors[i] for i, h in enumerate(hashes) if h}, fmt, dtype, hashes
+
+
+def _write_json(path: Path, data):
+    # Se escribe a un temporal en la misma carpeta y se reemplaza: los lectores
+    # (api.rag) nunca ven un archivo a medio escribir
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f'.{path.name}.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
 
 
 class Command(BaseCommand):
-    help = 'Construye el índice local (embeddings) para el asistente RAG usando Ollama.'
+    help = ('Construye el índice local (embeddings) para el asistente RAG usando Ollama. '
+            'Reutiliza los vectores de chunks sin cambios y embebe el resto en lotes paralelos.')
 
     def add_arguments(self, parser):
-        parser.add_argument('--base-url', default=os.getenv('OLLAMA_BASE_URL', 'http://127.0.0.1:11434'))
-        parser.add_argument('--embed-model', default=os.getenv('OLLAMA_EMBED_MODEL', 'nomic-embed-text'))
+        parser.add_argument('--base-url', default=settings.OLLAMA_BASE_URL)
+        parser.add_argument('--embed-model', default=settings.OLLAMA_EMBED_MODEL)
+        parser.add_argument('--batch-size', type=int, default=32, help='Chunks por llamada a /api/embed')
+        parser.add_argument('--workers', type=int, default=4, help='Llamadas simultáneas a Ollama')
+        parser.add_argument('--timeout', type=float, default=120)
+        parser.add_argument('--format', choices=('npy', 'json'), default='npy',
+                            help='npy: vectores en .npy (mmap) + index.meta.json; json: formato anterior')
+        parser.add_argument('--dtype', choices=INDEX_DTYPES, default='float32', help='Tipo de los vectores en formato npy')
+        parser.add_argument('--full', action='store_true', help='Ignora el índice anterior y embebe todo')
+        parser.add_argument('--check', action='store_true',
+                            help='Solo informa chunks nuevos/modificados/eliminados; falla si el índice está desactualizado')
 
     def handle(self, *args, **opts):
         base_dir = getattr(settings, 'BASE_DIR', Path(__file__).resolve().parents[4])
         docs_dir = Path(base_dir) / 'assistant' / 'docs'
-        out_path = Path(base_dir) / 'assistant' / 'index.json'
+        out_path = Path(settings.ASSISTANT_INDEX_PATH)
         out_path.parent.mkdir(parents=True, exist_ok=True)
 
         base_url = opts['base_url']
         model = opts['embed_model']
+        t0 = time.perf_counter()
 
         if not docs_dir.exists():
             self.stderr.write(self.style.WARNING(f'No existe carpeta de docs: {docs_dir}'))
@@ -76,21 +136,76 @@ class Command(BaseCommand):
 
         self.stdout.write(self.style.NOTICE(f'Leyendo documentos desde {docs_dir}'))
         rows = []
-        total_chunks = 0
         for p, txt in _read_text_files(docs_dir):
-            chunks = _chunk(txt)
-            for idx, ch in enumerate(chunks):
-                emb = _embed_ollama(ch, base_url, model)
+            for idx, ch in enumerate(_chunk(txt)):
                 rows.append({
                     'id': f'{p.name}:{idx}',
                     'path': str(p.relative_to(docs_dir)),
                     'chunk': idx,
+                    'hash': _chunk_hash(model, ch),
                     'text': ch,
-                    'vector': emb,
                 })
-                total_chunks += 1
-        with out_path.open('w', encoding='utf-8') as f:
-            json.dump({'model': model, 'count': total_chunks, 'items': rows}, f, ensure_ascii=False)
 
-        self.stdout.write(self.style.SUCCESS(f'Índice guardado en {out_path} ({total_chunks} chunks)'))
+        previous, prev_format, prev_dtype, prev_hashes = ({}, None, None, []) if opts['full'] else _load_previous(out_path)
+        pending = [r for r in rows if r['hash'] not in previous]
+        current = {r['hash'] for r in rows}
+        removed = [h for h in previous if h not in current]
+
+        if opts['check']:
+            self.stdout.write(f'Chunks: {len(rows)}  nuevos/modificados: {len(pending)}  eliminados: {len(removed)}')
+            for r in pending:
+                self.stdout.write(f'  desactualizado: {r["id"]}')
+            if pending or removed:
+                raise CommandError('El índice está desactualizado; ejecuta build_assistant_index')
+            self.stdout.write(self.style.SUCCESS('Índice al día'))
+            return
+
+        same_layout = prev_format == opts['format'] and (opts['format'] == 'json' or prev_dtype == opts['dtype'])
+        if not pending and not removed and same_layout and prev_hashes == [r['hash'] for r in rows]:
+            self.stdout.write(self.style.SUCCESS(
+                f'Índice al día ({len(rows)} chunks, {(time.perf_counter() - t0) * 1000:.0f} ms)'))
+            return
 
+        vectors = dict(previous)
+        if pending:
+            self._embed_pending(pending, vectors, base_url, model, opts)
+
+        if opts['format'] == 'npy':
+            matrix = np.asarray([vectors[r['hash']] for r in rows], dtype=np.float32)
+            written = write_binary(out_path, model, rows, matrix, opts['dtype'])
+        else:
+            for r in rows:
+                r['vector'] = [float(x) for x in vectors[r['hash']]]
+            _write_json(out_path, {'model': model, 'count': len(rows), 'items': rows})
+            written = out_path
+            # Si quedara un índice binario, api.rag lo preferiría sobre este JSON
+            meta_path_for(out_path).unlink(missing_ok=True)
+        self.stdout.write(self.style.SUCCESS(
+            f'Índice guardado en {written} ({len(rows)} chunks, {len(pending)} embebidos, '
+            f'{len(rows) - len(pending)} reutilizados, {time.perf_counter() - t0:.2f}s)'))
+
+    def _embed_pending(self, pending, vectors, base_url, model, opts):
+        # Textos repetidos se embeben una sola vez
+        unique = list({r['hash']: r['text'] for r in pending}.items())
+        size = max(1, opts['batch_size'])
+        batches = [unique[i:i + size] for i in range(0, len(unique), size)]
+        workers = max(1, min(opts['workers'], len(batches)))
+
+        session = None
+        if _requests is not None:
+            session = _requests.Session()
+            session.mount('http://', HTTPAdapter(pool_maxsize=workers))
+            session.mount('https://', HTTPAdapter(pool_maxsize=workers))
+
+        def run(batch):
+            return batch, _embed_batch(session, [t for _, t in batch], base_url, model, opts['timeout'])
+
+        self.stdout.write(f'Embebiendo {len(unique)} chunks en {len(batches)} lotes con {workers} workers')
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                for batch, embs in pool.map(run, batches):
+                    for (h, _), emb in zip(batch, embs):
+                        vectors[h] = emb
+        finally:
+            if session is not None:
+                session.close()
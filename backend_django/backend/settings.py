@@ -22,6 +22,7 @@ ALLOWED_HOSTS = [
 # ---------------------------------------------------------------------
 INSTALLED_APPS = [
     # Terceros primero si afectan middleware
+    "daphne",  # runserver ASGI (WebSocket del chat)
     "corsheaders",
 
     # Django
@@ -31,6 +32,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
 
     # Terceros
     "rest_framework",
@@ -75,6 +77,25 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = "backend.wsgi.application"
+ASGI_APPLICATION = "backend.asgi.application"
+
+# ---------------------------------------------------------------------
+# CHANNELS (WebSocket del chat)
+# ---------------------------------------------------------------------
+# Con REDIS_URL los mensajes se reparten entre procesos; sin él, capa en memoria
+# (un solo proceso: desarrollo y tests).
+REDIS_URL = os.getenv("REDIS_URL", "")
+if REDIS_URL:
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "channels_redis.core.RedisChannelLayer",
+            "CONFIG": {"hosts": [REDIS_URL]},
+        }
+    }
+else:
+    CHANNEL_LAYERS = {
+        "default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}
+    }
 
 # ---------------------------------------------------------------------
 # DB
@@ -87,9 +108,26 @@ DATABASES = {
         "PASSWORD": os.getenv("POSTGRES_PASSWORD", "postgres"),
         "HOST": os.getenv("POSTGRES_HOST", "localhost"),
         "PORT": os.getenv("POSTGRES_PORT", "5432"),
+        # Conexiones persistentes: se reutilizan entre requests del mismo worker
+        # hasta POSTGRES_CONN_MAX_AGE segundos (0 = una conexión por request).
+        "CONN_MAX_AGE": int(os.getenv("POSTGRES_CONN_MAX_AGE", "60")),
+        # Antes de reutilizarla se verifica que siga viva (reinicios, failover, idle timeout)
+        "CONN_HEALTH_CHECKS": os.getenv("POSTGRES_CONN_HEALTH_CHECKS", "True") == "True",
+        # Con PgBouncer en modo transacción los cursores con nombre no sobreviven
+        "DISABLE_SERVER_SIDE_CURSORS": os.getenv("POSTGRES_DISABLE_SERVER_SIDE_CURSORS", "False") == "True",
+        "OPTIONS": {
+            "connect_timeout": int(os.getenv("POSTGRES_CONNECT_TIMEOUT", "5")),
+            "keepalives": 1,
+            "keepalives_idle": 30,
+        },
     }
 }
 
+# Sin pool en proceso (Django 5.0 + psycopg2): cada worker mantiene su conexión
+# persistente (CONN_MAX_AGE). Para acotar el total de conexiones con muchos workers,
+# usar un pooler externo (PgBouncer en modo transacción, apuntando POSTGRES_HOST/PORT
+# a él y con POSTGRES_DISABLE_SERVER_SIDE_CURSORS=True).
+
 AUTH_PASSWORD_VALIDATORS = []
 
 LANGUAGE_CODE = "es"
@@ -119,6 +157,10 @@ CORS_ALLOWED_ORIGINS = [
     "https://somosfixly.cl",
 ]
 
+# Orígenes (esquema + host) desde los que se acepta el handshake WebSocket del chat.
+# ALLOWED_HOSTS solo lista los hosts de la API, no los de los frontends.
+WEBSOCKET_ALLOWED_ORIGINS = list(CORS_ALLOWED_ORIGINS)
+
 CORS_ALLOW_CREDENTIALS = True
 
 CORS_ALLOW_HEADERS = [
@@ -155,7 +197,8 @@ CSRF_TRUSTED_ORIGINS = [
 # ---------------------------------------------------------------------
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        # JWT sin consulta a User por request (ver api/authentication.py)
+        "api.authentication.ClaimsJWTAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": (
         "rest_framework.permissions.IsAuthenticatedOrReadOnly",
@@ -166,6 +209,37 @@ SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(days=7),
 }
 
+# ---------------------------------------------------------------------
+# CACHE
+# ---------------------------------------------------------------------
+# Con REDIS_URL la caché es compartida entre workers (invalidación inmediata);
+# sin él, LocMem por proceso.
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    }
+
+# La revocación de tokens (api.authentication) y la invalidación de perfiles/roles
+# (api.profile_cache) viven en esta caché y tienen que llegar a todos los workers:
+# fuera de DEBUG no se arranca con una caché por proceso (LocMem) salvo
+# REQUIRE_SHARED_CACHE=False, solo para despliegues de un único proceso.
+REQUIRE_SHARED_CACHE = os.getenv("REQUIRE_SHARED_CACHE", str(not DEBUG)) == "True"
+
+# Segundos que se reutiliza el perfil/rol cacheado (api.profile_cache). Con caché
+# compartida la invalidación es inmediata; con LocMem (REQUIRE_SHARED_CACHE=False) es
+# la ventana en que otro worker puede autorizar con el rol anterior.
+PROFILE_CACHE_TTL = int(os.getenv("PROFILE_CACHE_TTL", "60"))
+
+# Chat: espera máxima (segundos) de GET /api/chats/<id>/messages?since=...&wait=N
+CHAT_LONG_POLL_MAX = float(os.getenv("CHAT_LONG_POLL_MAX", "25"))
+
 # ---------------------------------------------------------------------
 # Email
 # ---------------------------------------------------------------------
@@ -186,3 +260,46 @@ EMAIL_USE_SSL = os.getenv("EMAIL_USE_SSL", "False") == "True"
 
 if EMAIL_USE_TLS and EMAIL_USE_SSL:
     EMAIL_USE_SSL = False
+
+# Bandeja de salida (api.mailer / manage.py run_mail_worker)
+MAIL_MAX_ATTEMPTS = int(os.getenv("MAIL_MAX_ATTEMPTS", "8"))
+MAIL_BACKOFF_BASE = int(os.getenv("MAIL_BACKOFF_BASE", "30"))
+MAIL_BACKOFF_MAX = int(os.getenv("MAIL_BACKOFF_MAX", "3600"))
+MAIL_LEASE_SECONDS = int(os.getenv("MAIL_LEASE_SECONDS", "300"))
+
+# Rate limiting (api.ratelimit): 'cache' usa CACHES (global con REDIS_URL); 'memory' es por proceso
+RATELIMIT_ENABLED = os.getenv("RATELIMIT_ENABLED", "True") == "True"
+RATELIMIT_BACKEND = os.getenv("RATELIMIT_BACKEND", "cache")
+RATELIMIT_MEMORY_MAX_KEYS = int(os.getenv("RATELIMIT_MEMORY_MAX_KEYS", "10000"))
+# Solo detrás de un proxy que reescriba X-Forwarded-For
+RATELIMIT_TRUST_FORWARDED = os.getenv("RATELIMIT_TRUST_FORWARDED", "False") == "True"
+
+# ---------------------------------------------------------------------
+# Asistente (Ollama local, api.ollama)
+# ---------------------------------------------------------------------
+OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://127.0.0.1:11434")
+OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3")
+OLLAMA_EMBED_MODEL = os.getenv("OLLAMA_EMBED_MODEL", "nomic-embed-text")
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+OLLAMA_NUM_PREDICT = int(os.getenv("OLLAMA_NUM_PREDICT", "256"))
+OLLAMA_THREADS = int(os.getenv("OLLAMA_THREADS", "4"))
+# Tiempo máximo de lectura por llamada (en streaming, entre fragmentos)
+OLLAMA_TIMEOUT = float(os.getenv("OLLAMA_TIMEOUT", "60"))
+# POST /api/assistant/chat responde de una vez y no debe retener al worker
+ASSISTANT_SYNC_TIMEOUT = float(os.getenv("ASSISTANT_SYNC_TIMEOUT", "8"))
+# Generaciones simultáneas por proceso y espera máxima por un cupo (luego 503)
+ASSISTANT_MAX_CONCURRENCY = int(os.getenv("ASSISTANT_MAX_CONCURRENCY", "2"))
+ASSISTANT_QUEUE_TIMEOUT = float(os.getenv("ASSISTANT_QUEUE_TIMEOUT", "5"))
+
+# RAG: índice de build_assistant_index y cuánto contexto entra al prompt
+ASSISTANT_INDEX_PATH = os.getenv("ASSISTANT_INDEX_PATH", str(BASE_DIR / "assistant" / "index.json"))
+ASSISTANT_RAG_TOP_K = int(os.getenv("ASSISTANT_RAG_TOP_K", "4"))
+ASSISTANT_RAG_MIN_SCORE = float(os.getenv("ASSISTANT_RAG_MIN_SCORE", "0.3"))
+ASSISTANT_FAQ_TOP_K = int(os.getenv("ASSISTANT_FAQ_TOP_K", "3"))
+ASSISTANT_EMBED_TIMEOUT = float(os.getenv("ASSISTANT_EMBED_TIMEOUT", "5"))
+
+# Caché de respuestas del asistente (api.assistant_cache, por proceso)
+ASSISTANT_CACHE_TTL = int(os.getenv("ASSISTANT_CACHE_TTL", "3600"))
+ASSISTANT_CACHE_SIZE = int(os.getenv("ASSISTANT_CACHE_SIZE", "1024"))
+ASSISTANT_SEMANTIC_CACHE_SIZE = int(os.getenv("ASSISTANT_SEMANTIC_CACHE_SIZE", "512"))
+ASSISTANT_SEMANTIC_THRESHOLD = float(os.getenv("ASSISTANT_SEMANTIC_THRESHOLD", "0.92"))
@@ -193,9 +193,31 @@ async function loginLocal(userOrEmail, password) {
 /* -------- Requests (API) -------- */
 function _uid() { return String(Date.now()) + Math.random().toString(36).slice(2,6); }
 
-export async function lsGetRequests() {
-  const list = await _fetchJSON('/requests');
-  return Array.isArray(list) ? list : [];
+// GET /requests pagina por cursor (más recientes primero): { results, next }.
+// filters: owner, status, category, urgency, budget_min, budget_max, view ('summary').
+export async function lsGetRequestsPage({ cursor, limit, ...filters } = {}) {
+  const qs = new URLSearchParams();
+  for (const [k, v] of Object.entries({ ...filters, limit, cursor })) {
+    if (v !== undefined && v !== null && v !== '') qs.set(k, String(v));
+  }
+  const page = await _fetchJSON(`/requests${qs.toString() ? `?${qs}` : ''}`);
+  return { results: Array.isArray(page?.results) ? page.results : [], next: page?.next || null };
+}
+// Hasta `max` solicitudes siguiendo el cursor (nunca la tabla completa)
+export async function lsGetRequests({ max = 100, ...filters } = {}) {
+  const out = [];
+  let cursor;
+  do {
+    const page = await lsGetRequestsPage({ ...filters, cursor, limit: Math.min(100, max - out.length) });
+    out.push(...page.results);
+    cursor = page.next;
+  } while (cursor && out.length < max);
+  return out;
+}
+// Filtro de /requests para "mis solicitudes" (owner es el id del usuario, no el username)
+export function myRequestsFilter() {
+  const id = readProfile()?.id;
+  return id ? { owner: String(id) } : {};
 }
 export async function lsGetRequestById(id) {
   try { return await _fetchJSON(`/requests/${id}`); } catch { return null; }
@@ -370,6 +392,43 @@ export async function assistantChat({ message, history = [] }) {
   return await _fetchJSON('/assistant/chat', { method: 'POST', body: { message, history } });
 }
 
+// Streaming (NDJSON): llama onDelta(texto) por cada fragmento y devuelve la respuesta completa
+export async function assistantChatStream({ message, history = [], onDelta }) {
+  if (!String(message || '').trim()) throw new Error('Ingresa un mensaje');
+  const token = _authToken();
+  const res = await fetch(`${API}/assistant/chat/stream`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+      ...(token ? { Authorization: `Bearer ${token}` } : {}),
+    },
+    body: JSON.stringify({ message, history }),
+  });
+  if (!res.ok || !res.body) {
+    let data = null; try { data = await res.json(); } catch { data = null; }
+    throw new Error(data?.error || `Error ${res.status}`);
+  }
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  let reply = '';
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    let nl;
+    while ((nl = buffer.indexOf('\n')) >= 0) {
+      const line = buffer.slice(0, nl).trim();
+      buffer = buffer.slice(nl + 1);
+      if (!line) continue;
+      const ev = JSON.parse(line);
+      if (ev.type === 'delta') { reply += ev.text; onDelta?.(ev.text); }
+      else if (ev.type === 'error') throw new Error(ev.error || 'Error al consultar el asistente.');
+    }
+  }
+  return reply;
+}
+
 const REVIEWS_KEY = "reviews";
 
 function _readReviews(){ try { return JSON.parse(localStorage.getItem(REVIEWS_KEY) || "[]"); } catch { return []; } }
@@ -380,6 +439,8 @@ export async function lsAddReview({ requestId, toUserId, fromUserId, rating, com
   try {
     const body = { request: requestId, to_user: toUserId, rating: Number(rating), comment: String(comment || '').trim() };
     const res = await _fetchJSON('/reviews', { method: 'POST', body });
+    // Los RatingBadge de este usuario vuelven a pedir su promedio
+    window.dispatchEvent(new CustomEvent("rating:changed", { detail: { userId: String(toUserId) } }));
     return res;
   } catch (e) {
     // Fallback a localStorage si el backend no estÃ¡ disponible
@@ -1,5 +1,5 @@
 ﻿import { useEffect, useRef, useState } from "react";
-import { assistantChat } from "../api";
+import { assistantChatStream } from "../api";
 
 const SUGGESTIONS = [
   "\u00BFC\u00F3mo publico una solicitud?",
@@ -35,12 +35,18 @@ export default function AssistantWidget() {
     const prev = [...messages, { role: 'user', content: msg }];
     setMessages(prev);
     setLoading(true);
+    // La respuesta se va completando en el último mensaje a medida que llegan los tokens
+    setMessages((m) => [...m, { role: 'assistant', content: '' }]);
+    const setLast = (fn) => setMessages((m) => [...m.slice(0, -1), { role: 'assistant', content: fn(m[m.length - 1]?.content || '') }]);
     try {
-      const res = await assistantChat({ message: msg, history: prev.slice(-8) });
-      const reply = (res?.reply || '').trim() || 'Lo siento, no pude responder.';
-      setMessages((m) => [...m, { role: 'assistant', content: reply }]);
+      const reply = await assistantChatStream({
+        message: msg,
+        history: prev.slice(-8),
+        onDelta: (t) => setLast((c) => c + t),
+      });
+      if (!reply.trim()) setLast(() => 'Lo siento, no pude responder.');
     } catch (e) {
-      setMessages((m) => [...m, { role: 'assistant', content: e?.message || 'Error al consultar el asistente.' }]);
+      setLast((c) => c || e?.message || 'Error al consultar el asistente.');
     } finally {
       setLoading(false);
     }
@@ -81,7 +87,7 @@ export default function AssistantWidget() {
                 Hola, soy tu asistente. Puedo ayudarte con preguntas frecuentes sobre Fixly.
               </div>
             )}
-            {messages.map((m, i) => (
+            {messages.filter((m) => m.content).map((m, i) => (
               <div key={i} className={m.role === 'user' ? 'text-right' : ''}>
                 <div className={[
                   'inline-block max-w-[85%] rounded-2xl px-3 py-2 text-sm',
@@ -93,7 +99,7 @@ export default function AssistantWidget() {
                 </div>
               </div>
             ))}
-            {loading && <div className="text-sm text-indigo-200/80">Pensando...</div>}
+            {loading && !messages[messages.length - 1]?.content && <div className="text-sm text-indigo-200/80">Pensando...</div>}
           </div>
 
           <div className="px-4 pb-3">
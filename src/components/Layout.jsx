@@ -1,7 +1,7 @@
 // src/components/Layout.jsx
 import { useEffect, useState } from "react";
 import { Link, NavLink, useLocation, useNavigate } from "react-router-dom";
-import { isAuthed, lsGetRequests, readProfile } from "../api";
+import { isAuthed, lsGetRequestsPage, myRequestsFilter, readProfile } from "../api";
 import AssistantWidget from "./AssistantWidget";
 import NotificationBell from "./NotificationBell";
 import Notifier from "./Notifier";
@@ -35,12 +35,13 @@ export default function Layout({ authed, onLogout, children }) {
   const isProvider = role === "provider";
 
   // Refresco de conteo de requests si cambian en otra pestaña
+  // (solo importa si hay alguna: basta una fila del listado resumido)
   const [requestsCount, setRequestsCount] = useState(0);
   useEffect(() => {
     (async () => {
       try {
-        const list = await lsGetRequests();
-        setRequestsCount(Array.isArray(list) ? list.length : 0);
+        const { results } = await lsGetRequestsPage({ ...myRequestsFilter(), limit: 1, view: "summary" });
+        setRequestsCount(results.length);
       } catch {
         setRequestsCount(0);
       }
@@ -5,6 +5,7 @@ import {
   readProfile,
   currentUserKey,
   lsGetRequests,
+  myRequestsFilter,
   chatGetMessages,
   lsGetMyLeads,
   fetchProfileAndCache,
@@ -114,7 +115,8 @@ export default function Notifier({ intervalMs = 12000, enabled = true }) {
         pushCandidate(meCandidates, profile?.id);
         pushCandidate(meCandidates, profile?.username);
         pushCandidate(meCandidates, profile?.email);
-        const reqs = await lsGetRequests();
+        // Cliente: solo sus solicitudes; proveedor: las más recientes (ofertas aceptadas)
+        const reqs = await lsGetRequests(profile?.role === "client" ? myRequestsFilter() : {});
 
         // --- Nueva oferta para el cliente ---
         const lastOffers = loadJSON("notif:lastOffersSeen", {});
@@ -1,22 +1,76 @@
 // src/components/RatingBadge.jsx
 import { useEffect, useState } from "react";
 
+// Los badges que se montan en el mismo render se piden juntos a /users/ratings?ids=...
+const MAX_IDS = 200;
+// Los promedios cambian con cada reseña: se cachean poco y se invalidan al publicar
+// una (lsAddReview emite "rating:changed" con { userId }).
+const TTL_MS = 60_000;
+const CHANGED = "rating:changed";
+const cache = new Map(); // userId -> { at, promise: Promise<{count, avg}> }
+let queue = new Map(); // userId -> {resolve, promise}
+let timer = null;
+
+function flush() {
+  const batch = queue;
+  queue = new Map();
+  timer = null;
+  const base = (import.meta.env.VITE_API_URL || "").replace(/\/$/, "");
+  const ids = [...batch.keys()];
+  for (let i = 0; i < ids.length; i += MAX_IDS) {
+    const chunk = ids.slice(i, i + MAX_IDS);
+    fetch(`${base}/users/ratings?ids=${chunk.join(",")}`)
+      .then((r) => (r.ok ? r.json() : {}))
+      .catch(() => ({}))
+      .then((data) => {
+        for (const id of chunk) {
+          const s = data[id];
+          if (!s) cache.delete(id);
+          batch.get(id).resolve({ count: s?.count || 0, avg: s?.avg || 0 });
+        }
+      });
+  }
+}
+
+function loadRating(userId) {
+  const hit = cache.get(userId);
+  if (hit && Date.now() - hit.at < TTL_MS) return hit.promise;
+  // Ya va en el próximo lote (p. ej. invalidado antes del flush): mismo resultado
+  if (queue.has(userId)) return queue.get(userId).promise;
+  let resolve;
+  const promise = new Promise((r) => {
+    resolve = r;
+  });
+  queue.set(userId, { resolve, promise });
+  if (!timer) timer = setTimeout(flush, 0);
+  cache.set(userId, { at: Date.now(), promise });
+  return promise;
+}
+
+if (typeof window !== "undefined") {
+  window.addEventListener(CHANGED, (e) => cache.delete(String(e.detail?.userId)));
+}
+
 export default function RatingBadge({ userId, className = "" }) {
   const [stats, setStats] = useState({ count: 0, avg: 0 });
 
   useEffect(() => {
     let mounted = true;
-    async function run() {
-      try {
-        const base = (import.meta.env.VITE_API_URL || "").replace(/\/$/, "");
-        const r = await fetch(`${base}/users/${userId}/rating`);
-        const data = await r.json();
-        if (mounted && r.ok) setStats({ count: data.count || 0, avg: data.avg || 0 });
-      } catch {}
+    const load = () =>
+      loadRating(String(userId)).then((data) => {
+        if (mounted) setStats(data);
+      });
+    // Se registra después del listener del módulo, que ya borró la entrada
+    const onChanged = (e) => {
+      if (String(e.detail?.userId) === String(userId)) load();
+    };
+    if (userId) {
+      load();
+      window.addEventListener(CHANGED, onChanged);
     }
-    if (userId) run();
     return () => {
       mounted = false;
+      window.removeEventListener(CHANGED, onChanged);
     };
   }, [userId]);
 
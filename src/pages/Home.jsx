@@ -1,7 +1,7 @@
 ﻿// src/pages/Home.jsx
 import { Link } from "react-router-dom";
 import { useMemo, useEffect, useState } from "react";
-import { lsGetRequests, readProfile, isOwner, currentUserKey } from "../api";
+import { lsGetRequests, myRequestsFilter, readProfile, isOwner, currentUserKey } from "../api";
 import StatusBadge from "../components/StatusBadge";
 import AvatarPicker from "../components/AvatarPicker";
 
@@ -123,9 +123,13 @@ export default function Home() {
   const displayName = profile?.displayName || "";
   const me = currentUserKey?.() || "guest";
 
-  // Todas las solicitudes (desde API)
+  // Solicitudes recientes (desde API): las propias si es cliente, las últimas publicadas si es proveedor
   const [all, setAll] = useState([]);
-  useEffect(() => { (async () => { try { setAll(await lsGetRequests()); } catch { setAll([]); } })(); }, [role]);
+  useEffect(() => {
+    (async () => {
+      try { setAll(await lsGetRequests(role === "client" ? myRequestsFilter() : {})); } catch { setAll([]); }
+    })();
+  }, [role]);
 
   // Listas por rol
   const mine = useMemo(() => all.filter(r => isOwner(r)), [all]);
@@ -1,7 +1,7 @@
 ﻿// src/pages/Requests.jsx (UTF-8)
 import { Link } from "react-router-dom";
 import { useMemo, useState, useEffect } from "react";
-import { lsGetRequests, readProfile, isOwner } from "../api";
+import { lsGetRequestsPage, myRequestsFilter, readProfile, isOwner } from "../api";
 import StatusBadge from "../components/StatusBadge";
 import Empty from "../components/Empty";
 import { SkeletonCard } from "../components/Skeletons";
@@ -117,11 +117,39 @@ export default function Requests() {
   const profile = readProfile?.();
   const role = profile?.role || "";
 
+  // Se carga por páginas (cursor): las propias si es cliente, las más recientes si es proveedor
+  const PAGE = 50;
   const [all, setAll] = useState([]);
+  const [next, setNext] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const pageFilter = () => (role === "client" ? myRequestsFilter() : {});
   useEffect(() => {
-    (async () => { try { setAll(await lsGetRequests()); } catch { setAll([]); } })();
+    (async () => {
+      try {
+        const page = await lsGetRequestsPage({ ...pageFilter(), limit: PAGE });
+        setAll(page.results);
+        setNext(page.next);
+      } catch {
+        setAll([]);
+        setNext(null);
+      }
+    })();
   }, [role]);
 
+  async function loadMore() {
+    if (!next || loadingMore) return;
+    setLoadingMore(true);
+    try {
+      const page = await lsGetRequestsPage({ ...pageFilter(), limit: PAGE, cursor: next });
+      setAll((prev) => [...prev, ...page.results]);
+      setNext(page.next);
+    } catch {
+      setNext(null);
+    } finally {
+      setLoadingMore(false);
+    }
+  }
+
   const norm = (s) => String(s || "").toLowerCase().replace(/_/g, " ");
   const baseList = useMemo(() => {
     if (role === "client") return all.filter((r) => isOwner(r));
@@ -293,6 +321,19 @@ export default function Requests() {
             ))}
           </div>
         )}
+
+        {!loading && next && (
+          <div className="mt-6 flex justify-center">
+            <button
+              type="button"
+              onClick={loadMore}
+              disabled={loadingMore}
+              className="rounded-xl border border-white/15 bg-white/[0.06] px-4 py-2.5 font-semibold text-white hover:bg-white/[0.1] disabled:opacity-60"
+            >
+              {loadingMore ? "Cargando..." : "Cargar más"}
+            </button>
+          </div>
+        )}
       </div>
     </section>
   );